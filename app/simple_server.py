@@ -3,43 +3,319 @@ from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import time
 import os
 import math
+import signal
+import socket
+import tempfile
+import threading
+from multiprocessing.sharedctypes import RawArray
 
 from urllib.parse import urlparse, parse_qs
 
+# Contadores de requisições por worker em memória compartilhada (criados antes do fork):
+# cada processo só escreve no seu índice; GET /stats soma todos.
+REQUEST_COUNTERS = RawArray('Q', 1)
+WORKER_INDEX = 0
+_counter_lock = threading.Lock()  # threads do mesmo worker incrementam o mesmo índice
+
+# --- Kernels de carga (?kernel=...&work=<ms>) ---
+# `work` é em milissegundos de CPU: cada kernel tem uma unidade de trabalho e é calibrado
+# (unidades por ms de CPU da thread) na primeira vez que roda; a requisição executa
+# work * unidades_por_ms unidades. A calibração usa time.thread_time, então não é
+# distorcida se acontecer com o contêiner sob carga.
+MEMORY_KERNEL_KB = int(os.getenv("MEMORY_KERNEL_KB", "32768"))  # buffer padrão do kernel "memory" (> cache L3)
+MAX_SIZE_KB = int(os.getenv("MAX_SIZE_KB", "262144"))          # maior ?size_kb aceito (acima: 400)
+MAX_BUFFERS = int(os.getenv("MAX_MEMORY_BUFFERS", "4"))        # buffers "memory" mantidos por processo
+MEMORY_CHUNK = 64 * 1024                                       # bytes copiados por unidade
+IO_KERNEL_BLOCK = 4096                                         # bytes escritos (+ fsync) por unidade
+IO_KERNEL_DIR = os.getenv("IO_KERNEL_DIR") or None             # None = diretório temporário padrão
+CALIBRATION_MS = 20.0
+
+_buffers = {}        # tamanho (KB) -> bytearray do kernel "memory", no máximo MAX_BUFFERS por processo
+_units_per_ms = {}   # (kernel, tamanho) -> unidades por ms de CPU
+_calibration_lock = threading.Lock()
+_buffer_lock = threading.Lock()
+
+
+def _cpu_units(n, size_kb):
+    # Só aritmética: nenhum I/O nem alocação no laço
+    x = 0.0
+    for _ in range(n):
+        x = math.sqrt(123.456) * math.sin(123.456)
+    return x
+
+
+def _buffer(size_kb):
+    buf = _buffers.get(size_kb)
+    if buf is None:
+        with _buffer_lock:
+            buf = _buffers.get(size_kb)
+            if buf is None:
+                # Descarta o mais antigo (quem ainda o usa mantém sua referência até terminar)
+                while len(_buffers) >= max(1, MAX_BUFFERS):
+                    del _buffers[next(iter(_buffers))]
+                buf = _buffers[size_kb] = bytearray(size_kb * 1024)
+    return buf
+
+
+def _memory_units(n, size_kb):
+    # Copia blocos de uma metade do buffer para a outra percorrendo-o inteiro: com o buffer
+    # maior que o cache o custo é a largura de banda da memória, não o interpretador
+    view = memoryview(_buffer(size_kb))
+    half = (len(view) // 2) // MEMORY_CHUNK * MEMORY_CHUNK
+    if half < MEMORY_CHUNK:
+        raise ValueError(f"memory kernel needs size_kb >= {2 * MEMORY_CHUNK // 1024}")
+    offset = 0
+    for _ in range(n):
+        view[half + offset:half + offset + MEMORY_CHUNK] = view[offset:offset + MEMORY_CHUNK]
+        offset = (offset + MEMORY_CHUNK) % half
+
+
+def _alloc_units(n, size_kb):
+    # Objetos pequenos e rastreados pelo GC: custo de malloc/free e das coletas da geração 0
+    for i in range(n):
+        batch = [{"id": i, "payload": [i, i + 1]} for _ in range(32)]
+        del batch
+
+
+def _io_units(n, size_kb):
+    # Escrita síncrona (fsync) de um bloco por unidade: a thread bloqueia no disco e solta o GIL
+    block = b"\0" * IO_KERNEL_BLOCK
+    with tempfile.TemporaryFile(dir=IO_KERNEL_DIR) as f:
+        fd = f.fileno()
+        for _ in range(n):
+            os.pwrite(fd, block, 0)
+            os.fsync(fd)
+
+
+KERNELS = {
+    "cpu": _cpu_units,
+    "memory": _memory_units,
+    "alloc": _alloc_units,
+    "io": _io_units,
+}
+
+
+def _calibrate(kernel, size_kb):
+    """
+    Unidades do kernel por ms de CPU: dobra n até a execução passar de CALIBRATION_MS.
+    O kernel "io" gasta pouca CPU por unidade, então é calibrado em tempo de parede
+    (o `work` dele é tempo bloqueado em I/O, não CPU).
+    """
+    step = KERNELS[kernel]
+    clock = time.perf_counter if kernel == "io" else time.thread_time
+    # Fora da medição: aloca (e zera) o buffer do kernel "memory" e aquece o caminho do código
+    if kernel == "memory":
+        _buffer(size_kb)
+    step(1, size_kb)
+    n = 1
+    while True:
+        t0 = clock()
+        step(n, size_kb)
+        elapsed_ms = (clock() - t0) * 1000.0
+        if elapsed_ms >= CALIBRATION_MS:
+            return n / elapsed_ms
+        n *= 2
+
+
+def units_per_ms(kernel, size_kb=None):
+    key = (kernel, size_kb if kernel == "memory" else None)
+    rate = _units_per_ms.get(key)
+    if rate is None:
+        with _calibration_lock:
+            rate = _units_per_ms.get(key)
+            if rate is None:
+                rate = _units_per_ms[key] = _calibrate(kernel, key[1])
+    return rate
+
+
+def calibrate_kernels(spec):
+    """
+    Calibra uma lista "kernel[:size_kb],..." (ex.: "cpu,memory:65536"). Chamada antes do
+    fork: os workers herdam as taxas e nenhuma requisição paga (ou espera) a calibração.
+    """
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        kernel, _, size = item.partition(":")
+        if kernel not in KERNELS:
+            print(f"Warning: unknown kernel '{kernel}' in CALIBRATE_KERNELS; skipped.", flush=True)
+            continue
+        rate = units_per_ms(kernel, int(size or 0) or MEMORY_KERNEL_KB)
+        print(f"Calibrated kernel '{item}': {rate:.1f} units/ms", flush=True)
+
+
+def run_kernel(kernel, work_ms, size_kb=None):
+    size_kb = size_kb or MEMORY_KERNEL_KB
+    n = max(1, round(work_ms * units_per_ms(kernel, size_kb)))
+    KERNELS[kernel](n, size_kb)
+
 
 class SimpleAppHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 com conexões persistentes: sem isso cada requisição pagava um handshake TCP
+    # e uma thread nova do servidor, e o reuso de conexão dos geradores não tinha efeito
+    protocol_version = "HTTP/1.1"
+    timeout = float(os.getenv("KEEPALIVE_TIMEOUT", "5"))                  # s ocioso até fechar a conexão
+    max_requests_per_connection = int(os.getenv("MAX_KEEPALIVE_REQUESTS", "100"))  # 0 = sem limite
+    # Linha de log por requisição em stderr (vai para o log driver do Docker): desligada por padrão
+    access_log = os.getenv("ACCESS_LOG", "0") == "1"
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+    def handle(self):
+        self.requests_on_connection = 0
+        super().handle()
+
+    def _send_body(self, body):
+        # Content-Length sempre: o cliente sabe onde a resposta termina sem fechar a conexão
+        self.requests_on_connection += 1
+        limit = self.max_requests_per_connection
+        if limit and self.requests_on_connection >= limit:
+            self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
-        # Parametrização por env: WORK_UNITS (CPU) e PROCESSING_TIME (latência)
+        # Parametrização por env: WORK_UNITS (ms de CPU calibrados), WORK_KERNEL e PROCESSING_TIME (latência)
         #Valores defaults
-        default_work = int(os.getenv("WORK_UNITS", "1000000"))      # 1e6 = pesado; use 0 para "sem loop"
+        default_work = float(os.getenv("WORK_UNITS", "250"))       # ms de CPU; use 0 para "sem trabalho"
+        default_kernel = os.getenv("WORK_KERNEL", "cpu")
         default_sleep = float(os.getenv("PROCESSING_TIME", "0"))  # em segundos; ex.: 0.05
 
         parsed = urlparse(self.path)
+        if parsed.path == "/stats":
+            self._send_stats()
+            return
         qs = parse_qs(parsed.query)
-        work_units = int(qs.get("work",[default_work])[0])
-        processing_time = float(qs.get("sleep",[default_sleep])[0])
+        try:
+            work_ms = float(qs.get("work",[default_work])[0])
+            size_kb = int(qs.get("size_kb",[0])[0]) or None
+            processing_time = float(qs.get("sleep",[default_sleep])[0])
+        except ValueError as e:
+            self.send_error(400, f"invalid parameter: {e}")
+            return
+        kernel = qs.get("kernel",[default_kernel])[0]
+        if kernel not in KERNELS:
+            self.send_error(400, f"unknown kernel '{kernel}' (options: {', '.join(KERNELS)})")
+            return
+        if size_kb is not None and not 2 * MEMORY_CHUNK // 1024 <= size_kb <= MAX_SIZE_KB:
+            self.send_error(400, f"size_kb must be between {2 * MEMORY_CHUNK // 1024} and {MAX_SIZE_KB}")
+            return
 
         t0 = time.perf_counter()
-
-        for _ in range(work_units):
-            _ = math.sqrt(123.456) * math.sin(123.456)
-            print(_)
+        c0 = time.thread_time()
+        if work_ms > 0:
+            run_kernel(kernel, work_ms, size_kb)
+        c1 = time.thread_time()
         if processing_time > 0:
             time.sleep(processing_time)
         t1 = time.perf_counter()
 
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
+        with _counter_lock:
+            REQUEST_COUNTERS[WORKER_INDEX] += 1
 
         hostname = os.getenv("HOSTNAME", "unknown_container")
-        self.wfile.write(
-            f"host={hostname} work={work_units} sleep={processing_time:.4f}s elapsed={t1-t0:.4f}s\n".encode()
+        self._send_body(
+            f"host={hostname} kernel={kernel} work={work_ms:g}ms cpu={(c1-c0)*1000:.1f}ms "
+            f"sleep={processing_time:.4f}s elapsed={t1-t0:.4f}s\n".encode()
+        )
+
+    def _send_stats(self):
+        # Soma dos contadores de todos os workers (prefork) e a contagem de cada um
+        counts = list(REQUEST_COUNTERS)
+        self._send_body(
+            f"workers={len(counts)} requests={sum(counts)} per_worker={','.join(str(c) for c in counts)}\n".encode()
         )
 
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    # Cada worker abre o próprio socket na mesma porta; o kernel distribui as conexões
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _num_workers():
+    """
+    WORKERS: nº de processos servidores (padrão 1); "auto" = CPUs disponíveis ao contêiner.
+    """
+    value = os.getenv("WORKERS", "1").strip().lower()
+    if value == "auto":
+        return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    return max(1, int(value))
+
+
+def _spawn_worker(index, httpd, server_port, reuse_port):
+    pid = os.fork()
+    if pid:
+        return pid
+    # Processo filho: serve até morrer (SIGTERM padrão do pai encerra)
+    global WORKER_INDEX
+    WORKER_INDEX = index
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        if reuse_port:
+            httpd = ReusePortHTTPServer(('', server_port), SimpleAppHandler)
+        httpd.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def run_prefork(server_port, workers, reuse_port):
+    """
+    Sobe `workers` processos (fork) servindo a mesma porta: pelo socket herdado do pai
+    ou, com REUSE_PORT=1, cada um com o seu socket SO_REUSEPORT. O pai só supervisiona:
+    recria workers que morrerem e repassa SIGTERM/SIGINT (docker stop) a todos.
+    """
+    httpd = None if reuse_port else ThreadingHTTPServer(('', server_port), SimpleAppHandler)
+    children = {}
+    for index in range(workers):
+        children[_spawn_worker(index, httpd, server_port, reuse_port)] = index
+
+    stopping = []
+
+    def _shutdown(signum, frame):
+        stopping.append(signum)
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    print(f"Simple app server running on port {server_port} (prefork: {workers} workers, "
+          f"{'SO_REUSEPORT' if reuse_port else 'inherited socket'})", flush=True)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"Worker {index} (pid {pid}) exited with status {status}; restarting.", flush=True)
+            children[_spawn_worker(index, httpd, server_port, reuse_port)] = index
+
+
 if __name__ == '__main__':
     # Dentro do container, mantenha 80; no host você mapeia pra 8080
     server_port = int(os.getenv("APP_PORT", "80"))
-    httpd = ThreadingHTTPServer(('', server_port), SimpleAppHandler)
-    print(f"Simple app server running on port {server_port} (threading on)")
-    httpd.serve_forever()
+    workers = _num_workers()
+    # Calibra antes do fork os kernels que o cliente vai pedir (CALIBRATE_KERNELS; padrão = WORK_KERNEL)
+    calibrate_kernels(os.getenv("CALIBRATE_KERNELS") or os.getenv("WORK_KERNEL", "cpu"))
+    if workers > 1:
+        # ThreadingHTTPServer roda o loop de CPU de todas as requisições sob um único GIL:
+        # com N processos a capacidade da instância acompanha a cota de CPU do contêiner
+        REQUEST_COUNTERS = RawArray('Q', workers)
+        run_prefork(server_port, workers, os.getenv("REUSE_PORT", "0") == "1")
+    else:
+        httpd = ThreadingHTTPServer(('', server_port), SimpleAppHandler)
+        print(f"Simple app server running on port {server_port} (threading on)")
+        httpd.serve_forever()
@@ -1,11 +1,77 @@
 # edos_docker_simulation/autoscaler_logic.py
+import math
 import time
+from collections import deque
+
 import config
 
+
+class _BreachCounter:
+    """
+    N-de-M: quantas das últimas M avaliações violaram o limiar (contador incremental, O(1)).
+    """
+    __slots__ = ("required", "flags", "count")
+
+    def __init__(self, required, periods):
+        self.required = max(1, int(required))
+        self.flags = deque(maxlen=max(self.required, int(periods)))
+        self.count = 0
+
+    def push(self, breached):
+        if len(self.flags) == self.flags.maxlen:
+            self.count -= self.flags[0]
+        self.flags.append(1 if breached else 0)
+        self.count += self.flags[-1]
+
+    def satisfied(self):
+        return self.count >= self.required
+
+    def clear(self):
+        self.flags.clear()
+        self.count = 0
+
+
+class _SlidingExtreme:
+    """
+    Máximo (ou mínimo) dos valores dos últimos `seconds` segundos: deque monotônico,
+    O(1) amortizado por amostra. A amostra mais recente está sempre incluída.
+    """
+    __slots__ = ("seconds", "largest", "samples")
+
+    def __init__(self, seconds, largest=True):
+        self.seconds = seconds
+        self.largest = largest
+        self.samples = deque()  # (instante, valor), valores monotônicos
+
+    def push(self, now, value):
+        samples = self.samples
+        if self.largest:
+            while samples and samples[-1][1] <= value:
+                samples.pop()
+        else:
+            while samples and samples[-1][1] >= value:
+                samples.pop()
+        samples.append((now, value))
+        while samples[0][0] < now - self.seconds:
+            samples.popleft()
+        return samples[0][1]
+
+
 class Autoscaler:
-    def __init__(self):
+    def __init__(self, clock=time.time, pulse_detector=None):
+        # clock: fonte de tempo em segundos (o simulador de eventos discretos injeta o relógio virtual)
+        self.clock = clock
+        # pulse_detector (pulse_detector.PulseDetector, alimentado pelo orquestrador): amortece scale-up em ataques pulsados
+        self.pulse_detector = pulse_detector
         self.current_instances = 0 # O orquestrador irá definir o valor inicial
         self.last_scale_action_time = 0
+        # Histerese N-de-M (padrão 1 de 1 = age na primeira amostra que cruza o limiar)
+        self.up_breaches = _BreachCounter(getattr(config, "SCALE_UP_BREACHES_REQUIRED", 1),
+                                          getattr(config, "SCALE_UP_EVALUATION_PERIODS", 1))
+        self.down_breaches = _BreachCounter(getattr(config, "SCALE_DOWN_BREACHES_REQUIRED", 1),
+                                            getattr(config, "SCALE_DOWN_EVALUATION_PERIODS", 1))
+        # Scale-down só se a MAIOR recomendação dos últimos K segundos estiver abaixo do nº atual
+        self.down_stabilization = _SlidingExtreme(getattr(config, "SCALE_DOWN_STABILIZATION_SECONDS", 0))
         print("[Autoscaler] Initialized.")
 
     def set_initial_instances(self, num_instances):
@@ -29,28 +95,51 @@ class Autoscaler:
             str: "SCALE_UP", "SCALE_DOWN", or "NO_ACTION".
         """
         self.current_instances = current_num_instances # Sincronizar com a realidade
+        current_time = self.clock()
 
-        # Verificar o cooldown
-        current_time = time.time()
-        if (current_time - self.last_scale_action_time) < config.SCALE_COOLDOWN_SECONDS:
-            print(f"[Autoscaler] In cooldown period. No scaling action will be taken. Time remaining: {config.SCALE_COOLDOWN_SECONDS - (current_time - self.last_scale_action_time):.1f}s")
+        # Cada avaliação entra nos contadores N-de-M e na janela de estabilização, mesmo em cooldown
+        self.up_breaches.push(average_cpu_percent > config.CPU_THRESHOLD_SCALE_UP)
+        self.down_breaches.push(average_cpu_percent < config.CPU_THRESHOLD_SCALE_DOWN)
+        want_up = self.up_breaches.satisfied()
+        want_down = not want_up and self.down_breaches.satisfied()
+        recommendation = self.current_instances + (1 if want_up else -1 if want_down else 0)
+        stabilized = self.down_stabilization.push(current_time, recommendation)
+
+        # Verificar o cooldown (subida e descida podem ter durações diferentes)
+        up_cooldown, down_cooldown = self.get_cooldowns()
+        since_last_action = current_time - self.last_scale_action_time
+        if since_last_action < min(up_cooldown, down_cooldown):
+            print(f"[Autoscaler] In cooldown period. No scaling action will be taken. Time remaining: {min(up_cooldown, down_cooldown) - since_last_action:.1f}s")
             return "NO_ACTION"
 
         action = "NO_ACTION"
 
         # Lógica de Scale Up
-        if average_cpu_percent > config.CPU_THRESHOLD_SCALE_UP:
-            if self.current_instances < config.MAX_INSTANCES:
+        if want_up:
+            if since_last_action < up_cooldown:
+                print(f"[Autoscaler] Condition for SCALE_UP met (Avg CPU: {average_cpu_percent:.2f}%), but in scale-up cooldown. Time remaining: {up_cooldown - since_last_action:.1f}s")
+            elif self.pulse_detector is not None and self.pulse_detector.should_damp_scale_up():
+                print(f"[Autoscaler] Condition for SCALE_UP met (Avg CPU: {average_cpu_percent:.2f}%), but load is pulsed "
+                      f"(period {self.pulse_detector.period_ticks} intervals, confidence {self.pulse_detector.confidence:.2f}) "
+                      f"and the burst has not outlasted the learned {self.pulse_detector.learned_burst_ticks():.1f} intervals. Damped.")
+            elif self.current_instances < config.MAX_INSTANCES:
                 action = "SCALE_UP"
-                print(f"[Autoscaler] Decision: SCALE_UP. Avg CPU: {average_cpu_percent:.2f}% > {config.CPU_THRESHOLD_SCALE_UP}%. Current instances: {self.current_instances}, Max: {config.MAX_INSTANCES}")
+                print(f"[Autoscaler] Decision: SCALE_UP. Avg CPU: {average_cpu_percent:.2f}% > {config.CPU_THRESHOLD_SCALE_UP}% "
+                      f"in {self.up_breaches.count} of the last {len(self.up_breaches.flags)} evaluations. Current instances: {self.current_instances}, Max: {config.MAX_INSTANCES}")
             else:
                 print(f"[Autoscaler] Condition for SCALE_UP met (Avg CPU: {average_cpu_percent:.2f}%), but already at MAX_INSTANCES ({config.MAX_INSTANCES}). No action.")
         
         # Lógica de Scale Down (só considera se não for escalar para cima)
-        elif average_cpu_percent < config.CPU_THRESHOLD_SCALE_DOWN:
-            if self.current_instances > config.MIN_INSTANCES:
+        elif want_down:
+            if since_last_action < down_cooldown:
+                print(f"[Autoscaler] Condition for SCALE_DOWN met (Avg CPU: {average_cpu_percent:.2f}%), but in scale-down cooldown. Time remaining: {down_cooldown - since_last_action:.1f}s")
+            elif stabilized >= self.current_instances:
+                print(f"[Autoscaler] Condition for SCALE_DOWN met (Avg CPU: {average_cpu_percent:.2f}%), but the highest recommendation "
+                      f"in the last {self.down_stabilization.seconds}s is {stabilized} instance(s). Stabilizing.")
+            elif self.current_instances > config.MIN_INSTANCES:
                 action = "SCALE_DOWN"
-                print(f"[Autoscaler] Decision: SCALE_DOWN. Avg CPU: {average_cpu_percent:.2f}% < {config.CPU_THRESHOLD_SCALE_DOWN}%. Current instances: {self.current_instances}, Min: {config.MIN_INSTANCES}")
+                print(f"[Autoscaler] Decision: SCALE_DOWN. Avg CPU: {average_cpu_percent:.2f}% < {config.CPU_THRESHOLD_SCALE_DOWN}% "
+                      f"in {self.down_breaches.count} of the last {len(self.down_breaches.flags)} evaluations. Current instances: {self.current_instances}, Min: {config.MIN_INSTANCES}")
             else:
                 print(f"[Autoscaler] Condition for SCALE_DOWN met (Avg CPU: {average_cpu_percent:.2f}%), but already at MIN_INSTANCES ({config.MIN_INSTANCES}). No action.")
         
@@ -60,10 +149,25 @@ class Autoscaler:
 
         if action != "NO_ACTION":
             self.last_scale_action_time = current_time
+            # Violações anteriores à ação foram medidas com outro nº de instâncias: recomeça a contagem
+            self.up_breaches.clear()
+            self.down_breaches.clear()
             # O orquestrador atualizará self.current_instances após a ação ser realmente executada
             
         return action
 
+    def decide_desired_instances(self, average_cpu_percent, current_num_instances, metrics=None):
+        """
+        Number of instances the cluster should have. The threshold policies move one
+        instance per decision; TargetTrackingAutoscaler may ask for several at once.
+
+        Returns:
+            tuple: (decision string as in decide_scaling, desired instance count).
+        """
+        decision = self.decide_scaling(average_cpu_percent, current_num_instances)
+        step = {"SCALE_UP": 1, "SCALE_DOWN": -1}.get(decision, 0)
+        return decision, current_num_instances + step
+
     def record_scale_action(self, new_instance_count):
         """
         Called by the orchestrator after a scaling action has been successfully performed
@@ -73,23 +177,145 @@ class Autoscaler:
         self.current_instances = new_instance_count
         # self.last_scale_action_time = time.time() # Já definido em decide_scaling se houve ação
 
+    def get_cooldowns(self):
+        """
+        (scale-up cooldown, scale-down cooldown) in seconds; None in config means SCALE_COOLDOWN_SECONDS.
+        """
+        up = getattr(config, "SCALE_UP_COOLDOWN_SECONDS", None)
+        down = getattr(config, "SCALE_DOWN_COOLDOWN_SECONDS", None)
+        return (config.SCALE_COOLDOWN_SECONDS if up is None else up,
+                config.SCALE_COOLDOWN_SECONDS if down is None else down)
+
         # --- NOVOS MÉTODOS PARA O EDOS ---
-    def is_in_cooldown(self):
+    def is_in_cooldown(self, direction=None):
         """
         Checks if the autoscaler is currently in a cooldown period.
+        direction: "SCALE_UP" / "SCALE_DOWN" for that direction's cooldown; None means no
+        action at all is possible (the shorter of the two, as in decide_scaling).
         """
-        current_time = time.time()
-        return (current_time - self.last_scale_action_time) < config.SCALE_COOLDOWN_SECONDS
+        return self.get_cooldown_remaining(direction) > 0
 
-    def get_cooldown_remaining(self):
+    def get_cooldown_remaining(self, direction=None):
         """
-        Returns the remaining cooldown time in seconds.
+        Returns the remaining cooldown time in seconds (see is_in_cooldown for direction).
         Returns 0 if not in cooldown or if cooldown has elapsed.
         """
-        current_time = time.time()
-        time_since_last_scale = current_time - self.last_scale_action_time
-        remaining = config.SCALE_COOLDOWN_SECONDS - time_since_last_scale
-        return max(0, remaining) # Garante que não retorne valores negativos
+        up_cooldown, down_cooldown = self.get_cooldowns()
+        cooldown = {"SCALE_UP": up_cooldown, "SCALE_DOWN": down_cooldown}.get(direction, min(up_cooldown, down_cooldown))
+        time_since_last_scale = self.clock() - self.last_scale_action_time
+        return max(0, cooldown - time_since_last_scale) # Garante que não retorne valores negativos
+
+
+class PredictiveAutoscaler(Autoscaler):
+    """
+    Mesma política de limiares/cooldown, aplicada sobre a CPU prevista: escala para cima
+    quando a previsão (Holt) para os próximos PREDICTIVE_HORIZON_INTERVALS intervalos
+    ultrapassa o limiar, e só escala para baixo quando a CPU atual E a prevista estão
+    abaixo do limiar de descida.
+
+    O orquestrador/simulador alimenta o `forecaster` (forecasting.LoadForecaster) com
+    `observe()` a cada tick, antes de chamar decide_scaling.
+    """
+    def __init__(self, clock=time.time, forecaster=None, pulse_detector=None):
+        from forecasting import LoadForecaster
+        self.forecaster = forecaster if forecaster is not None else LoadForecaster()
+        self.horizon = getattr(config, "PREDICTIVE_HORIZON_INTERVALS", 3)
+        super().__init__(clock, pulse_detector)
+
+    def decide_scaling(self, average_cpu_percent, current_num_instances):
+        predicted = self.forecaster.peak_cpu_forecast(current_num_instances, self.horizon)
+        print(f"[Autoscaler] Forecast: peak CPU over next {self.horizon} intervals = {predicted:.2f}% "
+              f"(current {average_cpu_percent:.2f}%).")
+        return super().decide_scaling(max(average_cpu_percent, predicted), current_num_instances)
+
+
+class TargetTrackingAutoscaler(Autoscaler):
+    """
+    Target tracking (como o HPA do Kubernetes): desired = ceil(prontas * métrica / alvo),
+    podendo pedir várias instâncias de uma vez.
+
+    Métricas (TARGET_TRACKING_METRIC):
+        "cpu"              -> CPU média por instância           (alvo TARGET_CPU_PERCENT)
+        "p95_rtt"          -> p95 do RTT do tráfego normal      (alvo TARGET_P95_RTT_MS)
+        "rps_per_instance" -> requisições/s por instância pronta (alvo TARGET_RPS_PER_INSTANCE)
+
+    Razões métrica/alvo dentro de 1 ± TARGET_TRACKING_TOLERANCE não mudam nada. As
+    recomendações são estabilizadas: a subida usa a MENOR recomendação dos últimos
+    TARGET_SCALE_UP_STABILIZATION_SECONDS e a descida a MAIOR dos últimos
+    TARGET_SCALE_DOWN_STABILIZATION_SECONDS (no lugar do cooldown único).
+    """
+    def __init__(self, clock=time.time, pulse_detector=None):
+        self.metric = getattr(config, "TARGET_TRACKING_METRIC", "cpu")
+        self.target = {
+            "cpu": getattr(config, "TARGET_CPU_PERCENT", 50.0),
+            "p95_rtt": getattr(config, "TARGET_P95_RTT_MS", 200.0),
+            "rps_per_instance": getattr(config, "TARGET_RPS_PER_INSTANCE", 20.0),
+        }[self.metric]
+        self.tolerance = getattr(config, "TARGET_TRACKING_TOLERANCE", 0.1)
+        self.up_recommendations = _SlidingExtreme(getattr(config, "TARGET_SCALE_UP_STABILIZATION_SECONDS", 0), largest=False)
+        self.down_recommendations = _SlidingExtreme(getattr(config, "TARGET_SCALE_DOWN_STABILIZATION_SECONDS", 60))
+        super().__init__(clock, pulse_detector)
+
+    def _metric_value(self, average_cpu_percent, ready_instances, metrics):
+        if self.metric == "cpu":
+            return average_cpu_percent
+        if self.metric == "p95_rtt":
+            return metrics.get("p95_rtt_ms")  # None sem requisições no intervalo
+        return metrics.get("request_rate", 0.0) / max(1, ready_instances)
+
+    def _stabilized(self, now, raw, current):
+        up = self.up_recommendations.push(now, raw)
+        down = self.down_recommendations.push(now, raw)
+        desired = current
+        if desired < up:
+            desired = up
+        if desired > down:
+            desired = down
+        return desired
+
+    def decide_desired_instances(self, average_cpu_percent, current_num_instances, metrics=None):
+        metrics = metrics or {}
+        self.current_instances = current_num_instances
+        # Métrica medida só nas instâncias prontas; as que estão subindo já contam em current
+        ready = metrics.get("ready_instances", current_num_instances)
+        value = self._metric_value(average_cpu_percent, ready, metrics)
+        # Sem métrica (ou sem instâncias prontas) a recomendação é manter o tamanho atual
+        ratio = value / self.target if value is not None and self.target else 1.0
+        if ready == 0 or abs(ratio - 1.0) <= self.tolerance:
+            raw = current_num_instances
+        else:
+            raw = math.ceil(ready * ratio)
+        raw = max(config.MIN_INSTANCES, min(config.MAX_INSTANCES, raw))
+        desired = self._stabilized(self.clock(), raw, current_num_instances)
+        if desired > current_num_instances and self.pulse_detector is not None and self.pulse_detector.should_damp_scale_up():
+            print(f"[Autoscaler] Target tracking wants {desired} instances, but load is pulsed "
+                  f"(confidence {self.pulse_detector.confidence:.2f}). Damped.")
+            desired = current_num_instances
+
+        decision = "SCALE_UP" if desired > current_num_instances else "SCALE_DOWN" if desired < current_num_instances else "NO_ACTION"
+        print(f"[Autoscaler] Target tracking: {self.metric}={value or 0.0:.2f} vs target {self.target:g} "
+              f"(ratio {ratio:.2f}, tolerance {self.tolerance:g}) on {ready} ready instance(s) -> "
+              f"recommended {raw}, stabilized {desired} (current {current_num_instances}). Decision: {decision}.")
+        if decision != "NO_ACTION":
+            self.last_scale_action_time = self.clock()
+        return decision, desired
+
+    def decide_scaling(self, average_cpu_percent, current_num_instances):
+        return self.decide_desired_instances(average_cpu_percent, current_num_instances)[0]
+
+
+def create_autoscaler(clock=time.time, forecaster=None, policy=None, pulse_detector=None):
+    """
+    Autoscaler da política configurada em AUTOSCALER_POLICY ("threshold", "predictive" ou "target_tracking").
+    """
+    policy = policy or getattr(config, "AUTOSCALER_POLICY", "threshold")
+    if policy == "predictive":
+        return PredictiveAutoscaler(clock=clock, forecaster=forecaster, pulse_detector=pulse_detector)
+    if policy == "target_tracking":
+        return TargetTrackingAutoscaler(clock=clock, pulse_detector=pulse_detector)
+    if policy != "threshold":
+        raise ValueError(f"Unknown AUTOSCALER_POLICY: {policy!r}")
+    return Autoscaler(clock=clock, pulse_detector=pulse_detector)
 
 # --- Self-test section (optional, for direct testing of this module) ---
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+# edos_docker_simulation/batch_policy_eval.py
+"""
+Avaliação vetorizada (NumPy) de muitas políticas de threshold sobre um traço de CPU gravado.
+
+`Autoscaler.decide_scaling` trata um float por chamada e lê o relógio real; reproduzir um
+`simulation_metrics.csv` contra milhares de combinações de limiar/cooldown exigia laços
+Python e sleeps. Aqui a mesma máquina de estados do `Autoscaler` (limiares com histerese
+N-de-M, cooldowns de subida/descida a partir da última ação, estabilização do scale-down,
+clamp em MIN/MAX) avança um tick por vez para TODAS as políticas de uma vez, com arrays
+de tamanho P. Colunas de `policies` (as ausentes à direita vêm do config):
+
+    policies[:, 0]   CPU_THRESHOLD_SCALE_UP
+    policies[:, 1]   CPU_THRESHOLD_SCALE_DOWN
+    policies[:, 2]   SCALE_COOLDOWN_SECONDS
+    policies[:, 3]   MIN_INSTANCES
+    policies[:, 4]   MAX_INSTANCES
+    policies[:, 5]   SCALE_UP_BREACHES_REQUIRED
+    policies[:, 6]   SCALE_UP_EVALUATION_PERIODS
+    policies[:, 7]   SCALE_DOWN_BREACHES_REQUIRED
+    policies[:, 8]   SCALE_DOWN_EVALUATION_PERIODS
+    policies[:, 9]   SCALE_UP_COOLDOWN_SECONDS    (NaN = coluna 2)
+    policies[:, 10]  SCALE_DOWN_COOLDOWN_SECONDS  (NaN = coluna 2)
+    policies[:, 11]  SCALE_DOWN_STABILIZATION_SECONDS
+
+O amortecimento de pulsos (PULSE_DETECTOR_DAMPING) não é modelado: depende do veredito
+do PulseDetector sobre a trajetória de cada política. Com ele ligado no config,
+`evaluate_policies` recusa avaliar a menos que o chamador passe `pulse_damping=False`
+(resultado equivale ao Autoscaler sem detector).
+
+Se o traço traz o nº de instâncias gravado, a carga é conservada: a CPU vista por uma
+política com n instâncias é cpu_gravada * n_gravado / n. As ações têm efeito no próprio
+tick, como no orquestrador síncrono (sem atraso de startup). O custo de cada política
+vem de `cost_calculator`.
+
+Uso:
+    python batch_policy_eval.py simulation_metrics.csv   -> avalia uma grade padrão sobre o CSV
+    python batch_policy_eval.py                          -> self-test (compara com o Autoscaler)
+"""
+import csv
+import sys
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+import config
+import cost_calculator
+
+
+class BatchResult:
+    """
+    instances: (T, P) nº de instâncias após a decisão de cada tick; decisions: (T, P) em
+    {-1, 0, 1}; costs, scale_ups, scale_downs, instance_seconds: (P,).
+    """
+    def __init__(self, instances, decisions, costs, instance_seconds):
+        self.instances = instances
+        self.decisions = decisions
+        self.costs = costs
+        self.instance_seconds = instance_seconds
+        self.scale_ups = (decisions == 1).sum(axis=0)
+        self.scale_downs = (decisions == -1).sum(axis=0)
+
+
+def load_cpu_trace(path: str, column: str = "average_cpu_percent") -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+    """
+    (cpu, instâncias gravadas, intervalo em s) de um CSV do orquestrador/simulador ou de um
+    arquivo de run binário (.edosrun).
+    """
+    if path.endswith(".edosrun"):
+        from metrics_sink import load_run
+        run = load_run(path)
+        cpu = np.asarray(run.columns[column], dtype=np.float64)
+        instances = np.asarray(run.columns["num_instances"], dtype=np.float64)
+        elapsed = np.asarray(run.columns["elapsed_time_s"], dtype=np.float64)
+    else:
+        with open(path, newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        cpu = np.array([float(r[column] or 0) for r in rows])
+        instances = np.array([float(r["num_instances"] or 0) for r in rows])
+        elapsed = np.array([float(r["elapsed_time_s"] or 0) for r in rows])
+    interval = float(np.median(np.diff(elapsed))) if len(elapsed) > 1 else float(config.MONITOR_INTERVAL_SECONDS)
+    return cpu, instances, interval
+
+
+POLICY_COLUMNS = (
+    "CPU_THRESHOLD_SCALE_UP", "CPU_THRESHOLD_SCALE_DOWN", "SCALE_COOLDOWN_SECONDS",
+    "MIN_INSTANCES", "MAX_INSTANCES",
+    "SCALE_UP_BREACHES_REQUIRED", "SCALE_UP_EVALUATION_PERIODS",
+    "SCALE_DOWN_BREACHES_REQUIRED", "SCALE_DOWN_EVALUATION_PERIODS",
+    "SCALE_UP_COOLDOWN_SECONDS", "SCALE_DOWN_COOLDOWN_SECONDS",
+    "SCALE_DOWN_STABILIZATION_SECONDS",
+)
+_COLUMN_DEFAULTS = {
+    "SCALE_UP_BREACHES_REQUIRED": 1, "SCALE_UP_EVALUATION_PERIODS": 1,
+    "SCALE_DOWN_BREACHES_REQUIRED": 1, "SCALE_DOWN_EVALUATION_PERIODS": 1,
+    "SCALE_UP_COOLDOWN_SECONDS": None, "SCALE_DOWN_COOLDOWN_SECONDS": None,
+    "SCALE_DOWN_STABILIZATION_SECONDS": 0,
+}
+
+
+def _full_policies(policies) -> np.ndarray:
+    """
+    Completa as colunas ausentes com os valores do config (None -> NaN).
+    """
+    policies = np.atleast_2d(np.asarray(policies, dtype=np.float64))
+    if policies.shape[1] > len(POLICY_COLUMNS):
+        raise ValueError(f"policies has {policies.shape[1]} columns; at most {len(POLICY_COLUMNS)} are supported")
+    missing = []
+    for name in POLICY_COLUMNS[policies.shape[1]:]:
+        value = getattr(config, name, _COLUMN_DEFAULTS.get(name))
+        missing.append(np.nan if value is None else float(value))
+    return np.hstack([policies, np.tile(missing, (policies.shape[0], 1))]) if missing else policies
+
+
+class _BreachWindow:
+    """
+    Versão vetorizada de autoscaler_logic._BreachCounter: as últimas M avaliações de cada
+    política (M = max(exigidas, períodos)), zeradas por política depois de uma ação.
+    """
+    def __init__(self, required: np.ndarray, periods: np.ndarray):
+        self.required = np.maximum(1, required)
+        self.size = np.maximum(self.required, periods)
+        depth = int(self.size.max())
+        self.flags = np.zeros((depth, len(required)), dtype=np.int32)
+        self.valid = np.zeros(len(required))     # avaliações desde o último clear (limitado a M)
+        self.ages = np.arange(depth)[:, None]    # idade de cada posição relativa ao tick atual
+
+    def push(self, t: int, breached: np.ndarray) -> np.ndarray:
+        depth = len(self.flags)
+        self.flags[t % depth] = breached
+        self.valid = np.minimum(self.valid + 1, self.size)
+        order = (t - self.ages[:, 0]) % depth  # posição da avaliação de idade a
+        count = (self.flags[order] * (self.ages < self.valid)).sum(axis=0)
+        return count >= self.required
+
+    def clear(self, mask: np.ndarray):
+        self.valid = np.where(mask, 0, self.valid)
+
+
+def evaluate_policies(cpu_trace, policies, interval: float, recorded_instances=None,
+                      initial_instances: Optional[int] = None,
+                      pulse_damping: Optional[bool] = None) -> BatchResult:
+    """
+    Simula todas as políticas sobre o traço. Ver o docstring do módulo para o layout de `policies`.
+    """
+    if pulse_damping is None:
+        pulse_damping = getattr(config, "PULSE_DETECTOR_DAMPING", False)
+    if pulse_damping:
+        raise ValueError("Pulse damping is not modelled by the batch evaluator; "
+                         "pass pulse_damping=False to evaluate the policies without it")
+    cpu_trace = np.asarray(cpu_trace, dtype=np.float64)
+    policies = _full_policies(policies)
+    T, P = len(cpu_trace), policies.shape[0]
+    (up_thr, down_thr, cooldown, min_n, max_n, up_req, up_periods, down_req, down_periods,
+     up_cooldown, down_cooldown, stabilization) = policies.T
+    up_cooldown = np.where(np.isnan(up_cooldown), cooldown, up_cooldown)
+    down_cooldown = np.where(np.isnan(down_cooldown), cooldown, down_cooldown)
+
+    # Carga do cluster em "instâncias de CPU": redistribuída entre as n instâncias de cada política
+    load = cpu_trace * np.asarray(recorded_instances, dtype=np.float64) if recorded_instances is not None else None
+
+    up_breaches = _BreachWindow(up_req, up_periods)
+    down_breaches = _BreachWindow(down_req, down_periods)
+    # Estabilização: maior recomendação entre as amostras com instante >= agora - K
+    stab_ticks = np.floor(stabilization / interval + 1e-9)
+    stab_depth = int(stab_ticks.max()) + 1
+    recommendations = np.zeros((stab_depth, P))
+    stab_ages = np.arange(stab_depth)[:, None]
+
+    start = config.MIN_INSTANCES if initial_instances is None else initial_instances
+    n = np.clip(np.full(P, float(start)), min_n, max_n)
+    last_action = np.full(P, -np.inf)
+    instances = np.empty((T, P), dtype=np.int16)
+    decisions = np.empty((T, P), dtype=np.int8)
+    for t in range(T):
+        now = t * interval
+        cpu = load[t] / n if load is not None else cpu_trace[t]
+        want_up = up_breaches.push(t, cpu > up_thr)
+        want_down = ~want_up & down_breaches.push(t, cpu < down_thr)
+        recommendations[t % stab_depth] = n + want_up - want_down
+        in_window = (stab_ages <= np.minimum(stab_ticks, t))
+        order = (t - stab_ages[:, 0]) % stab_depth
+        stabilized = np.where(in_window, recommendations[order], -np.inf).max(axis=0)
+
+        since = now - last_action
+        up = want_up & (since >= up_cooldown) & (n < max_n)
+        down = want_down & (since >= down_cooldown) & (stabilized < n) & (n > min_n)
+        acted = up | down
+        last_action = np.where(acted, now, last_action)
+        up_breaches.clear(acted)
+        down_breaches.clear(acted)
+        n = n + up - down
+        instances[t] = n
+        decisions[t] = up.astype(np.int8) - down.astype(np.int8)
+
+    instance_seconds = instances.sum(axis=0, dtype=np.float64) * interval
+    # Custo linear em instância-segundos: 1 instância pelo total de instância-segundos da política
+    costs = np.array([cost_calculator.calculate_instance_cost(1, s) for s in instance_seconds.tolist()])
+    return BatchResult(instances, decisions, costs, instance_seconds)
+
+
+def policy_grid(up_thresholds, down_thresholds, cooldowns) -> np.ndarray:
+    """
+    Produto cartesiano (apenas combinações com limiar de descida < subida), shape (P, 3).
+    """
+    up, down, cd = np.meshgrid(np.asarray(up_thresholds, float), np.asarray(down_thresholds, float),
+                               np.asarray(cooldowns, float), indexing="ij")
+    grid = np.stack([up.ravel(), down.ravel(), cd.ravel()], axis=1)
+    return grid[grid[:, 1] < grid[:, 0]]
+
+
+# --- Self-test / execução direta ---
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        cpu, recorded, interval = load_cpu_trace(sys.argv[1])
+        policies = policy_grid(np.arange(40, 96, 5), np.arange(5, 51, 5), np.arange(0, 121, 10))
+        t0 = time.perf_counter()
+        if getattr(config, "PULSE_DETECTOR_DAMPING", False):
+            print("[BatchEval] PULSE_DETECTOR_DAMPING is on in config but is not modelled: evaluating without pulse damping.")
+        result = evaluate_policies(cpu, policies, interval, recorded, initial_instances=int(recorded[0]),
+                                   pulse_damping=False)
+        print(f"[BatchEval] {len(policies)} policies x {len(cpu)} ticks in {time.perf_counter() - t0:.2f}s")
+        for i in np.argsort(result.costs)[:10]:
+            up, down, cd = policies[i]
+            print(f"  up>{up:.0f}% down<{down:.0f}% cooldown={cd:.0f}s -> cost=${result.costs[i]:.4f}, "
+                  f"scale events={result.scale_ups[i] + result.scale_downs[i]}")
+        sys.exit(0)
+
+    import autoscaler_logic
+    import contextlib
+    import io
+
+    print("--- Running batch_policy_eval.py self-test ---")
+    rng = np.random.default_rng(0)
+    interval = 5.0
+    trace = np.clip(40 + 35 * np.sin(np.arange(200) / 6.0) + rng.normal(0, 10, 200), 0, 100)
+    policies = np.array([
+        # up, down, cooldown, min, max, up N-de-M, down N-de-M, up/down cooldown, estabilização
+        [60, 25, 20, 1, 3, 1, 1, 1, 1, np.nan, np.nan, 0],
+        [70, 20, 0, 1, 5, 1, 1, 1, 1, np.nan, np.nan, 0],
+        [50, 30, 40, 2, 4, 1, 1, 1, 1, np.nan, np.nan, 0],
+        [60, 25, 20, 1, 5, 2, 3, 3, 4, np.nan, np.nan, 0],
+        [55, 30, 20, 1, 5, 1, 1, 1, 1, 5, 60, 0],
+        [55, 30, 0, 1, 5, 2, 2, 1, 1, np.nan, np.nan, 30],
+    ], dtype=float)
+    result = evaluate_policies(trace, policies, interval, pulse_damping=False)
+
+    # Mesmo traço no Autoscaler real (sem detector de pulsos), com relógio virtual (sem carga redistribuída)
+    for p, row in enumerate(policies):
+        saved = {k: getattr(config, k, None) for k in POLICY_COLUMNS}
+        for name, value in zip(POLICY_COLUMNS, row):
+            setattr(config, name, None if np.isnan(value) else
+                    (int(value) if name in ("MIN_INSTANCES", "MAX_INSTANCES") else value))
+        lo = int(row[3])
+        clock = [1_000_000.0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            autoscaler = autoscaler_logic.Autoscaler(clock=lambda: clock[0])
+            n = lo
+            expected = []
+            for t, cpu in enumerate(trace):
+                clock[0] = 1_000_000.0 + t * interval
+                decision = autoscaler.decide_scaling(cpu, n)
+                n += {"SCALE_UP": 1, "SCALE_DOWN": -1}.get(decision, 0)
+                expected.append(n)
+        for k, v in saved.items():
+            setattr(config, k, v)
+        assert list(result.instances[:, p]) == expected, p
+    print(f"Matches autoscaler_logic.Autoscaler on {len(policies)} policies x 200 ticks")
+
+    hour = np.clip(50 + 40 * np.sin(np.arange(3600) / 30.0) + rng.normal(0, 15, 3600), 0, 100)
+    many = np.column_stack([rng.uniform(40, 95, 10_000), rng.uniform(5, 40, 10_000), rng.uniform(0, 120, 10_000)])
+    t0 = time.perf_counter()
+    result = evaluate_policies(hour, many, 1.0, recorded_instances=np.full(3600, 2.0), pulse_damping=False)
+    print(f"10000 policies x 3600 ticks (1h per-second trace): {time.perf_counter() - t0:.2f}s, "
+          f"cheapest ${result.costs.min():.4f}, most expensive ${result.costs.max():.4f}")
+    print("--- batch_policy_eval.py self-test complete ---")
@@ -0,0 +1,183 @@
+# edos_docker_simulation/cgroup_stats.py
+"""
+Leitura direta das métricas dos contêineres no cgroup v2 (/sys/fs/cgroup).
+
+Cada amostra custa algumas leituras de arquivos pequenos (microssegundos), contra
+~1-2s de uma chamada stats(stream=False) na API do Docker ou do subprocesso
+`docker stats`. Usado pelo `StatsCollector` no modo "cgroup".
+
+Arquivos lidos por contêiner:
+    cpu.stat        -> usage_usec (tempo de CPU cumulativo)
+    memory.current  -> memória total do cgroup (inclui page cache)
+    memory.stat     -> inactive_file / file (cache descontado como no `docker stats`)
+    io.stat         -> rbytes/wbytes/rios/wios por dispositivo
+"""
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Onde o Docker cria o cgroup de cada contêiner (driver systemd e driver cgroupfs)
+_CANDIDATE_PATHS = (
+    "system.slice/docker-{id}.scope",
+    "docker/{id}",
+)
+
+
+class CgroupUnavailable(Exception):
+    """
+    O cgroup do contêiner não foi encontrado/legível (o chamador deve usar a API do Docker).
+    """
+
+
+def cgroup_v2_available(root: str = CGROUP_ROOT) -> bool:
+    """
+    True se /sys/fs/cgroup é uma hierarquia cgroup v2 legível.
+    """
+    return os.access(os.path.join(root, "cgroup.controllers"), os.R_OK)
+
+
+def _read_int(path: str) -> int:
+    with open(path, "rb") as f:
+        return int(f.read().strip() or 0)
+
+
+def _read_flat_keyed(path: str) -> Dict[str, int]:
+    """
+    Arquivos "chave valor" por linha (cpu.stat, memory.stat).
+    """
+    values = {}
+    with open(path, "rb") as f:
+        for line in f:
+            key, _, value = line.partition(b" ")
+            try:
+                values[key.decode()] = int(value)
+            except ValueError:
+                continue
+    return values
+
+
+def _read_io_stat(path: str) -> Dict[str, int]:
+    """
+    Soma rbytes/wbytes/rios/wios de todos os dispositivos em io.stat.
+    """
+    totals = {"rbytes": 0, "wbytes": 0, "rios": 0, "wios": 0}
+    try:
+        with open(path, "rb") as f:
+            for line in f:
+                for field in line.split()[1:]:
+                    key, _, value = field.partition(b"=")
+                    key = key.decode()
+                    if key in totals:
+                        totals[key] += int(value)
+    except FileNotFoundError:
+        pass  # controlador io não habilitado para o cgroup
+    return totals
+
+
+class CgroupStatsReader:
+    """
+    Resolve o diretório de cgroup de cada contêiner e calcula as métricas no mesmo
+    formato de `StatsCollector._compute_metrics` a partir de deltas sobre o relógio
+    monotônico.
+
+    `cpu_window_seconds` define a janela do cpu_percent publicado (comparável ao ~1s
+    do `docker stats`), mas cada amostra gera um valor novo: a resolução é o intervalo
+    de amostragem. `cpu_percent_instant` é o valor só do último intervalo.
+    """
+    def __init__(self, root: str = CGROUP_ROOT, cpu_window_seconds: float = 1.0):
+        self.root = root
+        self.cpu_window_ns = int(cpu_window_seconds * 1e9)
+        self._paths: Dict[str, str] = {}
+        # id -> amostras (monotonic_ns, usage_usec, rbytes, wbytes) dentro da janela
+        self._history: Dict[str, Deque[Tuple[int, int, int, int]]] = {}
+
+    def resolve(self, container_id: str, pid: Optional[int] = None) -> str:
+        """
+        Diretório do cgroup do contêiner. Tenta os caminhos padrão do Docker e, com o PID
+        do processo principal, o caminho informado em /proc/<pid>/cgroup.
+        """
+        path = self._paths.get(container_id)
+        if path is not None:
+            return path
+        candidates = [os.path.join(self.root, p.format(id=container_id)) for p in _CANDIDATE_PATHS]
+        if pid:
+            try:
+                with open(f"/proc/{pid}/cgroup") as f:
+                    for line in f:
+                        if line.startswith("0::"):
+                            candidates.append(os.path.join(self.root, line[3:].strip().lstrip("/")))
+            except OSError:
+                pass
+        for candidate in candidates:
+            if os.access(os.path.join(candidate, "cpu.stat"), os.R_OK):
+                self._paths[container_id] = candidate
+                return candidate
+        raise CgroupUnavailable(container_id)
+
+    def is_resolved(self, container_id: str) -> bool:
+        return container_id in self._paths
+
+    def forget(self, keep_ids: Iterable[str]):
+        """
+        Descarta o estado dos contêineres que não estão mais em `keep_ids`.
+        """
+        keep = set(keep_ids)
+        for cid in [c for c in self._paths if c not in keep]:
+            self._paths.pop(cid, None)
+            self._history.pop(cid, None)
+
+    def sample(self, container_id: str, name: str = "") -> Optional[dict]:
+        """
+        Lê os arquivos do cgroup e retorna as métricas, ou None na primeira amostra
+        (ainda sem delta de CPU). Levanta CgroupUnavailable se o cgroup sumiu ou
+        não foi resolvido.
+        """
+        path = self._paths.get(container_id)
+        if path is None:
+            raise CgroupUnavailable(container_id)
+        try:
+            now_ns = time.monotonic_ns()
+            usage_usec = _read_flat_keyed(os.path.join(path, "cpu.stat")).get("usage_usec", 0)
+            mem_current = _read_int(os.path.join(path, "memory.current"))
+            mem_stat = _read_flat_keyed(os.path.join(path, "memory.stat"))
+            io = _read_io_stat(os.path.join(path, "io.stat"))
+        except (FileNotFoundError, ProcessLookupError, OSError):
+            # Contêiner parou e o cgroup foi removido
+            self._paths.pop(container_id, None)
+            self._history.pop(container_id, None)
+            raise CgroupUnavailable(container_id)
+
+        history = self._history.setdefault(container_id, deque())
+        history.append((now_ns, usage_usec, io["rbytes"], io["wbytes"]))
+        if len(history) < 2:
+            return None
+        # Mantém a amostra mais recente que ainda cobre a janela inteira
+        while len(history) > 2 and now_ns - history[1][0] >= self.cpu_window_ns:
+            history.popleft()
+
+        first_ns, first_usage, first_rbytes, first_wbytes = history[0]
+        prev_ns, prev_usage, _, _ = history[-2]
+        window_us = max((now_ns - first_ns) / 1000.0, 1.0)
+        last_us = max((now_ns - prev_ns) / 1000.0, 1.0)
+        window_s = window_us / 1e6
+
+        cache_mem = mem_stat.get("inactive_file", mem_stat.get("file", 0))
+        app_mem = max(mem_current - cache_mem, 0)
+        return {
+            "id": container_id,
+            "name": name,
+            # % de um núcleo, como no `docker stats` (pode passar de 100 com vários núcleos)
+            "cpu_percent": (usage_usec - first_usage) / window_us * 100.0,
+            "cpu_percent_instant": (usage_usec - prev_usage) / last_us * 100.0,
+            "mem_app_mb": app_mem / (1024 * 1024),
+            "raw_mem_usage": mem_current,
+            "cache_mem": cache_mem,
+            "io_read_bytes": io["rbytes"],
+            "io_write_bytes": io["wbytes"],
+            "io_read_bps": (io["rbytes"] - first_rbytes) / window_s,
+            "io_write_bps": (io["wbytes"] - first_wbytes) / window_s,
+            "read_ts": now_ns / 1e9,
+        }
@@ -0,0 +1,96 @@
+# edos_docker_simulation/cluster_metrics.py
+"""
+Agregação da métrica do cluster (CPU por instância -> um número para o autoscaler),
+ciente do warm-up das instâncias.
+
+Uma instância recém-pronta ainda não recebeu tráfego (os alvos dos geradores só são
+trocados depois da decisão) e reporta ~0% de CPU; na média simples ela puxa o cluster
+para baixo de CPU_THRESHOLD_SCALE_DOWN logo depois de um scale-up. Aqui cada instância
+entra com a idade desde que ficou pronta e, dentro de CLUSTER_METRIC_WARMUP_SECONDS:
+
+    "exclude"     -> fica fora da agregação (e é registrada como excluída no tick)
+    "down_weight" -> peso proporcional à fração do warm-up já cumprida (0 -> 1)
+    "none"        -> conta como as demais (comportamento antigo)
+
+Agregações (CLUSTER_METRIC_AGGREGATION):
+    "mean"             -> média (ponderada pelo warm-up)
+    "request_weighted" -> média ponderada pelas requisições roteadas a cada instância no intervalo
+    "max" / "pNN"      -> máximo / percentil entre as instâncias (as em warm-up ficam sempre fora,
+                          exceto em "none": peso fracionário não tem sentido para um percentil)
+
+Se todas as instâncias estão em warm-up, a agregação usa todas (não há outra medida).
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+WARMUP_MODES = ("exclude", "down_weight", "none")
+
+
+class InstanceSample:
+    """
+    Valor de uma instância no tick, com a idade desde que ficou pronta e (opcional) as
+    requisições que recebeu no intervalo.
+    """
+    __slots__ = ("name", "value", "age_seconds", "requests")
+
+    def __init__(self, name: str, value: float, age_seconds: float, requests: Optional[float] = None):
+        self.name = name
+        self.value = value
+        self.age_seconds = age_seconds
+        self.requests = requests
+
+
+def _warmup_weight(age_seconds: float, warmup_seconds: float) -> float:
+    if warmup_seconds <= 0 or age_seconds >= warmup_seconds:
+        return 1.0
+    return max(0.0, age_seconds / warmup_seconds)
+
+
+def aggregate(samples: Iterable[InstanceSample], aggregation: Optional[str] = None,
+              warmup_seconds: Optional[float] = None, warmup_mode: Optional[str] = None) -> Tuple[float, List[str]]:
+    """
+    (valor agregado, nomes das instâncias excluídas ou com peso reduzido por warm-up).
+    """
+    aggregation = aggregation or getattr(config, "CLUSTER_METRIC_AGGREGATION", "mean")
+    warmup_seconds = getattr(config, "CLUSTER_METRIC_WARMUP_SECONDS", 0) if warmup_seconds is None else warmup_seconds
+    warmup_mode = warmup_mode or getattr(config, "CLUSTER_METRIC_WARMUP_MODE", "exclude")
+    if warmup_mode not in WARMUP_MODES:
+        raise ValueError(f"Unknown warm-up mode '{warmup_mode}'. Options: {', '.join(WARMUP_MODES)}")
+    samples = list(samples)
+    if not samples:
+        return 0.0, []
+
+    weights: Dict[str, float] = {}
+    for s in samples:
+        weights[s.name] = 1.0 if warmup_mode == "none" else _warmup_weight(s.age_seconds, warmup_seconds)
+    warming = [s.name for s in samples if weights[s.name] < 1.0]
+    if len(warming) == len(samples):
+        weights = dict.fromkeys(weights, 1.0)
+        warming = []
+    if warmup_mode == "exclude" or aggregation == "max" or aggregation.startswith("p"):
+        weights = {name: (1.0 if w >= 1.0 else 0.0) for name, w in weights.items()}
+
+    if aggregation == "request_weighted":
+        # Sem requisições nas instâncias que contam (só as em warm-up receberam, ou nenhuma
+        # contagem no intervalo) cai na média ponderada pelo warm-up
+        if any(weights[s.name] * (s.requests or 0.0) > 0 for s in samples):
+            weights = {s.name: weights[s.name] * (s.requests or 0.0) for s in samples}
+        aggregation = "mean"
+
+    if aggregation == "mean":
+        total = sum(weights[s.name] for s in samples)
+        if total <= 0:
+            return 0.0, warming
+        return sum(s.value * weights[s.name] for s in samples) / total, warming
+
+    values = sorted(s.value for s in samples if weights[s.name] > 0)
+    if not values:
+        return 0.0, warming
+    if aggregation == "max":
+        return values[-1], warming
+    if aggregation.startswith("p"):
+        rank = max(1, math.ceil(float(aggregation[1:]) / 100.0 * len(values)))
+        return values[rank - 1], warming
+    raise ValueError(f"Unknown cluster aggregation '{aggregation}'. Options: mean, request_weighted, max, pNN")
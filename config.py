@@ -3,6 +3,8 @@
 # --- Configurações da Simulação ---
 SIMULATION_DURATION_SECONDS = 180  # Total duration of the simulation
 ATTACK_START_TIME_SECONDS = 30     # When the attack begins
+# Ataque ligado se > 0 (pulsos de ATTACK_START_TIME_SECONDS até o fim); 0 = só tráfego normal
+ATTACK_DURATION_SECONDS = SIMULATION_DURATION_SECONDS - ATTACK_START_TIME_SECONDS
 PULSE_DURATION = 5
 
 
@@ -11,6 +13,8 @@ DOCKER_IMAGE_NAME = "edos_target_app:latest" # Matches the image you built
 BASE_CONTAINER_NAME = "target_instance"    # Base name for your containers (e.g., target_instance_1)
 DOCKER_NETWORK_NAME = "edos_network"       # Matches the network you created
 STARTING_HOST_PORT = 8080 # Host port for the first container instance (8080 -> 80, 8081 -> 80, etc.)
+APP_WORKERS = 1           # Processos do simple_server por instância (env WORKERS; >1 = prefork, "auto" = nº de CPUs)
+INSTANCE_CPUS = None      # Cota de CPU por contêiner (ex.: 2.0); None = sem limite. Combine com APP_WORKERS
 # For app/simple_server.py to be configurable (optional, already defaults to 80 internally)
 # CONTAINER_APP_PORT = 80
 
@@ -21,7 +25,63 @@ MAX_INSTANCES = 3  # Start small for local testing on your VM
 CPU_THRESHOLD_SCALE_UP = 60.0   # % CPU average to trigger scale up
 CPU_THRESHOLD_SCALE_DOWN = 25.0 # % CPU average to trigger scale down
 SCALE_COOLDOWN_SECONDS = 20     # Cooldown period between scaling actions
+SCALE_UP_COOLDOWN_SECONDS = None   # Cooldown antes de um scale-up (None = SCALE_COOLDOWN_SECONDS)
+SCALE_DOWN_COOLDOWN_SECONDS = None # Cooldown antes de um scale-down (None = SCALE_COOLDOWN_SECONDS)
+# Histerese N-de-M: escala quando N das últimas M avaliações cruzaram o limiar (1 de 1 = primeira amostra)
+SCALE_UP_BREACHES_REQUIRED = 1
+SCALE_UP_EVALUATION_PERIODS = 1
+SCALE_DOWN_BREACHES_REQUIRED = 1
+SCALE_DOWN_EVALUATION_PERIODS = 1
+SCALE_DOWN_STABILIZATION_SECONDS = 0 # Scale-down só se a maior recomendação desta janela ficar abaixo do nº atual
 MONITOR_INTERVAL_SECONDS = 5    # How often to check metrics and consider scaling
+# Warm pool: instâncias pré-criadas para o scale-up (0 desativa; scale-up volta a ser cold start)
+#   "paused"  -> contêiner já rodando e pausado: o scale-up é um unpause (milissegundos)
+#   "created" -> contêiner criado (porta/rede atribuídas) mas não iniciado: o scale-up é um start
+WARM_POOL_SIZE = 0
+WARM_POOL_MODE = "paused"
+# Readiness: após criar/ativar uma instância, sonda HTTP com backoff exponencial até o primeiro 200
+READINESS_PROBE_PATH = "/?work=0&sleep=0"    # Requisição barata (work=0: nenhum kernel de carga roda)
+READINESS_TIMEOUT_SECONDS = 15.0             # Prazo total; estourado, a instância é descartada
+READINESS_INITIAL_BACKOFF_SECONDS = 0.01     # Primeira espera entre tentativas (dobra a cada falha)
+READINESS_MAX_BACKOFF_SECONDS = 0.5          # Teto da espera entre tentativas
+SCALING_EXECUTOR_WORKERS = 0                 # Threads para start/stop em background (0 = MAX_INSTANCES: o delta inteiro em paralelo)
+# Coleta de métricas dos contêineres:
+#   "poll"   -> varredura sequencial stats(stream=False) na API do Docker (~1-2s por contêiner)
+#   "stream" -> uma assinatura stats(stream=True) por contêiner (cache renovado a cada ~1s)
+#   "cgroup" -> leitura direta de /sys/fs/cgroup (cgroup v2); usa "stream" se não for legível
+DOCKER_STATS_MODE = "poll"  # padrão = amostragem do baseline
+CGROUP_SAMPLE_INTERVAL_SECONDS = 0.05 # Intervalo entre leituras do cgroupfs
+CGROUP_CPU_WINDOW_SECONDS = 1.0       # Janela do cpu_percent publicado (comparável ao docker stats)
+# Séries temporais por contêiner (buffers circulares): janelas com média/máximo/percentil incrementais
+STATS_WINDOWS_SECONDS = (10, 60)
+STATS_CPU_HIST_MAX_PERCENT = None  # Topo do histograma de CPU% (None = 100 x CPUs do host)
+STATS_MEM_HIST_MAX_MB = 2048.0     # Topo do histograma de memória (MB)
+# Métrica de CPU usada pelo autoscaler: estatística da janela recente em vez da amostra instantânea
+AUTOSCALER_METRIC_WINDOW_SECONDS = 0   # 0 = amostra instantânea (comportamento antigo); ex.: 10 liga a janela
+AUTOSCALER_METRIC_STATISTIC = "mean"   # "mean", "max" ou "pNN" (ex.: "p95")
+# Agregação entre instâncias da métrica do autoscaler (ver cluster_metrics.py)
+CLUSTER_METRIC_AGGREGATION = "mean"    # "mean", "request_weighted", "max" ou "pNN"
+CLUSTER_METRIC_WARMUP_SECONDS = 10     # Instância recém-pronta fica em warm-up por este tempo
+CLUSTER_METRIC_WARMUP_MODE = "exclude" # "exclude", "down_weight" (peso cresce até 1) ou "none"
+# --- Política de Autoscaling ---
+AUTOSCALER_POLICY = "threshold"  # "threshold" (reativa), "predictive" (escala pela CPU prevista) ou "target_tracking"
+PREDICTIVE_HORIZON_INTERVALS = 3 # Quantos MONITOR_INTERVAL_SECONDS à frente a política preditiva olha
+PREDICTIVE_ALPHA = 0.5           # Suavização do nível (Holt)
+PREDICTIVE_BETA = 0.3            # Suavização da tendência (0 = EWMA simples, sem tendência)
+PREDICTIVE_ERROR_WINDOW = 20     # Nº de previsões usadas no erro médio absoluto (cpu_forecast_mae)
+# Target tracking (AUTOSCALER_POLICY = "target_tracking"): desired = ceil(prontas * métrica / alvo)
+TARGET_TRACKING_METRIC = "cpu"   # "cpu", "p95_rtt" ou "rps_per_instance"
+TARGET_CPU_PERCENT = 50.0        # Alvo de CPU média por instância
+TARGET_P95_RTT_MS = 200.0        # Alvo de p95 do RTT do tráfego normal
+TARGET_RPS_PER_INSTANCE = 20.0   # Alvo de requisições/s por instância pronta
+TARGET_TRACKING_TOLERANCE = 0.1  # |métrica/alvo - 1| dentro disso não escala
+TARGET_SCALE_UP_STABILIZATION_SECONDS = 0     # Sobe pela menor recomendação desta janela (0 = imediato)
+TARGET_SCALE_DOWN_STABILIZATION_SECONDS = 60  # Desce pela maior recomendação desta janela
+# --- Detecção de pulsos (EDoS) por periodicidade da carga ---
+PULSE_DETECTOR_DAMPING = True        # Amortece scale-up em carga pulsada (False = só registra o veredito)
+PULSE_DETECTOR_HISTORY_TICKS = 48    # Ticks de histórico usados na autocorrelação
+PULSE_DETECTOR_MIN_CONFIDENCE = 0.5  # Autocorrelação mínima no período para o veredito "pulsed"
+PULSE_DETECTOR_MAX_DUTY_CYCLE = 0.5  # Fração máxima do tempo acima do limiar de scale-up para ser "pulso"
 
 # --- Configurações de Tráfego ---
 # For tcpreplay (if you get to it)
@@ -32,6 +92,20 @@ TCPREPLAY_INTERFACE = "docker0" # Or the interface for your edos_network bridge
 HTTP_ATTACK_TARGET_URL_BASE = "http://localhost" # The orchestrator will add the host port
 HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER = 4 # RPS per attacking thread --- 5 foi um valor incial com bom resultado
 HTTP_ATTACK_NUM_ATTACKERS = 4 # Number of concurrent attacking threads/processes  -- 2 foi um valor incial com bom resultado
+# Motor do ataque: "threads" (um requests.Session bloqueante por atacante) ou
+# "asyncio" (open-loop: envios em cronograma fixo, independente da latência das respostas)
+HTTP_ATTACK_ENGINE = "threads"
+# Máximo de requisições simultâneas em voo no motor asyncio (limitado também pelo ulimit -n)
+HTTP_ASYNC_MAX_IN_FLIGHT = 10000
+HTTP_PREWARM_CONNECTIONS = 4 # Conexões abertas antecipadamente com cada instância nova (troca de alvos a quente)
+# Conexões keep-alive ociosas há mais que isso são descartadas em vez de reaproveitadas.
+# Mantenha abaixo do KEEPALIVE_TIMEOUT do simple_server (5 s), que fecha as ociosas do lado dele
+HTTP_KEEPALIVE_IDLE_SECONDS = 4.0
+# Balanceamento no cliente (por requisição) usado pelos geradores de tráfego:
+#   "static" (worker i fixo no alvo i % n), "round_robin", "least_outstanding",
+#   "p2c" (power-of-two-choices pela latência observada) ou "weighted"
+HTTP_LB_STRATEGY = "static"
+HTTP_LB_WEIGHTS = {} # Pesos do "weighted" por URL ou "host:porta" (ausente = 1)
 
 # --- Configurações de Custo (Fictício) ---
 COST_PER_INSTANCE_PER_HOUR = 0.02 # Example cost
@@ -39,9 +113,17 @@ COST_PER_INSTANCE_PER_HOUR = 0.02 # Example cost
 
 # --- Nomes de arquivos de Log ---
 METRICS_LOG_FILE = "simulation_metrics.csv"
+METRICS_RUN_FILE = "simulation_metrics.edosrun" # Run binário colunar (o CSV acima é exportado dele no fim)
+METRICS_FLUSH_ROWS = 512                         # Linhas acumuladas antes de gravar um bloco
+METRICS_FLUSH_INTERVAL_SECONDS = 1.0             # Gravação periódica mesmo com poucas linhas
 
 # ... outras configurações ...
 HTTP_REQUEST_TIMEOUT_SECONDS = 10.0 # Timeout para cada requisição HTTP individual (em segundos)
+# Origem da medição de latência nos geradores de tráfego:
+#   "service"  -> a partir do envio real da requisição (esconde o tempo de fila quando o worker atrasa)
+#   "intended" -> a partir do instante previsto pelo cronograma de RPS (corrige coordinated omission;
+#                 o worker segue um cronograma fixo e envia imediatamente quando está atrasado)
+LATENCY_MEASUREMENT_MODE = "service"
 APP_CONTAINER_PORT = 80
 
 #Normal traffic metrics
@@ -49,6 +131,15 @@ APP_CONTAINER_PORT = 80
 HTTP_NORMAL_RPS_PER_CLIENT = 4
 HTTP_NORMAL_NUM_CLIENTS = 4
 
+# --- Geração de tráfego multi-processo (shards) ---
+# Número de processos entre os quais os atacantes/clientes são divididos (0 = tudo no processo do orquestrador).
+# Cada shard roda o motor asyncio open-loop e publica seus contadores em memória compartilhada.
+HTTP_ATTACK_PROCESS_SHARDS = 0
+HTTP_NORMAL_PROCESS_SHARDS = 0
+# Núcleos de CPU onde fixar os shards (o shard i usa CORES[i % len(CORES)]). Lista vazia = sem afinidade.
+HTTP_ATTACK_SHARD_CPU_CORES = []
+HTTP_NORMAL_SHARD_CPU_CORES = []
+
 
 # --- Configurações de Ataque EDoS (pulsado) ---
 # Duração de um único pulso de tráfego intenso.
@@ -78,10 +169,33 @@ EDOS_SATURATION_PHASE_DURATION_SECONDS = 60
 
 #SIMPLE SERVER ATTACK PARAMETERS
 
-ATTACK_WORK_UNITS = 1000000
+# work = milissegundos de CPU calibrados pelo servidor (não mais iterações do laço)
+# kernel = "cpu" (aritmética pura), "memory" (largura de banda sobre um buffer de *_SIZE_KB),
+#          "alloc" (alocação de objetos pequenos / GC) ou "io" (escrita com fsync; work = ms bloqueado)
+ATTACK_WORK_UNITS = 250       # ms de CPU por requisição de ataque (~o antigo laço de 1e6 iterações)
+ATTACK_KERNEL = "cpu"
+ATTACK_SIZE_KB = 0            # buffer do kernel "memory" (0 = MEMORY_KERNEL_KB do servidor)
 ATTACK_SLEEP = 0.00
 
 #SIMPLE SERVER NORMAL TRAFFIC PARAMETERS
 
-NORMAL_WORK_UNITS = 10
+NORMAL_WORK_UNITS = 2         # ms de CPU por requisição normal
+NORMAL_KERNEL = "cpu"
+NORMAL_SIZE_KB = 0
 NORMAL_SLEEP =0.0
+
+# --- Simulação por eventos discretos (des_simulator.py, sem Docker) ---
+# Modelo de filas do simple_server: c servidores FIFO por instância e tempo de serviço por classe.
+# Calibre os tempos com: python des_simulator.py --calibrate simulation_metrics.csv
+SIM_SERVERS_PER_INSTANCE = 1               # ThreadingHTTPServer + GIL: ~1 núcleo efetivo por instância (= APP_WORKERS no prefork)
+SIM_NORMAL_SERVICE_TIME_SECONDS = 0.002    # Tempo médio de CPU de uma requisição normal (= NORMAL_WORK_UNITS ms com kernel "cpu")
+SIM_ATTACK_SERVICE_TIME_SECONDS = 0.25     # Tempo médio de CPU de uma requisição de ataque (= ATTACK_WORK_UNITS ms com kernel "cpu")
+SIM_SERVICE_TIME_DISTRIBUTION = "exponential" # "exponential" ou "deterministic"
+SIM_COLD_STARTUP_SECONDS = 1.5             # Decisão -> primeiro HTTP 200 (cold start)
+SIM_WARM_STARTUP_SECONDS = 0.05            # Decisão -> primeiro HTTP 200 (instância do warm pool)
+SIM_CPU_SAMPLE_SECONDS = 1.0               # Cadência das amostras de CPU para a métrica em janela (AUTOSCALER_METRIC_WINDOW_SECONDS)
+SIM_INSTANCE_MEM_MB = 12.0                 # Memória reportada por instância (constante no modelo)
+
+# --- Varredura de parâmetros (param_sweep.py) ---
+SWEEP_DB_FILE = "sweep_results.sqlite" # Tabela de resultados (um registro por ponto x seed)
+SWEEP_WORKERS = 0                      # Processos do backend "sim" (0 = nº de CPUs)
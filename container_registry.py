@@ -0,0 +1,181 @@
+# edos_docker_simulation/container_registry.py
+"""
+Registro das instâncias em execução, mantido pelo stream de eventos do Docker.
+
+Antes, o loop principal chamava `c_obj.reload()` em todo contêiner a cada tick só para
+reler `NetworkSettings.Ports` (um inspect completo por contêiner por tick), embora o
+mapeamento de portas não mude depois do start. Aqui o endpoint é extraído uma única vez,
+no registro, e o estado é atualizado por uma thread que consome
+`client.events(filters={"type": "container", ...})`: quando um contêiner registrado
+morre (die/stop/oom/destroy), ele sai do registro e os assinantes são avisados na hora,
+sem polling.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Eventos de contêiner acompanhados; todos exceto "start" tiram a instância de serviço
+WATCHED_EVENTS = ("start", "die", "stop", "oom", "destroy")
+EXIT_EVENTS = ("die", "stop", "oom", "destroy")
+
+
+class ContainerRecord:
+    """
+    Endpoint e estado de um contêiner registrado.
+    """
+    __slots__ = ("name", "id", "host_port", "url", "state", "oom_killed", "exit_code")
+
+    def __init__(self, name: str, container_id: str, host_port: Optional[str], host: str = "localhost"):
+        self.name = name
+        self.id = container_id
+        self.host_port = host_port
+        self.url = f"http://{host}:{host_port}" if host_port else None
+        self.state = "running"          # "running" | "exited"
+        self.oom_killed = False
+        self.exit_code: Optional[int] = None
+
+
+ExitListener = Callable[[ContainerRecord, str], None]
+
+
+def _host_port_from_attrs(attrs: dict, container_port) -> Optional[str]:
+    key = f"{container_port}/tcp"
+    bindings = ((attrs.get("NetworkSettings") or {}).get("Ports") or {}).get(key)
+    if not bindings:
+        # Logo após o create/run o NetworkSettings ainda pode estar vazio; o pedido de mapeamento já está no HostConfig
+        bindings = ((attrs.get("HostConfig") or {}).get("PortBindings") or {}).get(key)
+    if bindings and isinstance(bindings, list):
+        return bindings[0].get("HostPort") or None
+    return None
+
+
+class ContainerRegistry:
+    """
+    Cache {nome: ContainerRecord} atualizado pelos eventos do Docker.
+
+    `subscribe(listener)` registra `listener(record, event)`, chamado na thread de eventos
+    quando um contêiner registrado sai de serviço (uma vez por contêiner).
+    """
+    def __init__(self, client, name_prefix: str, container_port=80, host: str = "localhost"):
+        self.client = client
+        self.name_prefix = name_prefix
+        self.container_port = container_port
+        self.host = host
+        self._records: Dict[str, ContainerRecord] = {}
+        self._listeners: List[ExitListener] = []
+        self._lock = threading.Lock()
+        self._stop_evt = threading.Event()
+        self._stream = None
+        self._t = threading.Thread(target=self._run, name="DockerEventsRegistry", daemon=True)
+
+    # --------- API pública ---------
+    def start(self):
+        self._t.start()
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        self._stop_evt.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close() # desbloqueia a leitura do stream de eventos
+            except Exception:
+                pass
+        if self._t.is_alive():
+            self._t.join(timeout=timeout)
+
+    def subscribe(self, listener: ExitListener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def register(self, container) -> ContainerRecord:
+        """
+        Guarda o endpoint do contêiner. Usa os attrs já carregados; só faz um inspect
+        (reload) se o mapeamento de portas ainda não estiver neles.
+        """
+        host_port = _host_port_from_attrs(container.attrs or {}, self.container_port)
+        if host_port is None:
+            try:
+                container.reload()
+                host_port = _host_port_from_attrs(container.attrs or {}, self.container_port)
+            except Exception as e:
+                print(f"[Registry] Warning: could not inspect {container.name}: {e}")
+        if host_port is None:
+            print(f"[Registry] Warning: no '{self.container_port}/tcp' host port for {container.name}.")
+        record = ContainerRecord(container.name, container.id, host_port, self.host)
+        with self._lock:
+            self._records[container.name] = record
+        return record
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._records.pop(name, None)
+
+    def get(self, name: str) -> Optional[ContainerRecord]:
+        with self._lock:
+            return self._records.get(name)
+
+    def urls(self, containers: Iterable) -> List[str]:
+        """
+        URLs dos contêineres (objetos ou nomes) que estão registrados e em execução, na ordem dada.
+        """
+        with self._lock:
+            records = [self._records.get(getattr(c, "name", c)) for c in containers]
+        return [r.url for r in records if r is not None and r.state == "running" and r.url]
+
+    # --------- Thread de eventos ---------
+    def _run(self):
+        since = int(time.time())
+        while not self._stop_evt.is_set():
+            try:
+                self._stream = self.client.events(
+                    since=since, decode=True,
+                    filters={"type": "container", "event": list(WATCHED_EVENTS)})
+                for event in self._stream:
+                    since = int(event.get("time", since))
+                    self._handle(event)
+                    if self._stop_evt.is_set():
+                        break
+            except Exception as e:
+                if self._stop_evt.is_set():
+                    break
+                # Daemon reiniciado ou conexão caiu: reconecta retomando de `since`
+                print(f"[Registry] Docker events stream error: {e}. Reconnecting...")
+                self._stop_evt.wait(1.0)
+            finally:
+                stream, self._stream = self._stream, None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+
+    def _handle(self, event: dict):
+        action = event.get("Action") or event.get("status", "")
+        action = action.split(":", 1)[0] # ex.: "exec_start: ..." -> "exec_start"
+        attributes = (event.get("Actor") or {}).get("Attributes") or {}
+        name = attributes.get("name", "")
+        if not name.startswith(self.name_prefix):
+            return
+        with self._lock:
+            record = self._records.get(name)
+            if record is None:
+                return
+            if action == "start":
+                record.state = "running"
+                return
+            if action not in EXIT_EVENTS:
+                return
+            if action == "oom":
+                record.oom_killed = True
+            if action == "die" and attributes.get("exitCode") is not None:
+                record.exit_code = int(attributes["exitCode"])
+            if record.state != "running":
+                return # já notificado (ex.: "stop" seguido de "die")
+            record.state = "exited"
+            del self._records[name]
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(record, action)
+            except Exception as e:
+                print(f"[Registry] Listener error: {e}")
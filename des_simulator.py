@@ -0,0 +1,578 @@
+# edos_docker_simulation/des_simulator.py
+"""
+Backend de simulação por eventos discretos (relógio virtual, sem Docker nem HTTP).
+
+Um cenário de 180s levava 180s de relógio mais o overhead do Docker. Aqui o mesmo fluxo
+de controle do `main_orchestrator` (tick a cada MONITOR_INTERVAL_SECONDS, decisão do
+`autoscaler_logic.Autoscaler`, janelas de pulso do ataque, tráfego normal desligado
+durante o pulso) roda sobre um relógio virtual, e `docker_manager` + geradores HTTP são
+substituídos por um modelo de filas do `app/simple_server.py`:
+
+    - cada instância é uma fila FIFO com `c` servidores (SIM_SERVERS_PER_INSTANCE; o
+      ThreadingHTTPServer é limitado pelo GIL, então o padrão é 1);
+    - chegadas Poisson por classe (normal/ataque) na taxa configurada, distribuídas em
+      round-robin entre as instâncias prontas;
+    - tempo de serviço por classe (SIM_*_SERVICE_TIME_SECONDS), calibrável a partir de um
+      CSV de execução real com `calibrate_service_times`;
+    - CPU% da instância = tempo ocupado dos servidores no intervalo / intervalo * 100;
+    - a métrica do autoscaler segue o orquestrador: com AUTOSCALER_METRIC_WINDOW_SECONDS > 0,
+      cada instância amostra a CPU a cada SIM_CPU_SAMPLE_SECONDS (cadência do StatsCollector)
+      numa RingSeries e decide-se pela AUTOSCALER_METRIC_STATISTIC da janela;
+    - scale-up fica pronto após SIM_WARM/COLD_STARTUP_SECONDS (warm pool com reposição).
+
+O Autoscaler roda sem modificações com o relógio virtual injetado. O resultado usa o
+mesmo esquema de CSV do orquestrador (metrics_schema.py).
+
+Uso:
+    python des_simulator.py [--csv saida.csv] [--seed N] [--calibrate simulation_metrics.csv]
+"""
+import argparse
+import contextlib
+import csv
+import heapq
+import io
+import itertools
+import math
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import autoscaler_logic
+import config
+import cost_calculator
+from cluster_metrics import InstanceSample, aggregate
+from timeseries import RingSeries, window_stat
+from forecasting import LoadForecaster
+from latency_histogram import LatencyHistogram
+from metrics_schema import METRICS_CSV_FIELDNAMES, build_metrics_row
+from pulse_detector import PulseDetector
+
+# Época do relógio virtual: o Autoscaler começa com last_scale_action_time = 0, que com
+# time.time() significa "nunca escalou"; um relógio virtual a partir de 0 o deixaria em cooldown.
+VIRTUAL_EPOCH = 1_000_000.0
+
+NO_LAG = {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+
+class VirtualClock:
+    """
+    Relógio da simulação; `time()` tem a mesma forma de `time.time` (injetável no Autoscaler).
+    """
+    def __init__(self, epoch: float = VIRTUAL_EPOCH):
+        self.epoch = epoch
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.epoch + self.now
+
+
+class SimInstance:
+    """
+    Uma instância do simple_server como fila FIFO com `servers` servidores.
+    """
+    __slots__ = ("name", "servers", "busy", "queue", "routable", "busy_time", "last_change",
+                 "ready_at", "ready_since", "startup_ms", "routed", "busy_total", "sampled_busy",
+                 "sampled_at", "series")
+
+    def __init__(self, name: str, servers: int, now: float):
+        self.name = name
+        self.servers = servers
+        self.busy = 0
+        self.queue = deque()     # (instante de chegada, classe)
+        self.routable = False    # recebe tráfego (pronta e não drenando)
+        self.busy_time = 0.0     # servidor-segundos ocupados desde o último tick
+        self.last_change = now
+        self.ready_at: Optional[float] = None   # pronta durante o tick atual (zerado a cada coleta)
+        self.ready_since: Optional[float] = None  # quando ficou pronta (idade para o warm-up)
+        self.startup_ms: Optional[float] = None
+        self.routed = 0
+        self.busy_total = 0.0    # servidor-segundos ocupados desde a criação (não zera por tick)
+        self.sampled_busy = 0.0  # busy_total na última amostra da série
+        self.sampled_at = now
+        self.series: Optional[RingSeries] = None  # CPU% amostrada para a métrica em janela
+
+    def integrate(self, now: float):
+        busy = self.busy * (now - self.last_change)
+        self.busy_time += busy
+        self.busy_total += busy
+        self.last_change = now
+
+
+class Simulation:
+    """
+    Um cenário completo. `run()` devolve as linhas por tick (esquema do CSV) e um resumo.
+    """
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        self._events = []
+        self._seq = itertools.count()
+
+        self.interval = config.MONITOR_INTERVAL_SECONDS
+        self.duration = config.SIMULATION_DURATION_SECONDS
+        self.servers = getattr(config, "SIM_SERVERS_PER_INSTANCE", 1)
+        self.service_time = {
+            "normal": getattr(config, "SIM_NORMAL_SERVICE_TIME_SECONDS", 0.002),
+            "attack": getattr(config, "SIM_ATTACK_SERVICE_TIME_SECONDS", 0.25),
+        }
+        self.distribution = getattr(config, "SIM_SERVICE_TIME_DISTRIBUTION", "exponential")
+        self.cold_startup = getattr(config, "SIM_COLD_STARTUP_SECONDS", 1.5)
+        self.warm_startup = getattr(config, "SIM_WARM_STARTUP_SECONDS", 0.05)
+        self.instance_mem_mb = getattr(config, "SIM_INSTANCE_MEM_MB", 12.0)
+        self.timeout = getattr(config, "HTTP_REQUEST_TIMEOUT_SECONDS", 10.0)
+        # Métrica do autoscaler em janela, como o StatsCollector do orquestrador
+        self.metric_window = getattr(config, "AUTOSCALER_METRIC_WINDOW_SECONDS", 0)
+        self.metric_stat = getattr(config, "AUTOSCALER_METRIC_STATISTIC", "mean")
+        self.cpu_sample_interval = getattr(config, "SIM_CPU_SAMPLE_SECONDS", 1.0)
+
+        self.instances: List[SimInstance] = []   # ordem de criação (scale-down tira a última pronta)
+        self.starting: List[SimInstance] = []
+        self._next_id = itertools.count(1)
+        self._rr = 0
+        self.warm_available = max(0, getattr(config, "WARM_POOL_SIZE", 0))
+
+        self.rates = {"normal": 0.0, "attack": 0.0}
+        self._arrival_token = {"normal": 0, "attack": 0}
+        self.interval_hist = {"normal": LatencyHistogram(), "attack": LatencyHistogram()}
+        self.total_hist = {"normal": LatencyHistogram(), "attack": LatencyHistogram()}
+        self.routed_by_class = {"normal": {}, "attack": {}}
+        self.timeouts = 0
+        self.dropped = 0
+        self.ready_since_tick: List[SimInstance] = []
+
+    # --------- Motor de eventos ---------
+    def _schedule(self, at: float, fn, *args):
+        heapq.heappush(self._events, (at, next(self._seq), fn, args))
+
+    def _advance_to(self, t: float):
+        events = self._events
+        while events and events[0][0] <= t:
+            at, _, fn, args = heapq.heappop(events)
+            self.clock.now = at
+            fn(*args)
+        self.clock.now = t
+
+    # --------- Instâncias ---------
+    def _new_instance(self) -> SimInstance:
+        return SimInstance(f"{config.BASE_CONTAINER_NAME}_{next(self._next_id)}", self.servers, self.clock.now)
+
+    def start_initial(self, n: int):
+        for _ in range(n):
+            instance = self._new_instance()
+            instance.routable = True
+            self._start_series(instance)
+            self.instances.append(instance)
+        if self.metric_window > 0:
+            self._schedule(self.clock.now + self.cpu_sample_interval, self._sample_cpu)
+
+    def scale_up(self):
+        instance = self._new_instance()
+        if self.warm_available > 0:
+            self.warm_available -= 1
+            delay = self.warm_startup
+            self._schedule(self.clock.now + self.cold_startup, self._refill_warm) # reposição em background
+        else:
+            delay = self.cold_startup
+        instance.startup_ms = delay * 1000.0
+        self.starting.append(instance)
+        self._schedule(self.clock.now + delay, self._instance_ready, instance)
+
+    def _refill_warm(self):
+        self.warm_available += 1
+
+    def _instance_ready(self, instance: SimInstance):
+        if instance not in self.starting:  # scale-up cancelado antes de ficar pronto
+            return
+        self.starting.remove(instance)
+        instance.routable = True
+        instance.last_change = instance.ready_at = instance.ready_since = self.clock.now
+        self._start_series(instance)
+        self.instances.append(instance)
+        self.ready_since_tick.append(instance)
+
+    def cancel_scale_up(self) -> bool:
+        """
+        Cancela o scale-up mais recente ainda não pronto (como ScalingExecutor.cancel_scale_up).
+        """
+        if not self.starting:
+            return False
+        self.starting.pop()
+        return True
+
+    def scale_down(self) -> Optional[SimInstance]:
+        running = self.running()
+        if not running:
+            return None
+        instance = running[-1]
+        instance.routable = False # sai dos alvos; as requisições em andamento terminam (drain)
+        if not instance.busy and not instance.queue:
+            self.instances.remove(instance)
+        return instance
+
+    def running(self) -> List[SimInstance]:
+        return [i for i in self.instances if i.routable]
+
+    def draining(self) -> List[SimInstance]:
+        return [i for i in self.instances if not i.routable]
+
+    # --------- Tráfego ---------
+    def set_rate(self, kind: str, rps: float):
+        if rps == self.rates[kind]:
+            return
+        self.rates[kind] = rps
+        self._arrival_token[kind] += 1 # invalida a próxima chegada já agendada (processo sem memória)
+        if rps > 0:
+            self._schedule(self.clock.now + self.rng.expovariate(rps), self._arrival, kind, self._arrival_token[kind])
+
+    def _arrival(self, kind: str, token: int):
+        if token != self._arrival_token[kind]:
+            return
+        rps = self.rates[kind]
+        self._schedule(self.clock.now + self.rng.expovariate(rps), self._arrival, kind, token)
+        targets = self.running()
+        if not targets:
+            self.dropped += 1
+            return
+        self._rr = (self._rr + 1) % len(targets)
+        instance = targets[self._rr]
+        instance.routed += 1
+        routed = self.routed_by_class[kind]
+        routed[instance.name] = routed.get(instance.name, 0) + 1
+        if instance.busy < instance.servers:
+            self._begin_service(instance, self.clock.now, kind)
+        else:
+            instance.queue.append((self.clock.now, kind))
+
+    def _service_time(self, kind: str) -> float:
+        mean = self.service_time[kind]
+        if self.distribution == "deterministic":
+            return mean
+        return self.rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+
+    def _begin_service(self, instance: SimInstance, arrived: float, kind: str):
+        instance.integrate(self.clock.now)
+        instance.busy += 1
+        self._schedule(self.clock.now + self._service_time(kind), self._complete, instance, arrived, kind)
+
+    def _complete(self, instance: SimInstance, arrived: float, kind: str):
+        now = self.clock.now
+        instance.integrate(now)
+        instance.busy -= 1
+        latency_s = now - arrived
+        if latency_s > self.timeout:
+            self.timeouts += 1 # o cliente já desistiu; o servidor processou mesmo assim
+        else:
+            latency_ms = latency_s * 1000.0
+            self.interval_hist[kind].record(latency_ms)
+            self.total_hist[kind].record(latency_ms)
+        if instance.queue:
+            queued_at, queued_kind = instance.queue.popleft()
+            self._begin_service(instance, queued_at, queued_kind)
+        elif not instance.routable and not instance.busy and instance in self.instances:
+            self.instances.remove(instance) # terminou de drenar
+
+    # --------- Métricas por tick ---------
+    def _collect_cpu(self) -> List[InstanceSample]:
+        now = self.clock.now
+        cpu = []
+        for instance in self.instances:
+            instance.integrate(now)
+            if instance.routable:
+                elapsed = self.interval if instance.ready_at is None else min(self.interval, now - instance.ready_at)
+                if elapsed > 0:
+                    requests = (self.routed_by_class["normal"].get(instance.name, 0)
+                                + self.routed_by_class["attack"].get(instance.name, 0))
+                    age = now - instance.ready_since if instance.ready_since is not None else VIRTUAL_EPOCH
+                    cpu.append(InstanceSample(instance.name, instance.busy_time / elapsed * 100.0, age, requests))
+            instance.busy_time = 0.0
+            instance.ready_at = None
+        return cpu
+
+    def _start_series(self, instance: SimInstance):
+        if self.metric_window <= 0:
+            return
+        capacity = int(math.ceil(self.metric_window / self.cpu_sample_interval)) + 16
+        instance.series = RingSeries(("cpu_percent",), capacity, (self.metric_window,))
+        instance.sampled_busy = instance.busy_total
+        instance.sampled_at = self.clock.now
+
+    def _sample_cpu(self):
+        # Uma amostra de CPU% por instância pronta a cada SIM_CPU_SAMPLE_SECONDS
+        now = self.clock.now
+        for instance in self.instances:
+            if instance.routable and instance.series is not None and now > instance.sampled_at:
+                instance.integrate(now)
+                busy = instance.busy_total - instance.sampled_busy
+                instance.series.append(now, cpu_percent=busy / (now - instance.sampled_at) * 100.0)
+                instance.sampled_busy = instance.busy_total
+                instance.sampled_at = now
+        self._schedule(now + self.cpu_sample_interval, self._sample_cpu)
+
+    def _scaling_samples(self, cpu: List[InstanceSample]):
+        """
+        Amostras para a métrica do autoscaler: a CPU do tick (janela 0) ou a estatística da
+        janela de cada instância. Devolve também as instâncias ainda sem amostra na janela.
+        """
+        if self.metric_window <= 0:
+            return cpu, []
+        by_name = {i.name: i for i in self.instances}
+        samples, missing = [], []
+        for sample in cpu:
+            series = by_name[sample.name].series
+            value = window_stat(series.window(self.metric_window, "cpu_percent", self.clock.now),
+                                self.metric_stat) if series is not None else None
+            if value is None:
+                missing.append(sample.name)
+            else:
+                samples.append(InstanceSample(sample.name, value, sample.age_seconds, sample.requests))
+        return samples, missing
+
+    def _interval_latency(self, kind: str) -> Dict[str, float]:
+        hist = self.interval_hist[kind]
+        summary = hist.summary()
+        hist.reset()
+        return summary
+
+    # --------- Fluxo do orquestrador ---------
+    def run(self):
+        # Previsão sempre ativa: com a política "threshold" só é registrada, para comparação
+        forecaster = LoadForecaster()
+        pulse_detector = PulseDetector(interval=self.interval)
+        autoscaler = autoscaler_logic.create_autoscaler(
+            clock=self.clock.time, forecaster=forecaster,
+            pulse_detector=pulse_detector if getattr(config, "PULSE_DETECTOR_DAMPING", True) else None)
+        self.start_initial(config.MIN_INSTANCES)
+        autoscaler.set_initial_instances(len(self.instances))
+
+        attack_enabled = getattr(config, "ATTACK_DURATION_SECONDS", self.duration) > 0
+        attack_start_time = config.ATTACK_START_TIME_SECONDS
+        pulse_duration = min(config.PULSE_DURATION, config.SCALE_COOLDOWN_SECONDS)
+        attack_end = attack_start_time + pulse_duration
+        attack_active = False
+        normal_rps = config.HTTP_NORMAL_RPS_PER_CLIENT * config.HTTP_NORMAL_NUM_CLIENTS
+        attack_rps = config.HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER * config.HTTP_ATTACK_NUM_ATTACKERS
+
+        rows = []
+        instance_intervals_for_cost = []
+        scale_ups = scale_downs = 0
+        tick = 0
+        while tick * self.interval < self.duration:
+            elapsed = tick * self.interval
+            self._advance_to(elapsed)
+            tick += 1
+            label = 'normal'
+
+            # 1. Métricas do intervalo que terminou
+            running = self.running()
+            current_num_instances_actual = len(running)
+            cpu = self._collect_cpu()
+            avg_cpu = sum(sample.value for sample in cpu) / len(cpu) if cpu else 0.0
+            # Métrica do autoscaler: estatística da janela por instância (como get_cluster_metric),
+            # agregada entre instâncias sem as que estão em warm-up
+            scaling_samples, missing = self._scaling_samples(cpu)
+            scaling_cpu, excluded = aggregate(scaling_samples)
+            excluded = missing + excluded
+            normal_latency = self._interval_latency("normal")
+            attack_latency = self._interval_latency("attack")
+            normal_distribution, attack_distribution = self.routed_by_class["normal"], self.routed_by_class["attack"]
+            self.routed_by_class = {"normal": {}, "attack": {}}
+
+            request_rate = (normal_latency['count'] + attack_latency['count']) / self.interval
+            # Prevê a mesma métrica que o autoscaler compara com o limiar (PredictiveAutoscaler usa o máximo das duas)
+            forecaster.observe(scaling_cpu, current_num_instances_actual, request_rate)
+            # Rajada = a métrica do autoscaler acima do limiar: a duração aprendida é a que o amortecimento compara
+            pulse_detector.observe(scaling_cpu, current_num_instances_actual, request_rate)
+
+            # 2-3. Decisão e ações (o start roda "em background": fica pronto após o atraso de startup)
+            provisioned = current_num_instances_actual + len(self.starting)
+            p95 = normal_latency['p95_ms'] if normal_latency['count'] else None
+            decision, desired = autoscaler.decide_desired_instances(
+                scaling_cpu, provisioned, {"ready_instances": current_num_instances_actual,
+                                       "p95_rtt_ms": p95, "request_rate": request_rate})
+            desired = max(config.MIN_INSTANCES, min(config.MAX_INSTANCES, desired))
+            # O delta inteiro de uma vez (target tracking pode pedir mais de uma instância)
+            if decision == "SCALE_UP" and desired > provisioned:
+                for _ in range(desired - provisioned):
+                    self.scale_up()
+                scale_ups += 1
+            elif decision == "SCALE_DOWN" and desired < provisioned:
+                # Mesmo critério do orquestrador: cancela as que estão subindo antes de drenar as
+                # prontas, e nunca deixa menos que MIN_INSTANCES em serviço
+                surplus = provisioned - desired
+                while surplus and self.cancel_scale_up():
+                    surplus -= 1
+                for _ in range(min(surplus, max(0, len(running) - config.MIN_INSTANCES))):
+                    self.scale_down()
+                scale_downs += 1
+            startups = {instance.name: instance.startup_ms for instance in self.ready_since_tick
+                        if instance.startup_ms is not None}
+            self.ready_since_tick = []
+            running = self.running()
+            num_instances_after_scaling = len(running)
+            autoscaler.record_scale_action(num_instances_after_scaling)
+
+            # 4. Tráfego: mesma lógica de janelas de pulso do orquestrador
+            if not attack_enabled:
+                self.set_rate("normal", normal_rps)
+            else:
+                is_max_instance = current_num_instances_actual >= config.MAX_INSTANCES
+                should_attack_be_active_now = attack_start_time <= elapsed < attack_end
+                if elapsed >= attack_end:
+                    attack_start_time = attack_start_time + config.SCALE_COOLDOWN_SECONDS
+                    attack_end = attack_start_time + config.PULSE_DURATION
+                self.set_rate("normal", 0.0 if should_attack_be_active_now else normal_rps)
+                if should_attack_be_active_now and is_max_instance:
+                    attack_start_time = attack_start_time + config.MONITOR_INTERVAL_SECONDS
+                    attack_end = attack_end + config.MONITOR_INTERVAL_SECONDS
+                if should_attack_be_active_now and not attack_active and running:
+                    attack_active = True
+                elif not should_attack_be_active_now and attack_active:
+                    attack_active = False
+                self.set_rate("attack", attack_rps if attack_active else 0.0)
+                if attack_active:
+                    label = 'attack'
+
+            # 5. Linha do tick (mesmo esquema do CSV do orquestrador)
+            instance_states = {"pending": 0, "starting": len(self.starting), "draining": len(self.draining())}
+            rows.append(build_metrics_row(elapsed, num_instances_after_scaling, avg_cpu, scaling_cpu,
+                                          self.instance_mem_mb if cpu else 0.0, normal_latency, attack_latency,
+                                          NO_LAG, NO_LAG, normal_distribution, attack_distribution, startups,
+                                          instance_states, decision, [i.name for i in running], label,
+                                          forecaster.report(), pulse_detector.report(), excluded))
+
+            # 6. Custo
+            instance_intervals_for_cost.append((num_instances_after_scaling, self.interval))
+
+        summary = {
+            "total_cost": cost_calculator.calculate_total_cost_from_intervals(instance_intervals_for_cost),
+            "normal_p99_ms": self.total_hist["normal"].percentile_ms(99.0),
+            "attack_p99_ms": self.total_hist["attack"].percentile_ms(99.0),
+            "normal_requests": self.total_hist["normal"].count,
+            "attack_requests": self.total_hist["attack"].count,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+            "scale_ups": scale_ups,
+            "scale_downs": scale_downs,
+            "scale_events": scale_ups + scale_downs,
+            "max_instances_reached": max((r['num_instances'] for r in rows), default=0),
+            "cpu_forecast_mae": _mean([r['cpu_forecast_abs_error'] for r in rows if r['cpu_forecast_abs_error'] != '']),
+            "rps_forecast_mae": _mean([r['rps_forecast_abs_error'] for r in rows if r['rps_forecast_abs_error'] != '']),
+        }
+        return rows, summary
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def run_simulation(overrides: Optional[dict] = None, seed: int = 0, csv_path: Optional[str] = None,
+                   verbose: bool = False):
+    """
+    Roda um cenário com `overrides` aplicados ao config (restaurados no fim).
+    Retorna (linhas por tick, resumo). Com `verbose=False` os prints do Autoscaler são suprimidos.
+    """
+    overrides = overrides or {}
+    missing = object()
+    saved = {key: getattr(config, key, missing) for key in overrides}
+    try:
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            rows, summary = Simulation(seed).run()
+    finally:
+        for key, value in saved.items():
+            if value is missing:
+                delattr(config, key)
+            else:
+                setattr(config, key, value)
+    if csv_path:
+        with open(csv_path, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=METRICS_CSV_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows, summary
+
+
+def calibrate_service_times(csv_path: str, interval: Optional[float] = None):
+    """
+    Estima (segundos por requisição normal, segundos por requisição de ataque) a partir de um
+    CSV de execução real, por mínimos quadrados sem intercepto:
+        tempo de CPU do tick = a * normal_rtt_count + b * attack_rtt_count
+    com tempo de CPU = average_cpu_percent / 100 * num_instances * intervalo.
+    """
+    interval = interval or config.MONITOR_INTERVAL_SECONDS
+    snn = sna = saa = sny = say = 0.0
+    with open(csv_path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                n = float(row.get('normal_rtt_count') or 0)
+                a = float(row.get('attack_rtt_count') or 0)
+                busy = float(row['average_cpu_percent']) / 100.0 * float(row['num_instances']) * interval
+            except (KeyError, ValueError):
+                continue
+            if n + a == 0:
+                continue
+            snn += n * n
+            sna += n * a
+            saa += a * a
+            sny += n * busy
+            say += a * busy
+    det = snn * saa - sna * sna
+    if abs(det) < 1e-12:
+        # Só uma classe presente: ajusta apenas ela
+        normal = sny / snn if snn else None
+        attack = say / saa if saa else None
+    else:
+        normal = (sny * saa - say * sna) / det
+        attack = (say * snn - sny * sna) / det
+    clamp = lambda v: None if v is None else max(v, 0.0)
+    return clamp(normal), clamp(attack)
+
+
+# --- Execução direta ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discrete-event EDoS autoscaling simulation (virtual time).")
+    parser.add_argument("--csv", default="simulation_metrics_sim.csv", help="output CSV (same schema as the orchestrator)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--calibrate", metavar="METRICS_CSV",
+                        help="estimate SIM_*_SERVICE_TIME_SECONDS from a real run and use them")
+    parser.add_argument("--verbose", action="store_true", help="show the autoscaler decisions")
+    parser.add_argument("--policy", choices=("threshold", "predictive", "target_tracking", "compare"),
+                        help="autoscaling policy (default: config.AUTOSCALER_POLICY); "
+                             "'compare' runs all of them on the same seed")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.policy in ("threshold", "predictive", "target_tracking"):
+        overrides["AUTOSCALER_POLICY"] = args.policy
+    if args.calibrate:
+        normal_s, attack_s = calibrate_service_times(args.calibrate)
+        print(f"[Simulator] Calibrated service times from {args.calibrate}: "
+              f"normal={normal_s if normal_s is None else f'{normal_s * 1000:.2f} ms'}, "
+              f"attack={attack_s if attack_s is None else f'{attack_s * 1000:.2f} ms'}")
+        if normal_s:
+            overrides["SIM_NORMAL_SERVICE_TIME_SECONDS"] = normal_s
+        if attack_s:
+            overrides["SIM_ATTACK_SERVICE_TIME_SECONDS"] = attack_s
+
+    if args.policy == "compare":
+        for policy in ("threshold", "predictive", "target_tracking"):
+            _, summary = run_simulation(dict(overrides, AUTOSCALER_POLICY=policy), seed=args.seed)
+            print(f"[Simulator] {policy:>10}: cost ${summary['total_cost']:.4f} | scale events {summary['scale_events']} "
+                  f"| normal p99 {summary['normal_p99_ms']:.1f} ms | attack p99 {summary['attack_p99_ms']:.1f} ms "
+                  f"| CPU forecast MAE {summary['cpu_forecast_mae']:.2f}% | RPS forecast MAE {summary['rps_forecast_mae']:.1f}")
+        raise SystemExit(0)
+
+    t0 = time.perf_counter()
+    rows, summary = run_simulation(overrides, seed=args.seed, csv_path=args.csv, verbose=args.verbose)
+    wall = time.perf_counter() - t0
+    print(f"[Simulator] {config.SIMULATION_DURATION_SECONDS}s scenario simulated in {wall * 1000:.0f} ms "
+          f"({len(rows)} ticks) -> {args.csv}")
+    print(f"[Simulator] Total Fictional Cost: ${summary['total_cost']:.4f} | scale events: {summary['scale_events']} "
+          f"(up {summary['scale_ups']}, down {summary['scale_downs']}) | max instances: {summary['max_instances_reached']}")
+    print(f"[Simulator] Normal p99: {summary['normal_p99_ms']:.1f} ms | Attack p99: {summary['attack_p99_ms']:.1f} ms "
+          f"| timeouts: {summary['timeouts']} | dropped (no targets): {summary['dropped']}")
+    print(f"[Simulator] Forecast MAE ({getattr(config, 'AUTOSCALER_POLICY', 'threshold')} policy): "
+          f"CPU {summary['cpu_forecast_mae']:.2f}% | RPS {summary['rps_forecast_mae']:.1f}")
@@ -1,7 +1,10 @@
 # edos_docker_simulation/docker_manager.py
 import docker
+import http.client
 import time
+import threading
 import subprocess # For the 'docker stats' CPU workaround
+from collections import deque
 import config # Import your configuration
 
 try:
@@ -58,43 +61,148 @@ def ensure_docker_network():
     return True
 
 
-def start_instance(instance_numeric_id):
+# Tempo até o primeiro HTTP 200 de cada instância (ms), por nome do contêiner.
+# Cold start: desde o pedido de criação; warm pool: desde o unpause/start no scale-up.
+instance_startup_ms = {}
+
+
+def wait_until_ready(host_port, deadline_seconds=None):
     """
-    Starts a new container instance.
-    instance_numeric_id: An integer (e.g., 1, 2, 3) to make container name and port unique.
-    Returns the container object if successful, None otherwise.
+    Polls the app on the mapped host port with exponential backoff until it answers 200.
+    Returns the seconds waited, or None if the deadline expired first.
+    """
+    if deadline_seconds is None:
+        deadline_seconds = getattr(config, "READINESS_TIMEOUT_SECONDS", 15.0)
+    host = getattr(config, "READINESS_PROBE_HOST", "localhost")
+    path = getattr(config, "READINESS_PROBE_PATH", "/?work=0&sleep=0")
+    delay = getattr(config, "READINESS_INITIAL_BACKOFF_SECONDS", 0.01)
+    max_delay = getattr(config, "READINESS_MAX_BACKOFF_SECONDS", 0.5)
+
+    t0 = time.monotonic()
+    deadline = t0 + deadline_seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        conn = http.client.HTTPConnection(host, host_port, timeout=max(0.05, min(1.0, remaining)))
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                return time.monotonic() - t0
+        except (OSError, http.client.HTTPException):
+            pass # Ainda subindo: conexão recusada/resetada ou resposta incompleta
+        finally:
+            conn.close()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def _host_port_of(container):
+    return config.STARTING_HOST_PORT + int(container.name.rsplit("_", 1)[1]) - 1
+
+
+# IDs numéricos das instâncias (nome e porta únicos). Compartilhado entre o orquestrador e o
+# warm pool, que cria contêineres em background e também precisa de IDs que não colidam.
+_instance_id_lock = threading.Lock()
+_next_instance_id = 1
+
+
+def allocate_instance_id():
+    """
+    Reserves the next free instance numeric id (container name suffix and host port offset).
+    """
+    global _next_instance_id
+    with _instance_id_lock:
+        instance_id = _next_instance_id
+        _next_instance_id += 1
+        return instance_id
+
+
+def _calibrate_kernels_env():
+    """
+    "kernel[:size_kb],..." dos kernels de ataque e de tráfego normal (size 0 = padrão do servidor).
+    """
+    kernels = []
+    for prefix in ("ATTACK", "NORMAL"):
+        kernel = getattr(config, f"{prefix}_KERNEL", "cpu")
+        size_kb = getattr(config, f"{prefix}_SIZE_KB", 0)
+        kernels.append(f"{kernel}:{size_kb}" if size_kb else kernel)
+    return ",".join(dict.fromkeys(kernels))
+
+
+def _container_spec(instance_numeric_id):
+    """
+    Name, host port and create/run kwargs for an instance id.
     """
     container_name = f"{config.BASE_CONTAINER_NAME}_{instance_numeric_id}"
     # Calculate host port based on base port + (id - 1) to ensure uniqueness
     # e.g., if id is 1, port is STARTING_HOST_PORT. if id is 2, port is STARTING_HOST_PORT + 1
     host_port = config.STARTING_HOST_PORT + (instance_numeric_id - 1)
+    kwargs = dict(
+        name=container_name,
+        ports={'80/tcp': host_port}, # Internal container port is 80
+        network=config.DOCKER_NETWORK_NAME,
+        restart_policy={"Name": "no"}, # Do not auto-restart for this simulation
+        # WORKERS > 1 runs simple_server in prefork mode (one process per CPU of the quota)
+        # CALIBRATE_KERNELS: kernels pedidos pelos geradores, calibrados antes do fork dos workers
+        environment={"WORKERS": str(getattr(config, "APP_WORKERS", 1)),
+                     "CALIBRATE_KERNELS": _calibrate_kernels_env()},
+    )
+    cpus = getattr(config, "INSTANCE_CPUS", None)
+    if cpus:
+        kwargs["nano_cpus"] = int(cpus * 1e9)
+    return container_name, host_port, kwargs
+
+
+def _remove_stale_container(container_name):
+    """
+    Returns the running container with this name, or removes a stopped leftover and returns None.
+    """
+    try:
+        existing_container = client.containers.get(container_name)
+        if existing_container.status == 'running':
+            print(f"Container {container_name} is already running.")
+            return existing_container
+        print(f"Removing existing stopped container {container_name} before starting anew.")
+        existing_container.remove(force=True)
+    except docker.errors.NotFound:
+        pass # Good, no existing container with that name
+    return None
+
+
+def start_instance(instance_numeric_id):
+    """
+    Starts a new container instance.
+    instance_numeric_id: An integer (e.g., 1, 2, 3) to make container name and port unique.
+    Returns the container object if successful, None otherwise.
+    """
+    container_name, host_port, kwargs = _container_spec(instance_numeric_id)
 
     print(f"Attempting to start container {container_name} mapping container:80 to host:{host_port}...")
+    t0 = time.monotonic()
     try:
         # Check if a container with the same name already exists (maybe from a failed previous run)
-        try:
-            existing_container = client.containers.get(container_name)
-            if existing_container.status == 'running':
-                print(f"Container {container_name} is already running.")
-                return existing_container
-            else:
-                print(f"Removing existing stopped container {container_name} before starting anew.")
-                existing_container.remove(force=True)
-        except docker.errors.NotFound:
-            pass # Good, no existing container with that name
+        existing_container = _remove_stale_container(container_name)
+        if existing_container is not None:
+            return existing_container
 
         container = client.containers.run(
             config.DOCKER_IMAGE_NAME,
             detach=True,
-            name=container_name,
-            ports={'80/tcp': host_port}, # Internal container port is 80
-            network=config.DOCKER_NETWORK_NAME,
-            restart_policy={"Name": "no"}, # Do not auto-restart for this simulation
-            # environment={"PROCESSING_TIME": "0.05"} # Example: Pass env vars if your app uses them
+            **kwargs
         )
-        print(f"Container {container.short_id} ({container_name}) started. Accessible on host port {host_port}.")
-        # Optional: wait a tiny bit for the app inside the container to start
-        time.sleep(0.5)
+        print(f"Container {container.short_id} ({container_name}) started. Waiting for HTTP readiness on host port {host_port}...")
+        # Só devolve o contêiner quando a app responde 200 (evita connection refused nos injetores)
+        if wait_until_ready(host_port) is None:
+            print(f"ERROR: {container_name} did not answer HTTP 200 within the readiness deadline. Removing it.")
+            container.remove(force=True)
+            return None
+        startup_ms = (time.monotonic() - t0) * 1000
+        instance_startup_ms[container_name] = startup_ms
+        print(f"Container {container_name} ready: first HTTP 200 after {startup_ms:.0f} ms (cold start).")
         return container
     except docker.errors.APIError as e:
         print(f"ERROR: Failed to start container {container_name}: {e}")
@@ -194,8 +302,170 @@ def get_container_stats(container_obj):
 
     return {"cpu_percent": cpu_p, "memory_usage_mb": mem_usage_mb}
 
+class WarmPool:
+    """
+    Pool of pre-created instances kept ready for scale-up, refilled by a background thread.
+
+    mode "paused":  containers are started, given time to boot and then paused; acquire()
+                    is just an unpause (milliseconds), the app is already listening.
+    mode "created": containers are created (name, port and network assigned) but not
+                    started; acquire() is a start, which still pays the app startup.
+    """
+    def __init__(self, size, mode="paused"):
+        if mode not in ("paused", "created"):
+            raise ValueError(f"Unknown warm pool mode '{mode}'. Options: paused, created")
+        self.size = max(0, int(size))
+        self.mode = mode
+        self._idle = deque()  # contêineres prontos para acquire(), na ordem de criação
+        self._lock = threading.Lock()
+        self._refill_evt = threading.Event()
+        self._stop_evt = threading.Event()
+        self._t = threading.Thread(target=self._run, name="WarmPoolRefill", daemon=True)
+
+    def start(self):
+        print(f"[WarmPool] Keeping {self.size} {self.mode} instance(s) ready for scale-up.")
+        self._t.start()
+
+    def stop(self, timeout=10.0):
+        self._stop_evt.set()
+        self._refill_evt.set()
+        if self._t.is_alive():
+            self._t.join(timeout=timeout)
+        # O que sobrou no pool não vai ser usado. Se o join estourou o timeout (um _create_one
+        # preso no wait_until_ready), o _run remove sozinho o contêiner que terminar de criar
+        with self._lock:
+            leftover = list(self._idle)
+            self._idle.clear()
+        for container in leftover:
+            self._discard(container)
+
+    def available(self):
+        with self._lock:
+            return len(self._idle)
+
+    def acquire(self):
+        """
+        Takes one instance from the pool and makes it run. Returns the container,
+        or None if the pool is empty (caller falls back to a cold start_instance).
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self._refill_evt.set()
+                    return None
+                container = self._idle.popleft()
+            self._refill_evt.set() # repõe em background
+            t0 = time.monotonic()
+            try:
+                if self.mode == "paused":
+                    container.unpause()
+                else:
+                    container.start()
+                if wait_until_ready(_host_port_of(container)) is None:
+                    raise docker.errors.APIError(f"{container.name} not ready within the readiness deadline")
+                startup_ms = (time.monotonic() - t0) * 1000
+                instance_startup_ms[container.name] = startup_ms
+                container.reload()
+                print(f"[WarmPool] Acquired {container.name} ({self.mode}): first HTTP 200 after {startup_ms:.0f} ms. "
+                      f"{self.available()} left in pool.")
+                return container
+            except docker.errors.APIError as e:
+                print(f"[WarmPool] Warning: could not activate {container.name}: {e}. Trying next one.")
+                try:
+                    container.remove(force=True)
+                except docker.errors.APIError:
+                    pass
+
+    def _run(self):
+        while not self._stop_evt.is_set():
+            while self.available() < self.size and not self._stop_evt.is_set():
+                container = self._create_one()
+                if container is None:
+                    break # erro: tenta de novo no próximo ciclo
+                # stop() esvazia _idle sob o mesmo lock: ou o contêiner entra antes e é removido
+                # lá, ou o stop já foi pedido e ele é removido aqui
+                with self._lock:
+                    stopped = self._stop_evt.is_set()
+                    if not stopped:
+                        self._idle.append(container)
+                if stopped:
+                    self._discard(container)
+            self._refill_evt.wait(timeout=1.0)
+            self._refill_evt.clear()
+
+    @staticmethod
+    def _discard(container):
+        try:
+            container.remove(force=True)
+            print(f"[WarmPool] Removed unused {container.name}.")
+        except docker.errors.APIError as e:
+            print(f"[WarmPool] Warning: failed to remove {container.name}: {e}")
+
+    def _create_one(self):
+        instance_numeric_id = allocate_instance_id()
+        container_name, host_port, kwargs = _container_spec(instance_numeric_id)
+        t0 = time.monotonic()
+        try:
+            _remove_stale_container(container_name)
+            if self.mode == "paused":
+                container = client.containers.run(config.DOCKER_IMAGE_NAME, detach=True, **kwargs)
+                # Congela só depois que a app responde: o unpause devolve uma instância pronta
+                if wait_until_ready(host_port) is None:
+                    container.remove(force=True)
+                    raise docker.errors.APIError(f"{container_name} not ready within the readiness deadline")
+                container.pause()
+            else:
+                container = client.containers.create(config.DOCKER_IMAGE_NAME, detach=True, **kwargs)
+            print(f"[WarmPool] Prepared {container_name} on host port {host_port} ({self.mode}) "
+                  f"in {(time.monotonic() - t0) * 1000:.0f} ms.")
+            return container
+        except docker.errors.APIError as e:
+            print(f"[WarmPool] Warning: failed to prepare {container_name}: {e}")
+            self._stop_evt.wait(2.0)
+            return None
+
+
+warm_pool = None # WarmPool ativo (ver start_warm_pool)
+
+
+def start_warm_pool(size=None, mode=None):
+    """
+    Starts the background warm pool (size/mode default to config.WARM_POOL_SIZE / WARM_POOL_MODE).
+    Returns the pool, or None if the configured size is 0.
+    """
+    global warm_pool
+    size = getattr(config, "WARM_POOL_SIZE", 0) if size is None else size
+    mode = getattr(config, "WARM_POOL_MODE", "paused") if mode is None else mode
+    if size <= 0:
+        return None
+    stop_warm_pool()
+    warm_pool = WarmPool(size, mode)
+    warm_pool.start()
+    return warm_pool
+
+
+def stop_warm_pool():
+    global warm_pool
+    if warm_pool is not None:
+        pool, warm_pool = warm_pool, None
+        pool.stop()
+
+
+def acquire_instance():
+    """
+    Scale-up entry point: an instance from the warm pool if one is ready, otherwise a cold
+    start_instance with a freshly allocated id. Returns (container or None, "warm" | "cold").
+    """
+    if warm_pool is not None:
+        container = warm_pool.acquire()
+        if container is not None:
+            return container, "warm"
+    return start_instance(allocate_instance_id()), "cold"
+
+
 def cleanup_all_simulation_instances():
     print("Cleaning up all simulation instances...")
+    stop_warm_pool() # A reposição em background não pode recriar contêineres durante a limpeza
     # List containers based on the naming convention used in this simulation
     # This is safer than removing all containers on the system.
     # Filters: name uses regex. ^ means starts with.
@@ -0,0 +1,125 @@
+# edos_docker_simulation/forecasting.py
+"""
+Previsão de carga para o autoscaling preditivo (ver autoscaler_logic.PredictiveAutoscaler).
+
+`HoltForecaster` é a suavização exponencial com tendência linear de Holt (com beta = 0
+vira uma EWMA simples). `LoadForecaster` mantém uma previsão para a carga de CPU do
+cluster e outra para a taxa de requisições, e mede o erro de cada previsão de um passo
+quando o valor real do tick seguinte chega.
+
+A CPU é prevista como carga do cluster (cpu_média * nº de instâncias, em "% de uma
+instância"), porque a CPU média cai pela metade quando o nº de instâncias dobra sem que
+a carga mude; a previsão em CPU média é essa carga dividida pelo nº de instâncias atual.
+"""
+from collections import deque
+from typing import Dict, Optional
+
+import config
+
+
+class HoltForecaster:
+    """
+    Nível + tendência atualizados a cada observação; forecast(h) = nível + h * tendência.
+    """
+    __slots__ = ("alpha", "beta", "level", "trend")
+
+    def __init__(self, alpha: float = 0.5, beta: float = 0.3):
+        self.alpha = alpha
+        self.beta = beta
+        self.level: Optional[float] = None
+        self.trend = 0.0
+
+    def update(self, value: float):
+        if self.level is None:
+            self.level = value
+            return
+        previous = self.level
+        self.level = self.alpha * value + (1 - self.alpha) * (self.level + self.trend)
+        self.trend = self.beta * (self.level - previous) + (1 - self.beta) * self.trend
+
+    def forecast(self, steps: int = 1) -> float:
+        if self.level is None:
+            return 0.0
+        return max(0.0, self.level + steps * self.trend)
+
+
+class _ErrorWindow:
+    """
+    Erro absoluto das previsões de um passo: último valor e média das últimas `size`.
+    """
+    __slots__ = ("errors", "total", "last")
+
+    def __init__(self, size: int):
+        self.errors = deque(maxlen=size)
+        self.total = 0.0
+        self.last: Optional[float] = None
+
+    def add(self, error: float):
+        if len(self.errors) == self.errors.maxlen:
+            self.total -= self.errors[0]
+        self.errors.append(error)
+        self.total += error
+        self.last = error
+
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.errors) if self.errors else None
+
+
+class LoadForecaster:
+    """
+    Previsões de CPU (carga do cluster) e de RPS, atualizadas uma vez por tick com `observe`.
+    """
+    def __init__(self, alpha: Optional[float] = None, beta: Optional[float] = None,
+                 error_window: Optional[int] = None):
+        alpha = getattr(config, "PREDICTIVE_ALPHA", 0.5) if alpha is None else alpha
+        beta = getattr(config, "PREDICTIVE_BETA", 0.3) if beta is None else beta
+        error_window = getattr(config, "PREDICTIVE_ERROR_WINDOW", 20) if error_window is None else error_window
+        self.load = HoltForecaster(alpha, beta)
+        self.rps = HoltForecaster(alpha, beta)
+        self.load_error = _ErrorWindow(error_window)
+        self.rps_error = _ErrorWindow(error_window)
+        self._pending_load: Optional[float] = None  # previsão de um passo feita no tick anterior
+        self._pending_rps: Optional[float] = None
+        self._instances = 1
+
+    def observe(self, average_cpu_percent: float, num_instances: int, request_rate: Optional[float] = None):
+        """
+        Registra o tick atual: mede o erro da previsão anterior e atualiza os modelos.
+        """
+        self._instances = max(1, num_instances)
+        load = average_cpu_percent * self._instances
+        if self._pending_load is not None:
+            # Erro expresso em CPU média (% por instância) com o nº de instâncias atual
+            self.load_error.add(abs(load - self._pending_load) / self._instances)
+        self.load.update(load)
+        self._pending_load = self.load.forecast(1)
+        if request_rate is not None:
+            if self._pending_rps is not None:
+                self.rps_error.add(abs(request_rate - self._pending_rps))
+            self.rps.update(request_rate)
+            self._pending_rps = self.rps.forecast(1)
+
+    def cpu_forecast(self, num_instances: int, steps: int = 1) -> float:
+        """
+        CPU média prevista daqui a `steps` intervalos se o cluster tiver `num_instances` instâncias.
+        """
+        return self.load.forecast(steps) / max(1, num_instances)
+
+    def peak_cpu_forecast(self, num_instances: int, horizon: int) -> float:
+        """
+        Maior CPU média prevista nos próximos `horizon` intervalos (tendência linear: é o 1º ou o último).
+        """
+        horizon = max(1, horizon)
+        return max(self.cpu_forecast(num_instances, 1), self.cpu_forecast(num_instances, horizon))
+
+    def report(self) -> Dict[str, Optional[float]]:
+        """
+        Previsões de um passo e erros, para o log/CSV (None = ainda sem dados).
+        """
+        return {
+            "cpu_forecast": self.cpu_forecast(self._instances, 1) if self.load.level is not None else None,
+            "cpu_forecast_abs_error": self.load_error.last,
+            "cpu_forecast_mae": self.load_error.mean(),
+            "rps_forecast": self.rps.forecast(1) if self.rps.level is not None else None,
+            "rps_forecast_abs_error": self.rps_error.last,
+        }
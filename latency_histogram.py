@@ -0,0 +1,237 @@
+# edos_docker_simulation/latency_histogram.py
+"""
+Histogramas de latência com memória constante (estilo HdrHistogram).
+
+Os valores são gravados em microssegundos em buckets log-lineares: abaixo de
+SUB_BUCKET_COUNT cada microssegundo tem seu bucket; acima disso cada potência
+de 2 é dividida em SUB_BUCKET_COUNT/2 buckets lineares, o que dá erro relativo
+máximo de ~1/64 (~1.6%) em qualquer escala, de 1us até MAX_VALUE_US.
+
+Gravação sem locks: cada worker (thread, motor asyncio ou processo shard) grava
+num histograma cumulativo só dele. O leitor (`HistogramRecorder`) calcula o
+histograma do intervalo como a diferença entre a leitura atual e a anterior de
+cada writer, então nenhum incremento é perdido nem contado duas vezes, e o
+merge é uma soma de arrays de tamanho fixo.
+"""
+import math
+import threading
+from array import array
+from typing import Dict, List
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS          # 128
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1          # 64
+MAX_VALUE_US = 120 * 1_000_000                   # 120 s (acima disso satura no último bucket)
+
+# Cabeçalho do buffer: contagem total, soma (us), máximo (us)
+HDR_COUNT = 0
+HDR_SUM_US = 1
+HDR_MAX_US = 2
+HEADER_LEN = 3
+
+
+def _bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKET_COUNT:
+        return value_us if value_us > 0 else 0
+    exp = value_us.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (exp - 1) * SUB_BUCKET_HALF + ((value_us >> exp) - SUB_BUCKET_HALF)
+
+
+NUM_BUCKETS = _bucket_index(MAX_VALUE_US) + 1
+BUFFER_LEN = HEADER_LEN + NUM_BUCKETS
+
+
+def _bucket_bounds(index: int):
+    """
+    Faixa [menor, maior] de valores (us) que caem no bucket `index`.
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    exp = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    mantissa = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    low = mantissa << exp
+    return low, low + (1 << exp) - 1
+
+
+class LatencyHistogram:
+    """
+    Histograma log-bucketizado de tamanho fixo (NUM_BUCKETS contadores int64).
+
+    `buffer` pode ser um memoryview externo de BUFFER_LEN int64 (ex.: uma fatia de
+    `multiprocessing.shared_memory`), permitindo que outro processo leia os contadores.
+    """
+    __slots__ = ("buf",)
+
+    def __init__(self, buffer=None):
+        self.buf = buffer if buffer is not None else array("q", bytes(8 * BUFFER_LEN))
+
+    # --------- Gravação (um único writer por histograma) ---------
+    def record_us(self, value_us: int):
+        if value_us < 0:
+            value_us = 0
+        elif value_us > MAX_VALUE_US:
+            value_us = MAX_VALUE_US
+        buf = self.buf
+        buf[HEADER_LEN + _bucket_index(value_us)] += 1
+        buf[HDR_COUNT] += 1
+        buf[HDR_SUM_US] += value_us
+        if value_us > buf[HDR_MAX_US]:
+            buf[HDR_MAX_US] = value_us
+
+    def record(self, value_ms: float):
+        self.record_us(int(value_ms * 1000.0))
+
+    # --------- Leitura ---------
+    @property
+    def count(self) -> int:
+        return self.buf[HDR_COUNT]
+
+    @property
+    def max_ms(self) -> float:
+        return self.buf[HDR_MAX_US] / 1000.0
+
+    @property
+    def mean_ms(self) -> float:
+        count = self.buf[HDR_COUNT]
+        return self.buf[HDR_SUM_US] / count / 1000.0 if count else 0.0
+
+    def copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(array("q", self.buf))
+
+    def reset(self):
+        buf = self.buf
+        for i in range(BUFFER_LEN):
+            buf[i] = 0
+
+    def merge(self, other: "LatencyHistogram"):
+        """
+        Soma `other` neste histograma (O(NUM_BUCKETS), independente do nº de amostras).
+        """
+        a, b = self.buf, other.buf
+        for i in range(HEADER_LEN, BUFFER_LEN):
+            if b[i]:
+                a[i] += b[i]
+        a[HDR_COUNT] += b[HDR_COUNT]
+        a[HDR_SUM_US] += b[HDR_SUM_US]
+        if b[HDR_MAX_US] > a[HDR_MAX_US]:
+            a[HDR_MAX_US] = b[HDR_MAX_US]
+
+    def add_delta(self, current: "LatencyHistogram", previous: "LatencyHistogram"):
+        """
+        Soma (current - previous) neste histograma. O máximo do intervalo é o limite
+        superior do maior bucket com contagem nova (limitado ao máximo exato cumulativo).
+        """
+        a, cur, prev = self.buf, current.buf, previous.buf
+        top = -1
+        for i in range(HEADER_LEN, BUFFER_LEN):
+            d = cur[i] - prev[i]
+            if d:
+                a[i] += d
+                top = i
+        a[HDR_COUNT] += cur[HDR_COUNT] - prev[HDR_COUNT]
+        a[HDR_SUM_US] += cur[HDR_SUM_US] - prev[HDR_SUM_US]
+        if top >= 0:
+            interval_max = min(_bucket_bounds(top - HEADER_LEN)[1], cur[HDR_MAX_US])
+            if interval_max > a[HDR_MAX_US]:
+                a[HDR_MAX_US] = interval_max
+
+    def percentile_ms(self, percentile: float) -> float:
+        buf = self.buf
+        total = buf[HDR_COUNT]
+        if total <= 0:
+            return 0.0
+        rank = max(1, math.ceil(percentile / 100.0 * total))
+        seen = 0
+        for i in range(HEADER_LEN, BUFFER_LEN):
+            seen += buf[i]
+            if seen >= rank:
+                low, high = _bucket_bounds(i - HEADER_LEN)
+                return min((low + high) / 2.0, buf[HDR_MAX_US]) / 1000.0
+        return buf[HDR_MAX_US] / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        """
+        {count, p50_ms, p95_ms, p99_ms, max_ms} em uma única varredura dos buckets.
+        """
+        buf = self.buf
+        total = buf[HDR_COUNT]
+        result = {"count": total, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": buf[HDR_MAX_US] / 1000.0}
+        if total <= 0:
+            return result
+        pending = [(key, max(1, math.ceil(p / 100.0 * total)))
+                   for key, p in (("p50_ms", 50.0), ("p95_ms", 95.0), ("p99_ms", 99.0))]
+        seen = 0
+        for i in range(HEADER_LEN, BUFFER_LEN):
+            c = buf[i]
+            if not c:
+                continue
+            seen += c
+            while pending and seen >= pending[0][1]:
+                low, high = _bucket_bounds(i - HEADER_LEN)
+                result[pending.pop(0)[0]] = min((low + high) / 2.0, buf[HDR_MAX_US]) / 1000.0
+            if not pending:
+                break
+        return result
+
+
+class HistogramRecorder:
+    """
+    Conjunto de histogramas cumulativos (um por writer) com leitura por intervalo.
+
+    Writers: `hist = recorder.writer()` e depois `hist.record(ms)` sem lock.
+    Leitor: `recorder.interval_summary()` a cada tick do orquestrador.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()  # protege apenas a lista de writers (registro/remoção)
+        self._writers: List[list] = []  # [hist, snapshot_anterior, aposentado]
+
+    def writer(self, buffer=None) -> LatencyHistogram:
+        hist = LatencyHistogram(buffer)
+        self.add_writer(hist)
+        return hist
+
+    def add_writer(self, hist: LatencyHistogram):
+        with self._lock:
+            self._writers.append([hist, hist.copy(), False])
+
+    def retire(self, hist: LatencyHistogram):
+        """
+        O writer parou de gravar: suas últimas amostras entram no próximo intervalo
+        e depois ele é descartado.
+        """
+        with self._lock:
+            for entry in self._writers:
+                if entry[0] is hist:
+                    entry[0] = hist.copy()  # desacopla de buffers externos (ex.: shared memory)
+                    entry[2] = True
+
+    def interval_histogram(self) -> LatencyHistogram:
+        out = LatencyHistogram()
+        with self._lock:
+            writers = list(self._writers)
+            self._writers = [w for w in self._writers if not w[2]]
+        for entry in writers:
+            hist, previous, _ = entry
+            if hist.buf[HDR_COUNT] == previous.buf[HDR_COUNT]:
+                continue
+            current = hist.copy()
+            out.add_delta(current, previous)
+            entry[1] = current
+        return out
+
+    def interval_summary(self) -> Dict[str, float]:
+        return self.interval_histogram().summary()
+
+    def cumulative_mean_ms(self) -> float:
+        """
+        Média desde o início, a partir das somas dos writers ativos (sem guardar amostras).
+        """
+        with self._lock:
+            writers = [w[0] for w in self._writers]
+        count = sum(h.buf[HDR_COUNT] for h in writers)
+        total_us = sum(h.buf[HDR_SUM_US] for h in writers)
+        return total_us / count / 1000.0 if count else 0.0
+
+
+def empty_summary() -> Dict[str, float]:
+    return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
@@ -0,0 +1,206 @@
+# edos_docker_simulation/load_balancer.py
+"""
+Balanceamento de carga no lado do cliente para os geradores de tráfego.
+
+Em vez de cada worker ficar preso a `target_urls[i % n]` durante toda a vida
+(o que, com 4 workers e 3 instâncias, dá o dobro de carga para uma delas), cada
+requisição escolhe o alvo no momento do envio segundo uma estratégia:
+
+    "static"             -> worker i sempre no alvo i % n (comportamento antigo)
+    "round_robin"        -> rodízio global entre os alvos
+    "least_outstanding"  -> alvo com menos requisições em voo
+    "p2c"                -> power-of-two-choices: sorteia dois alvos e fica com o de
+                            menor custo = latência EWMA observada * (em voo + 1)
+    "weighted"           -> round-robin ponderado suave (estilo nginx) pelos pesos configurados
+
+O balanceador também conta quantas requisições foram roteadas para cada alvo,
+para o orquestrador registrar a distribuição da carga a cada tick.
+"""
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+
+STRATEGIES = ("static", "round_robin", "least_outstanding", "p2c", "weighted")
+
+
+class TargetStats:
+    """
+    Estado de um alvo visto pelo balanceador. O objeto sobrevive às trocas de alvos
+    (update de TargetSet), então uma resposta que chega depois da remoção do alvo
+    apenas atualiza um objeto que não está mais na rotação.
+    """
+    __slots__ = ("url", "outstanding", "ewma_ms", "sent", "weight", "current_weight")
+
+    def __init__(self, url: str, weight: float = 1.0):
+        self.url = url
+        self.outstanding = 0
+        self.ewma_ms = 0.0       # 0 = ainda sem amostras (alvo novo é preferido pelo p2c)
+        self.sent = 0            # requisições roteadas para este alvo (cumulativo)
+        self.weight = weight
+        self.current_weight = 0.0
+
+
+class LoadBalancer:
+    """
+    Escolhe o alvo de cada requisição. Seguro para uso por várias threads (workers
+    em thread compartilham uma instância); no motor asyncio o lock nunca disputa.
+    """
+    def __init__(self, strategy: str = "round_robin", urls: Iterable[str] = (),
+                 weights: Optional[Dict[str, float]] = None, ewma_alpha: float = 0.3):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load-balancing strategy '{strategy}'. Options: {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.weights = dict(weights or {})
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._rr_next = 0
+        self._all: Dict[str, TargetStats] = {}  # inclui alvos já removidos (para a distribuição)
+        self._targets: List[TargetStats] = []
+        self._pick = getattr(self, f"_pick_{strategy}")
+        self.set_targets(urls)
+
+    # --------- Alvos ---------
+    def set_targets(self, urls: Iterable[str]):
+        with self._lock:
+            targets = []
+            for url in dict.fromkeys(urls):
+                stats = self._all.get(url)
+                if stats is None:
+                    stats = self._all[url] = TargetStats(url, self._weight_for(url))
+                stats.current_weight = 0.0
+                targets.append(stats)
+            self._targets = targets
+
+    def set_weights(self, weights: Dict[str, float]):
+        """
+        Atualiza os pesos da estratégia "weighted" (chave: URL ou "host:porta").
+        """
+        with self._lock:
+            self.weights = dict(weights)
+            for stats in self._all.values():
+                stats.weight = self._weight_for(stats.url)
+
+    def _weight_for(self, url: str) -> float:
+        if url in self.weights:
+            return float(self.weights[url])
+        host_port = url.split("://", 1)[-1].split("/", 1)[0]
+        return float(self.weights.get(host_port, 1.0))
+
+    @property
+    def urls(self) -> List[str]:
+        return [t.url for t in self._targets]
+
+    # --------- Roteamento ---------
+    def pick(self, worker_index: int = 0) -> Optional[TargetStats]:
+        """
+        Escolhe o alvo da próxima requisição e já a conta como em voo.
+        Retorna None se não há alvos.
+        """
+        with self._lock:
+            targets = self._targets
+            if not targets:
+                return None
+            target = targets[0] if len(targets) == 1 else self._pick(targets, worker_index)
+            target.outstanding += 1
+            target.sent += 1
+            return target
+
+    def release(self, target: TargetStats, latency_ms: Optional[float] = None):
+        """
+        A requisição terminou. `latency_ms` alimenta a EWMA usada pelo p2c
+        (falhas devem passar o tempo decorrido até o erro/timeout).
+        """
+        with self._lock:
+            target.outstanding -= 1
+            if latency_ms is not None:
+                if target.ewma_ms <= 0.0:
+                    target.ewma_ms = latency_ms
+                else:
+                    target.ewma_ms += self.ewma_alpha * (latency_ms - target.ewma_ms)
+
+    def _pick_static(self, targets: List[TargetStats], worker_index: int) -> TargetStats:
+        return targets[worker_index % len(targets)]
+
+    def _pick_round_robin(self, targets: List[TargetStats], worker_index: int) -> TargetStats:
+        self._rr_next = (self._rr_next + 1) % len(targets)
+        return targets[self._rr_next]
+
+    def _pick_least_outstanding(self, targets: List[TargetStats], worker_index: int) -> TargetStats:
+        # Começa a varredura em posição rotativa para desempatar sem favorecer o primeiro alvo
+        n = len(targets)
+        self._rr_next = (self._rr_next + 1) % n
+        best = targets[self._rr_next]
+        for offset in range(1, n):
+            candidate = targets[(self._rr_next + offset) % n]
+            if candidate.outstanding < best.outstanding:
+                best = candidate
+        return best
+
+    def _pick_p2c(self, targets: List[TargetStats], worker_index: int) -> TargetStats:
+        a, b = self._rng.sample(targets, 2)
+        cost_a = a.ewma_ms * (a.outstanding + 1)
+        cost_b = b.ewma_ms * (b.outstanding + 1)
+        return a if cost_a <= cost_b else b
+
+    def _pick_weighted(self, targets: List[TargetStats], worker_index: int) -> TargetStats:
+        # Smooth weighted round-robin: distribuição proporcional aos pesos e sem rajadas
+        total = 0.0
+        best = None
+        for t in targets:
+            t.current_weight += t.weight
+            total += t.weight
+            if best is None or t.current_weight > best.current_weight:
+                best = t
+        best.current_weight -= total
+        return best
+
+    # --------- Distribuição ---------
+    def distribution(self) -> Dict[str, int]:
+        """
+        Requisições roteadas por alvo desde o início (inclui alvos já removidos).
+        """
+        with self._lock:
+            return {url: stats.sent for url, stats in self._all.items()}
+
+
+class DistributionTracker:
+    """
+    Converte contagens cumulativas por alvo em contagens do intervalo desde a última chamada.
+    """
+    def __init__(self):
+        self._previous: Dict[str, int] = {}
+
+    def interval(self, cumulative: Dict[str, int]) -> Dict[str, int]:
+        delta = {}
+        for url, count in cumulative.items():
+            previous = self._previous.get(url, 0)
+            d = count - previous if count >= previous else count  # contador reiniciado (novo gerador)
+            if d > 0:
+                delta[url] = d
+        self._previous = dict(cumulative)
+        return delta
+
+    def reset(self):
+        self._previous = {}
+
+
+def imbalance(counts: Dict[str, int]) -> float:
+    """
+    max/média das requisições por alvo (1.0 = carga perfeitamente uniforme; 0.0 sem dados).
+    """
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    return max(counts.values()) / (total / len(counts))
+
+
+def format_distribution(counts: Dict[str, int]) -> str:
+    """
+    "url=n (p%), ... | max/mean=x" para os logs do orquestrador.
+    """
+    total = sum(counts.values())
+    if not total:
+        return "n/a"
+    parts = [f"{url}={n} ({100.0 * n / total:.0f}%)" for url, n in sorted(counts.items())]
+    return ", ".join(parts) + f" | max/mean={imbalance(counts):.2f}"
@@ -0,0 +1,430 @@
+# edos_docker_simulation/load_engine.py
+"""
+Motor de carga HTTP assíncrono (open-loop) usado pelos geradores de tráfego.
+
+Diferente dos workers baseados em threads (um `requests.Session` bloqueante por
+atacante), aqui cada worker é uma corrotina que dispara requisições segundo um
+cronograma fixo de chegadas (t0, t0 + 1/rps, t0 + 2/rps, ...). Uma resposta
+lenta NÃO atrasa as próximas requisições: cada envio vira uma task independente,
+então a taxa oferecida se mantém mesmo quando os alvos saturam.
+
+O cliente HTTP é implementado sobre `asyncio` streams (biblioteca padrão), com
+um pool de conexões keep-alive por alvo, para não adicionar dependências.
+
+O conjunto de alvos pode ser trocado com o motor rodando (`update_targets`):
+alvos novos entram na rotação imediatamente e recebem conexões pré-aquecidas;
+alvos removidos saem da rotação e são drenados (as requisições em voo terminam
+normalmente e suas conexões são fechadas em vez de voltar ao pool).
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from load_balancer import LoadBalancer, TargetStats
+
+try:
+    import config
+    DEFAULT_TIMEOUT = getattr(config, "HTTP_REQUEST_TIMEOUT_SECONDS", 10.0)
+    DEFAULT_MAX_IN_FLIGHT = getattr(config, "HTTP_ASYNC_MAX_IN_FLIGHT", 10000)
+    DEFAULT_LATENCY_MODE = getattr(config, "LATENCY_MEASUREMENT_MODE", "service")
+    DEFAULT_PREWARM_CONNECTIONS = getattr(config, "HTTP_PREWARM_CONNECTIONS", 4)
+    DEFAULT_LB_STRATEGY = getattr(config, "HTTP_LB_STRATEGY", "static")
+    DEFAULT_LB_WEIGHTS = getattr(config, "HTTP_LB_WEIGHTS", {})
+    DEFAULT_KEEPALIVE_IDLE = getattr(config, "HTTP_KEEPALIVE_IDLE_SECONDS", 4.0)
+except Exception:
+    DEFAULT_TIMEOUT = 10.0
+    DEFAULT_MAX_IN_FLIGHT = 10000
+    DEFAULT_LATENCY_MODE = "service"
+    DEFAULT_PREWARM_CONNECTIONS = 4
+    DEFAULT_LB_STRATEGY = "static"
+    DEFAULT_LB_WEIGHTS = {}
+    DEFAULT_KEEPALIVE_IDLE = 4.0
+
+
+class _HttpTarget:
+    """
+    Um alvo HTTP (host, porta, path) com seu pool de conexões ociosas.
+    """
+    def __init__(self, url: str, query: str = ""):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if query:
+            path += ("&" if "?" in path else "?") + query.lstrip("?")
+        self.request_bytes = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Connection: keep-alive\r\n"
+            f"\r\n"
+        ).encode()
+        # (reader, writer, instante em que ficou ociosa); empilhada em ordem de tempo
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]] = []
+        self.draining = False  # removido da rotação: conexões não voltam ao pool
+
+    def close_idle(self):
+        while self.idle:
+            _, writer, _ = self.idle.pop()
+            writer.close()
+
+    def pop_idle(self, max_idle_seconds: float):
+        """
+        Conexão ociosa mais recente, ou None. Se ela já passou de `max_idle_seconds`, o
+        servidor pode tê-la fechado (KEEPALIVE_TIMEOUT) e todas abaixo na pilha são mais
+        antigas ainda: o pool inteiro é descartado.
+        """
+        if not self.idle:
+            return None
+        reader, writer, idle_since = self.idle.pop()
+        if max_idle_seconds > 0 and time.monotonic() - idle_since > max_idle_seconds:
+            writer.close()
+            self.close_idle()
+            return None
+        return reader, writer
+
+
+class _StaleConnection(Exception):
+    """
+    Conexão reaproveitada do pool falhou antes da linha de status (fechada pelo servidor).
+    """
+
+
+class EngineCounters:
+    """
+    Contadores cumulativos do motor. Só a thread do event loop escreve neles;
+    leitores em outras threads apenas leem (inteiros Python, sem lock).
+    Em modo multi-processo, `traffic_shards.SharedCounters` expõe os mesmos
+    atributos sobre um bloco de `multiprocessing.shared_memory`.
+    """
+    __slots__ = ("sent", "completed", "errors", "dropped", "in_flight")
+
+    def __init__(self):
+        self.sent = 0
+        self.completed = 0
+        self.errors = 0
+        self.dropped = 0       # envios descartados por atingir max_in_flight
+        self.in_flight = 0
+
+
+class OpenLoopEngine:
+    """
+    Gera tráfego HTTP open-loop a partir de uma única thread com event loop próprio.
+
+    O orquestrador continua síncrono: start()/stop() são chamados da thread principal
+    e o event loop roda em uma thread daemon dedicada.
+    """
+    def __init__(self,
+                 name: str,
+                 target_urls: List[str],
+                 rps_per_worker: float,
+                 num_workers: int,
+                 query: str = "",
+                 timeout: float = DEFAULT_TIMEOUT,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 on_latency: Optional[Callable[[float], None]] = None,
+                 counters=None,
+                 worker_offset: int = 0,
+                 latency_mode: str = DEFAULT_LATENCY_MODE,
+                 on_schedule_lag: Optional[Callable[[int, float], None]] = None,
+                 prewarm_connections: int = DEFAULT_PREWARM_CONNECTIONS,
+                 lb_strategy: str = DEFAULT_LB_STRATEGY,
+                 lb_weights: Optional[Dict[str, float]] = None,
+                 keepalive_idle_seconds: float = DEFAULT_KEEPALIVE_IDLE):
+        self.name = name
+        self.rps_per_worker = float(rps_per_worker)
+        self.num_workers = int(num_workers)
+        self.timeout = timeout
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.on_latency = on_latency
+        # "service": latência medida a partir do envio real; "intended": a partir do
+        # instante previsto no cronograma (corrige coordinated omission)
+        self.latency_mode = latency_mode
+        self.on_schedule_lag = on_schedule_lag
+        self.worker_lag_ms: List[float] = [0.0] * self.num_workers  # atraso atual de cada worker
+
+        self.worker_offset = int(worker_offset)  # índice global do 1º worker (modo multi-processo)
+        self.counters = counters if counters is not None else EngineCounters()
+
+        self.query = query
+        self.prewarm_connections = max(0, int(prewarm_connections))
+        # Conexões ociosas há mais que isso não são reaproveitadas (abaixo do timeout do servidor)
+        self.keepalive_idle_seconds = float(keepalive_idle_seconds)
+        # Tupla imutável trocada por inteiro; só a thread do event loop a substitui depois do start()
+        self._targets: Tuple[_HttpTarget, ...] = tuple(_HttpTarget(u, query) for u in dict.fromkeys(target_urls))
+        self._by_url: Dict[str, _HttpTarget] = {t.url: t for t in self._targets}
+        # Escolha do alvo por requisição (só a thread do event loop usa depois do start())
+        self.balancer = LoadBalancer(lb_strategy, self._by_url,
+                                     weights=lb_weights if lb_weights is not None else DEFAULT_LB_WEIGHTS)
+        self._prewarm_tasks = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_evt: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+        self._report_lock = threading.Lock()
+        self._last_report: Tuple[float, int, int] = (time.monotonic(), 0, 0)
+
+    # --------- API pública ---------
+    @property
+    def intended_rps(self) -> float:
+        if self.rps_per_worker <= 0 or not self._targets:
+            return 0.0
+        return self.rps_per_worker * self.num_workers
+
+    def start(self):
+        self._t = threading.Thread(target=self._thread_main, name=f"{self.name}-EventLoop", daemon=True)
+        self._t.start()
+        self._ready.wait(timeout=5.0)
+
+    def stop(self, timeout: Optional[float] = None):
+        if self._loop is None or self._t is None:
+            return
+        if timeout is None:
+            timeout = self.timeout + 2.0
+        try:
+            self._loop.call_soon_threadsafe(self._stop_evt.set)
+        except RuntimeError:
+            pass  # loop já encerrado
+        self._t.join(timeout=timeout)
+        if self._t.is_alive():
+            print(f"[{self.name}] Warning: event loop thread did not stop within {timeout}s.")
+
+    def is_running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def target_urls(self) -> List[str]:
+        return [t.url for t in self._targets]
+
+    def update_targets(self, target_urls: List[str]):
+        """
+        Troca o conjunto de alvos sem parar os workers (seguro de chamar de qualquer thread).
+        """
+        urls = list(dict.fromkeys(target_urls))
+        if self._loop is not None and self.is_running():
+            try:
+                self._loop.call_soon_threadsafe(self._apply_targets, urls)
+                return
+            except RuntimeError:
+                pass  # loop já encerrado
+        self._apply_targets(urls)
+
+    def get_rate_report(self) -> Dict[str, float]:
+        """
+        Taxa alcançada vs. pretendida desde a última chamada (janela = intervalo entre chamadas).
+        """
+        c = self.counters
+        now = time.monotonic()
+        sent, completed = c.sent, c.completed
+        with self._report_lock:
+            last_ts, last_sent, last_completed = self._last_report
+            self._last_report = (now, sent, completed)
+        window = max(now - last_ts, 1e-6)
+        return {
+            "intended_rps": self.intended_rps,
+            "sent_rps": (sent - last_sent) / window,
+            "achieved_rps": (completed - last_completed) / window,
+            "in_flight": c.in_flight,
+            "sent": sent,
+            "completed": completed,
+            "errors": c.errors,
+            "dropped": c.dropped,
+        }
+
+    # --------- Event loop ---------
+    def _thread_main(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            print(f"[{self.name}] Event loop crashed: {e}")
+        finally:
+            self._ready.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_evt = asyncio.Event()
+        self._ready.set()
+
+        requests_tasks = set()
+        for target in self._targets:
+            self._schedule_prewarm(target)
+        workers = [
+            asyncio.create_task(self._worker(i, requests_tasks))
+            for i in range(self.num_workers)
+        ]
+
+        await self._stop_evt.wait()
+
+        for w in workers:
+            w.cancel()
+        for t in list(requests_tasks) + list(self._prewarm_tasks):
+            t.cancel()
+        await asyncio.gather(*workers, *requests_tasks, *self._prewarm_tasks, return_exceptions=True)
+        for target in self._targets:
+            target.close_idle()
+        c = self.counters
+        print(f"[{self.name}] Stopped. Sent: {c.sent}, OK: {c.completed}, "
+              f"Errors: {c.errors}, Dropped (in-flight cap): {c.dropped}")
+
+    async def _worker(self, index: int, requests_tasks: set):
+        if self.rps_per_worker <= 0:
+            return
+        interval = 1.0 / self.rps_per_worker
+        # Espalha a fase dos workers para não dispararem todos no mesmo instante
+        next_send = self._loop.time() + interval * (index / max(self.num_workers, 1))
+
+        while True:
+            delay = next_send - self._loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Atraso do gerador em relação ao cronograma (event loop sobrecarregado)
+            lag_ms = max(0.0, (self._loop.time() - next_send) * 1000.0)
+            self.worker_lag_ms[index] = lag_ms
+            if self.on_schedule_lag is not None:
+                self.on_schedule_lag(index, lag_ms)
+
+            if not self._targets:
+                pass  # sem alvos no momento: o cronograma segue, nada é enviado
+            elif self.counters.in_flight >= self.max_in_flight:
+                self.counters.dropped += 1
+            else:
+                # O balanceador escolhe o alvo a cada envio (acompanha trocas feitas por update_targets)
+                stats = self.balancer.pick(self.worker_offset + index)
+                task = asyncio.create_task(self._request(self._by_url[stats.url], stats, next_send))
+                requests_tasks.add(task)
+                task.add_done_callback(requests_tasks.discard)
+
+            # Cronograma fixo: o próximo envio não depende de quando o anterior respondeu
+            next_send += interval
+
+    # --------- Troca de alvos ---------
+    def _apply_targets(self, urls: List[str]):
+        current = {t.url: t for t in self._targets}
+        new_targets = tuple(current.get(u) or _HttpTarget(u, self.query) for u in urls)
+        kept = {t.url for t in new_targets}
+        added = [t for t in new_targets if t.url not in current]
+        removed = [t for t in self._targets if t.url not in kept]
+        self._targets = new_targets
+        self._by_url = {t.url: t for t in new_targets}
+        self.balancer.set_targets(self._by_url)
+        for target in removed:
+            target.draining = True
+            target.close_idle()
+        if self._loop is not None and self.is_running():
+            for target in added:
+                self._schedule_prewarm(target)
+        if added or removed:
+            print(f"[{self.name}] Targets updated: +{[t.url for t in added]} -{[t.url for t in removed]} "
+                  f"({len(new_targets)} active)")
+
+    def _schedule_prewarm(self, target: _HttpTarget):
+        if self.prewarm_connections <= 0:
+            return
+        task = asyncio.create_task(self._prewarm(target))
+        self._prewarm_tasks.add(task)
+        task.add_done_callback(self._prewarm_tasks.discard)
+
+    async def _prewarm(self, target: _HttpTarget):
+        """
+        Abre conexões com um alvo novo antes que os workers precisem delas.
+        """
+        async def connect():
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(target.host, target.port), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                return
+            if target.draining:
+                writer.close()
+            else:
+                target.idle.append((reader, writer, time.monotonic()))
+        await asyncio.gather(*(connect() for _ in range(self.prewarm_connections)))
+
+    async def _request(self, target: _HttpTarget, stats: TargetStats, intended_send: float):
+        c = self.counters
+        c.sent += 1
+        c.in_flight += 1
+        # loop.time() e time.monotonic() usam o mesmo relógio
+        send_time = time.monotonic()
+        start = intended_send if self.latency_mode == "intended" else send_time
+        try:
+            status = await asyncio.wait_for(self._http_get(target), timeout=self.timeout)
+            if status == 200:
+                c.completed += 1
+                if self.on_latency is not None:
+                    self.on_latency((time.monotonic() - start) * 1000.0)
+            else:
+                c.errors += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Timeout, conexão recusada/resetada, resposta malformada...
+            c.errors += 1
+        finally:
+            c.in_flight -= 1
+            # Tempo de serviço observado (inclui erros/timeouts) alimenta o p2c
+            self.balancer.release(stats, (time.monotonic() - send_time) * 1000.0)
+
+    async def _http_get(self, target: _HttpTarget) -> int:
+        pooled = target.pop_idle(self.keepalive_idle_seconds)
+        if pooled is not None:
+            try:
+                return await self._exchange(target, *pooled, reused=True)
+            except _StaleConnection:
+                # O servidor fechou a conexão ociosa: uma nova tentativa numa conexão nova
+                pass
+        reader, writer = await asyncio.open_connection(target.host, target.port)
+        return await self._exchange(target, reader, writer, reused=False)
+
+    async def _exchange(self, target: _HttpTarget, reader: asyncio.StreamReader,
+                        writer: asyncio.StreamWriter, reused: bool) -> int:
+        try:
+            try:
+                writer.write(target.request_bytes)
+                await writer.drain()
+                status_line = await reader.readline()
+            except (ConnectionError, OSError):
+                if reused:
+                    raise _StaleConnection()
+                raise
+            if not status_line:
+                if reused:
+                    raise _StaleConnection()
+                raise ConnectionError("connection closed before response")
+            version, status = status_line.split(b" ", 2)[:2]
+
+            content_length = None
+            keep_alive = version == b"HTTP/1.1"
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.partition(b":")
+                key = key.strip().lower()
+                if key == b"content-length":
+                    content_length = int(value.strip())
+                elif key == b"connection":
+                    keep_alive = value.strip().lower() == b"keep-alive"
+
+            if content_length is not None:
+                await reader.readexactly(content_length)
+            else:
+                # Sem Content-Length (ex.: servidor HTTP/1.0): corpo vai até o EOF
+                await reader.read()
+                keep_alive = False
+        except BaseException:
+            writer.close()
+            raise
+
+        if keep_alive and not target.draining:
+            target.idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+        return int(status)
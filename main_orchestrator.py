@@ -1,45 +1,70 @@
 import time
-import csv
 import docker # Certifique-se de que 'docker' SDK está instalado (pip install docker)
 
 # Importar seus outros módulos (assumindo que estão no mesmo diretório ou no PYTHONPATH)
 import config
 import docker_manager
 import autoscaler_logic
-import traffic_injectorV0
+import traffic_injector
 import normal_traffic
 import cost_calculator # Se você tem um módulo separado para isso
+from container_registry import ContainerRegistry
+from forecasting import LoadForecaster
+from scaling_executor import ScalingExecutor
+from load_balancer import format_distribution
+from metrics_schema import METRICS_COLUMNS, build_metrics_row
+from metrics_sink import MetricsSink, config_snapshot, export_csv
+from pulse_detector import PulseDetector
 from stats_collector import StatsCollector
-from normal_traffic import get_average_rtt_ms
-from traffic_injectorV0 import get_average_rtt_attack_ms
 
-# --- Função de Logging para CSV (pode estar aqui ou em um módulo utilitário) ---
-def log_metrics_to_csv(elapsed_time, num_instances, avg_cpu, mem_usage,avg_rtt, decision, active_names, label):
+metrics_sink = None # MetricsSink do run em andamento (criado em main)
+
+
+def _format_worker_lag(worker_lag_ms, top=5):
+    # Apenas os workers mais atrasados, para o log não crescer com o nº de atacantes
+    worst = sorted(worker_lag_ms.items(), key=lambda item: item[1], reverse=True)[:top]
+    return ', '.join(f"{name}={lag:.1f}ms" for name, lag in worst) or 'n/a'
+
+# --- Logging das métricas (enfileira no metrics_sink; a gravação é em lote, em background) ---
+def log_metrics(elapsed_time, num_instances, avg_cpu, scaling_cpu, mem_usage, normal_latency, attack_latency, normal_lag, attack_lag, normal_distribution, attack_distribution, startups, instance_states, decision, active_names, label, forecast=None, pulse=None, excluded=None):
+    try:
+        metrics_sink.write(build_metrics_row(elapsed_time, num_instances, avg_cpu, scaling_cpu, mem_usage,
+                                             normal_latency, attack_latency, normal_lag, attack_lag,
+                                             normal_distribution, attack_distribution, startups,
+                                             instance_states, decision, active_names, label, forecast, pulse, excluded))
+    except Exception as e:
+        print(f"[Orchestrator] Error logging metrics: {e}")
+
+
+def close_metrics_sink():
+    """
+    Grava o que falta no arquivo de run e exporta o CSV usado pelas ferramentas de análise.
+    """
+    global metrics_sink
+    if metrics_sink is None:
+        return
+    sink, metrics_sink = metrics_sink, None
     try:
-        with open(config.METRICS_LOG_FILE, 'a', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=['elapsed_time_s', 'num_instances', 'average_cpu_percent', 'mem_usage', 'avg_rtt_ms', 'decision', 'active_containers_names', 'label'])
-            writer.writerow({
-                'elapsed_time_s': round(elapsed_time, 2),
-                'num_instances': num_instances,
-                'average_cpu_percent': round(avg_cpu, 2),
-                'mem_usage': round(mem_usage,2),
-                'avg_rtt_ms': round(avg_rtt,2),
-                'decision': decision,
-                'active_containers_names': ','.join(active_names) if active_names else '',
-                'label': label,
-            })
+        sink.close()
+        rows = export_csv(sink.path, config.METRICS_LOG_FILE)
+        print(f"[Orchestrator] Exported {rows} metric rows from {sink.path} to {config.METRICS_LOG_FILE}")
     except Exception as e:
-        print(f"[Orchestrator] Error logging metrics to CSV: {e}")
+        print(f"[Orchestrator] Error closing metrics sink / exporting CSV: {e}")
 
 # --- Função Principal da Simulação ---
 def main():
 
-    global stats_collector
+    global stats_collector, metrics_sink
 
     print("[Orchestrator] Initializing simulation environment...")
     
     # --- CORREÇÃO AQUI: Instanciar a classe Autoscaler ---
-    autoscaler = autoscaler_logic.Autoscaler() # Cria uma instância da classe Autoscaler
+    # Previsão de carga sempre ativa: com a política "threshold" é só registrada (comparação com a preditiva)
+    forecaster = LoadForecaster()
+    # Detector de pulsos sempre registra o veredito; só amortece scale-up com PULSE_DETECTOR_DAMPING
+    pulse_detector = PulseDetector()
+    autoscaler = autoscaler_logic.create_autoscaler( # Política de config.AUTOSCALER_POLICY
+        forecaster=forecaster, pulse_detector=pulse_detector if config.PULSE_DETECTOR_DAMPING else None)
 
     if not docker_manager.build_docker_image(): # Usando diretamente se são funções
         print("[Orchestrator] CRITICAL: Failed to build Docker image. Aborting.")
@@ -51,369 +76,456 @@ def main():
     print("[Orchestrator] Cleaning up any pre-existing simulation instances...")
     docker_manager.cleanup_all_simulation_instances()
 
-    active_containers = [] # Lista de objetos container do Docker SDK
-    next_instance_numeric_id = 1
-    print(f"[Orchestrator] Starting initial {config.MIN_INSTANCES} instance(s)...")
-    for _ in range(config.MIN_INSTANCES):
-        # Assumindo que start_instance retorna o objeto container ou None
-        container = docker_manager.start_instance(next_instance_numeric_id)
-        if container:
-            active_containers.append(container)
-            next_instance_numeric_id += 1
-        else:
-            print(f"[Orchestrator] CRITICAL: Failed to start initial instance {next_instance_numeric_id}. Aborting.")
-            docker_manager.cleanup_all_simulation_instances() # Limpar o que foi iniciado
-            return
-    
-    # ... após preencher active_containers ...
-    stats_collector = StatsCollector(client=docker_manager.client,
-                        poll_interval=getattr(config, "DOCKER_STATS_POLL_INTERVAL_SECONDS", 1.0))
-    stats_collector.start()
-    stats_collector.update_containers(active_containers)
-
-            
-    if not active_containers and config.MIN_INSTANCES > 0:
-        print("[Orchestrator] CRITICAL: No initial instances were started. Aborting.")
-        return
-
-    # --- CORREÇÃO AQUI: Chamar o método na instância 'autoscaler' ---
-    autoscaler.set_initial_instances(len(active_containers)) # Agora chama na instância
-    print(f"[Orchestrator] {len(active_containers)} initial instance(s) running.")
-
-    start_time = time.time()
-    simulation_duration = config.SIMULATION_DURATION_SECONDS
-    
-    instance_intervals_for_cost = [] # Para cálculo de custo
-
-    # --- Variáveis para controle do ataque EDoS ---
-    # tracked_attack_state: 'idle', 'saturating', 'pulsing', 'idle_between_pulses'
-    tracked_attack_state = 'idle' 
-    last_pulse_end_time = 0.0 # Hora que o último pulso terminou, para gerenciar o próximo
-
-    # --- Inicialização da flag de ataque do injetor ---
-    # Garante que o injetor comece limpo. (traffic_injector.py foi alterado para usar attacker_threads)
-    traffic_injectorV0.attack_active = False 
-    traffic_injectorV0.attacker_threads = [] 
-
-    # --- Variáveis para a lógica de reinício do injetor ---
-    previous_num_instances_for_injector_logic = len(active_containers) # Estado para lógica de reinício do injetor
-    attack_has_started = False  # Se o injetor foi iniciado pelo menos uma vez
-    normal_traffic_has_started = False
-
-    # Configurar arquivo de log CSV no início
+    # Recursos com thread/contêineres em background: o finally abaixo encerra o que chegou a subir,
+    # seja no fim normal, num abort do setup ou numa exceção/Ctrl+C
+    container_registry = None
+    scaling_executor = None
+    stats_collector = None
     try:
-        with open(config.METRICS_LOG_FILE, 'w', newline='') as csvfile:
-            fieldnames = ['elapsed_time_s', 'num_instances', 'average_cpu_percent', 'mem_usage',
-                  'decision', 'active_containers_names', 'label']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-        print(f"[Orchestrator] Metrics will be logged to: {config.METRICS_LOG_FILE}")
-    except Exception as e_csv_init:
-        print(f"[Orchestrator] CRITICAL: Failed to initialize metrics log file {config.METRICS_LOG_FILE}. Error: {e_csv_init}. Aborting.")
-        docker_manager.cleanup_all_simulation_instances()
-        return
+        # Endpoints e estado das instâncias, atualizados pelo stream de eventos do Docker
+        container_registry = ContainerRegistry(docker_manager.client, f"{config.BASE_CONTAINER_NAME}_",
+                                               container_port=config.APP_CONTAINER_PORT)
+        container_registry.start()
+
+        active_containers = [] # Lista de objetos container do Docker SDK
+        print(f"[Orchestrator] Starting initial {config.MIN_INSTANCES} instance(s)...")
+        for _ in range(config.MIN_INSTANCES):
+            # IDs vêm do alocador do docker_manager (compartilhado com o warm pool)
+            instance_numeric_id = docker_manager.allocate_instance_id()
+            container = docker_manager.start_instance(instance_numeric_id)
+            if container:
+                container_registry.register(container)
+                active_containers.append(container)
+            else:
+                print(f"[Orchestrator] CRITICAL: Failed to start initial instance {instance_numeric_id}. Aborting.")
+                return # o finally limpa o que foi iniciado
 
-    print(f"[Orchestrator] Starting simulation main loop for {simulation_duration} seconds.")
-    print(f"[Orchestrator] Monitoring interval: {config.MONITOR_INTERVAL_SECONDS}s. Cooldown: {config.SCALE_COOLDOWN_SECONDS}s.")
-    print(f"[Orchestrator] CPU Thresholds: Scale Up > {config.CPU_THRESHOLD_SCALE_UP}%, Scale Down < {config.CPU_THRESHOLD_SCALE_DOWN}%")
-    if config.ATTACK_DURATION_SECONDS > 0:
-        print(f"[Orchestrator] Traffic injection scheduled: Start at {config.ATTACK_START_TIME_SECONDS}s, Duration {config.ATTACK_DURATION_SECONDS}s.")
-    else:
-        print("[Orchestrator] No traffic injection scheduled (ATTACK_DURATION_SECONDS is 0 or less).")
+        # Instâncias pré-criadas para o scale-up (config.WARM_POOL_SIZE = 0 desativa)
+        docker_manager.start_warm_pool()
+        scale_up_ready_ms = {"warm": [], "cold": []} # Tempo decisão -> instância pronta, por caminho
 
-    attack_start_time = config.ATTACK_START_TIME_SECONDS
-    pulse_duration = config.PULSE_DURATION
+        # Start/stop de contêineres em background: o loop mantém a cadência de amostragem
+        scaling_executor = ScalingExecutor(max_workers=getattr(config, "SCALING_EXECUTOR_WORKERS", 0) or config.MAX_INSTANCES)
+        for container in active_containers:
+            scaling_executor.adopt(container)
+    
+        # ... após preencher active_containers ...
+        scaling_window_seconds = getattr(config, "AUTOSCALER_METRIC_WINDOW_SECONDS", 0)
+        scaling_statistic = getattr(config, "AUTOSCALER_METRIC_STATISTIC", "mean")
+        stats_windows = set(getattr(config, "STATS_WINDOWS_SECONDS", (10, 60)))
+        if scaling_window_seconds > 0:
+            stats_windows.add(scaling_window_seconds)
+        stats_collector = StatsCollector(client=docker_manager.client,
+                            poll_interval=getattr(config, "DOCKER_STATS_POLL_INTERVAL_SECONDS", 1.0),
+                            mode=getattr(config, "DOCKER_STATS_MODE", "poll"),
+                            windows=sorted(stats_windows))
+        stats_collector.start()
+        stats_collector.update_containers(active_containers)
 
-    if pulse_duration > config.SCALE_COOLDOWN_SECONDS:
-        print("[Debug Orchestrador] Pulse duration longer than autoscaling cooldown: Setting pulse duration to cooldown seconds...")
-        pulse_duration = config.SCALE_COOLDOWN_SECONDS
-        attack_end = attack_start_time + pulse_duration
+        def on_container_exit(record, event):
+            # Roda na thread de eventos: instância que caiu sai dos alvos e da coleta na hora
+            if not scaling_executor.discard(record.name):
+                return # parada pedida pelo scale-down (já estava em "draining")
+            reason = "OOM-killed" if record.oom_killed else f"'{event}' event, exit code {record.exit_code}"
+            print(f"[Orchestrator] Instance {record.name} left service unexpectedly ({reason}). Removing it from targets.")
+            running = scaling_executor.running()
+            stats_collector.update_containers(running)
+            urls = container_registry.urls(running)
+            traffic_injector.update_flood_targets(urls)
+            normal_traffic.update_traffic_targets(urls)
 
-    else:
-        attack_end = attack_start_time + pulse_duration
+        container_registry.subscribe(on_container_exit)
 
+            
+        if not active_containers and config.MIN_INSTANCES > 0:
+            print("[Orchestrator] CRITICAL: No initial instances were started. Aborting.")
+            return
 
-    main_loop_iteration = 0
-    while (time.time() - start_time) < simulation_duration:
-        current_loop_start_time = time.time() # Para calcular o tempo de sleep
-        time.sleep(0.01)
-        elapsed_time_seconds = current_loop_start_time - start_time
-        main_loop_iteration += 1
-        label = 'normal'
-        print(f"\n--- Iteration {main_loop_iteration} | Time: {elapsed_time_seconds:.1f}s / {simulation_duration}s ---")
+        # --- CORREÇÃO AQUI: Chamar o método na instância 'autoscaler' ---
+        autoscaler.set_initial_instances(len(active_containers)) # Agora chama na instância
+        print(f"[Orchestrator] {len(active_containers)} initial instance(s) running.")
 
-        # 1. Validar e Coletar Métricas das Instâncias Ativas
+        start_time = time.time()
+        simulation_duration = config.SIMULATION_DURATION_SECONDS
+    
+        instance_intervals_for_cost = [] # Para cálculo de custo
 
-        stats_collector.update_containers(active_containers)
+        # --- Variáveis para controle do ataque EDoS ---
+        # tracked_attack_state: 'idle', 'saturating', 'pulsing', 'idle_between_pulses'
+        tracked_attack_state = 'idle' 
+        last_pulse_end_time = 0.0 # Hora que o último pulso terminou, para gerenciar o próximo
 
-        current_num_instances_actual = len(active_containers)
-        avg_cpu, avg_mem_app_mb, current_active_container_names = stats_collector.get_averages()
-        if normal_traffic_has_started:
-            avg_rtt = get_average_rtt_ms()
-            print(f"[Orchestrator]RTT = {avg_rtt}")
+        # --- Inicialização da flag de ataque do injetor ---
+        # Garante que o injetor comece limpo. (traffic_injector.py foi alterado para usar attacker_threads)
+        traffic_injector.attack_active = False 
+        traffic_injector.attacker_threads = [] 
 
+        # --- Variáveis para a lógica de reinício do injetor ---
+        previous_num_instances_for_injector_logic = len(active_containers) # Estado para lógica de reinício do injetor
+        attack_has_started = False  # Se o injetor foi iniciado pelo menos uma vez
+        normal_traffic_has_started = False
 
-        
-        else :
-            avg_rtt = get_average_rtt_attack_ms()
-            print(f"[Orchestrator]RTT = {avg_rtt}")
+        # Arquivo de run binário (com snapshot do config); o CSV é exportado dele no fim
+        run_file = getattr(config, "METRICS_RUN_FILE", "simulation_metrics.edosrun")
+        try:
+            metrics_sink = MetricsSink(run_file, METRICS_COLUMNS, config=config_snapshot(config),
+                                       flush_rows=getattr(config, "METRICS_FLUSH_ROWS", 512),
+                                       flush_interval=getattr(config, "METRICS_FLUSH_INTERVAL_SECONDS", 1.0))
+            print(f"[Orchestrator] Metrics will be logged to: {run_file} (exported to {config.METRICS_LOG_FILE} at the end)")
+        except Exception as e_csv_init:
+            print(f"[Orchestrator] CRITICAL: Failed to initialize metrics run file {run_file}. Error: {e_csv_init}. Aborting.")
+            return
 
+        print(f"[Orchestrator] Starting simulation main loop for {simulation_duration} seconds.")
+        print(f"[Orchestrator] Monitoring interval: {config.MONITOR_INTERVAL_SECONDS}s. Cooldown: {config.SCALE_COOLDOWN_SECONDS}s.")
+        print(f"[Orchestrator] CPU Thresholds: Scale Up > {config.CPU_THRESHOLD_SCALE_UP}%, Scale Down < {config.CPU_THRESHOLD_SCALE_DOWN}%")
+        if config.ATTACK_DURATION_SECONDS > 0:
+            print(f"[Orchestrator] Traffic injection scheduled: Start at {config.ATTACK_START_TIME_SECONDS}s, Duration {config.ATTACK_DURATION_SECONDS}s.")
+        else:
+            print("[Orchestrator] No traffic injection scheduled (ATTACK_DURATION_SECONDS is 0 or less).")
 
+        attack_start_time = config.ATTACK_START_TIME_SECONDS
+        pulse_duration = config.PULSE_DURATION
 
-        if current_num_instances_actual == 0 and config.MIN_INSTANCES > 0 and elapsed_time_seconds > config.MONITOR_INTERVAL_SECONDS:
-                print("[Orchestrator] CRITICAL WARNING: No active instances running, but MIN_INSTANCES > 0.")
-        print(f"[Orchestrator] Metrics: {current_num_instances_actual} active instance(s), "
-            f"Avg CPU: {avg_cpu:.2f}%, Avg App MEM: {avg_mem_app_mb:.2f} MB")
+        if pulse_duration > config.SCALE_COOLDOWN_SECONDS:
+            print("[Debug Orchestrador] Pulse duration longer than autoscaling cooldown: Setting pulse duration to cooldown seconds...")
+            pulse_duration = config.SCALE_COOLDOWN_SECONDS
+            attack_end = attack_start_time + pulse_duration
 
+        else:
+            attack_end = attack_start_time + pulse_duration
 
-        # 2. Decidir sobre o escalonamento
-        # --- CORREÇÃO AQUI: ChamaFr o método na instância 'autoscaler' ---
-        scaling_decision = autoscaler.decide_scaling(avg_cpu, current_num_instances_actual)
 
-        # 3. Executar ações de escalonamento (atualiza 'active_containers' e 'next_instance_numeric_id')
-        if scaling_decision == "SCALE_UP":
-            if current_num_instances_actual < config.MAX_INSTANCES:
-                print(f"[Orchestrator] Action: Scaling UP from {current_num_instances_actual} instance(s). Attempting to start instance {next_instance_numeric_id}.")
-                new_container = docker_manager.start_instance(next_instance_numeric_id)
-                if new_container:
-                    active_containers.append(new_container)
-                    stats_collector.update_containers(active_containers)
-                    next_instance_numeric_id += 1
-                    print(f"[Orchestrator] Successfully started {new_container.name}. Now {len(active_containers)} instance(s).")
+        main_loop_iteration = 0
+        next_tick_time = start_time # Cadência fixa: cada tick é agendado a partir do início, sem acumular atraso
+        while (time.time() - start_time) < simulation_duration:
+            current_loop_start_time = time.time() # Para calcular o tempo de sleep
+            time.sleep(0.01)
+            elapsed_time_seconds = current_loop_start_time - start_time
+            main_loop_iteration += 1
+            label = 'normal'
+            print(f"\n--- Iteration {main_loop_iteration} | Time: {elapsed_time_seconds:.1f}s / {simulation_duration}s ---")
+
+            # 1. Validar e Coletar Métricas das Instâncias Ativas
+
+            active_containers = scaling_executor.running() # já sem as instâncias que caíram (eventos do Docker)
+            stats_collector.update_containers(active_containers)
+
+            current_num_instances_actual = len(active_containers)
+            avg_cpu, avg_mem_app_mb, current_active_container_names = stats_collector.get_averages()
+            # Distribuição de latência do último intervalo (histogramas, memória constante)
+            normal_latency = normal_traffic.get_interval_latency()
+            attack_latency = traffic_injector.get_interval_latency()
+            print(f"[Orchestrator] Normal RTT: n={normal_latency['count']} p50={normal_latency['p50_ms']:.1f}ms "
+                  f"p95={normal_latency['p95_ms']:.1f}ms p99={normal_latency['p99_ms']:.1f}ms max={normal_latency['max_ms']:.1f}ms")
+            print(f"[Orchestrator] Attack RTT: n={attack_latency['count']} p50={attack_latency['p50_ms']:.1f}ms "
+                  f"p95={attack_latency['p95_ms']:.1f}ms p99={attack_latency['p99_ms']:.1f}ms max={attack_latency['max_ms']:.1f}ms")
+            # Atraso dos geradores em relação ao cronograma de RPS (gerador saturado = latência subestimada)
+            normal_lag = normal_traffic.get_interval_schedule_lag()
+            attack_lag = traffic_injector.get_interval_schedule_lag()
+            print(f"[Orchestrator] Normal schedule lag: p99={normal_lag['p99_ms']:.1f}ms max={normal_lag['max_ms']:.1f}ms "
+                  f"| worst workers: {_format_worker_lag(normal_traffic.get_worker_schedule_lag_ms())}")
+            print(f"[Orchestrator] Attack schedule lag: p99={attack_lag['p99_ms']:.1f}ms max={attack_lag['max_ms']:.1f}ms "
+                  f"| worst workers: {_format_worker_lag(traffic_injector.get_worker_schedule_lag_ms())}")
+            # Requisições roteadas para cada instância no intervalo (quão uniforme foi a carga)
+            normal_distribution = normal_traffic.get_target_distribution()
+            attack_distribution = traffic_injector.get_target_distribution()
+            print(f"[Orchestrator] Normal per-target requests: {format_distribution(normal_distribution)}")
+            print(f"[Orchestrator] Attack per-target requests: {format_distribution(attack_distribution)}")
+
+            attack_rate = traffic_injector.get_rate_report()
+            if attack_rate is not None:
+                print(f"[Orchestrator] Attack rate: intended {attack_rate['intended_rps']:.1f} RPS, "
+                      f"sent {attack_rate['sent_rps']:.1f} RPS, achieved {attack_rate['achieved_rps']:.1f} RPS, "
+                      f"in-flight {attack_rate['in_flight']}, errors {attack_rate['errors']}, dropped {attack_rate['dropped']}")
+            normal_rate = normal_traffic.get_rate_report()
+            if normal_rate is not None:
+                print(f"[Orchestrator] Normal traffic rate: intended {normal_rate['intended_rps']:.1f} RPS, "
+                      f"achieved {normal_rate['achieved_rps']:.1f} RPS, errors {normal_rate['errors']}")
+
+
+
+            if current_num_instances_actual == 0 and config.MIN_INSTANCES > 0 and elapsed_time_seconds > config.MONITOR_INTERVAL_SECONDS:
+                    print("[Orchestrator] CRITICAL WARNING: No active instances running, but MIN_INSTANCES > 0.")
+            print(f"[Orchestrator] Metrics: {current_num_instances_actual} active instance(s), "
+                f"Avg CPU: {avg_cpu:.2f}%, Avg App MEM: {avg_mem_app_mb:.2f} MB")
+            # CPU usada na decisão: estatística da janela recente (buffers circulares do coletor),
+            # em vez de uma única amostra instantânea (0 = usa a amostra instantânea), agregada entre
+            # as instâncias sem as que ainda estão em warm-up (ver cluster_metrics.py)
+            requests_by_name = {}
+            for container in active_containers:
+                record = container_registry.get(container.name)
+                if record is not None and record.url:
+                    requests_by_name[container.name] = (normal_distribution.get(record.url, 0)
+                                                        + attack_distribution.get(record.url, 0))
+            scaling_cpu, warming_instances = stats_collector.get_cluster_metric(
+                "cpu_percent", scaling_window_seconds, scaling_statistic, requests_by_name=requests_by_name)
+            print(f"[Orchestrator] Scaling CPU ({config.CLUSTER_METRIC_AGGREGATION} of "
+                  + (f"{scaling_statistic} over {scaling_window_seconds:g}s" if scaling_window_seconds > 0 else "last sample")
+                  + f"): {scaling_cpu:.2f}%"
+                  + (f" | warming up / no data: {', '.join(warming_instances)}" if warming_instances else ""))
+
+
+            # Carga do intervalo (CPU + requisições concluídas/s) alimenta a previsão antes da decisão
+            request_rate = (normal_latency['count'] + attack_latency['count']) / config.MONITOR_INTERVAL_SECONDS
+            # Prevê a mesma métrica que o autoscaler compara com o limiar (PredictiveAutoscaler usa o máximo das duas)
+            forecaster.observe(scaling_cpu, current_num_instances_actual, request_rate)
+            forecast = forecaster.report()
+            # Rajada = a métrica do autoscaler acima do limiar: a duração aprendida é a que o amortecimento compara
+            pulse_detector.observe(scaling_cpu, current_num_instances_actual, request_rate)
+            pulse = pulse_detector.report()
+            print(f"[Orchestrator] Pulse detector: {pulse['pulse_verdict']} (confidence {pulse['pulse_confidence']:.2f}, "
+                  f"period {pulse['pulse_period_s'] or 0:.0f}s, duty cycle {pulse['pulse_duty_cycle']:.2f})")
+            if forecast['cpu_forecast_abs_error'] is not None:
+                print(f"[Orchestrator] Forecast: next CPU {forecast['cpu_forecast']:.2f}% "
+                      f"(last error {forecast['cpu_forecast_abs_error']:.2f}%, MAE {forecast['cpu_forecast_mae']:.2f}%), "
+                      f"next RPS {forecast['rps_forecast']:.1f} (last error {forecast['rps_forecast_abs_error']:.1f})")
+
+            # 2. Decidir sobre o escalonamento
+            # O autoscaler vê também as instâncias que ainda estão subindo (evita pedir a mesma duas vezes)
+            provisioned_instances = scaling_executor.provisioned_count()
+            scaling_metrics = {"ready_instances": current_num_instances_actual,
+                               "p95_rtt_ms": normal_latency['p95_ms'] if normal_latency['count'] else None,
+                               "request_rate": request_rate}
+            scaling_decision, desired_instances = autoscaler.decide_desired_instances(scaling_cpu, provisioned_instances,
+                                                                                      scaling_metrics)
+            desired_instances = max(config.MIN_INSTANCES, min(config.MAX_INSTANCES, desired_instances))
+
+            # 3. Submeter ações de escalonamento (o start/stop roda em background; o loop não bloqueia)
+            # O delta inteiro é submetido de uma vez: as instâncias sobem/descem em paralelo
+            if scaling_decision == "SCALE_UP":
+                delta = desired_instances - provisioned_instances
+                if delta > 0:
+                    print(f"[Orchestrator] Action: Scaling UP from {provisioned_instances} to {desired_instances} instance(s) (submitted in background).")
+                    for _ in range(delta):
+                        scaling_executor.scale_up()
                 else:
-                    print(f"[Orchestrator] Failed to start new instance for SCALE_UP.")
-            else:
-                print(f"[Orchestrator] SCALE_UP requested, but already at MAX_INSTANCES ({config.MAX_INSTANCES}). No action.")
-        elif scaling_decision == "SCALE_DOWN":
-            if current_num_instances_actual > config.MIN_INSTANCES:
-                # Simples: para o último da lista. Poderia ser mais sofisticado.
-                container_to_stop = active_containers.pop()
-                stats_collector.update_containers(active_containers)
-                print(f"[Orchestrator] Action: Scaling DOWN from {current_num_instances_actual} instance(s). Stopping {container_to_stop.name}.")
-                if docker_manager.stop_instance(container_to_stop.name): # stop_instance deve retornar True/False
-                    print(f"[Orchestrator] Successfully stopped {container_to_stop.name}. Now {len(active_containers)} instance(s).")
+                    print(f"[Orchestrator] SCALE_UP requested, but already at MAX_INSTANCES ({config.MAX_INSTANCES}). No action.")
+            elif scaling_decision == "SCALE_DOWN":
+                # Excedente sai primeiro das instâncias que ainda estão subindo; só então drena as
+                # últimas em "running", sem nunca deixar menos que MIN_INSTANCES servindo
+                surplus = max(0, provisioned_instances - desired_instances)
+                cancelled = 0
+                while cancelled < surplus and scaling_executor.cancel_scale_up():
+                    cancelled += 1
+                drainable = max(0, len(active_containers) - config.MIN_INSTANCES)
+                to_drain = min(surplus - cancelled, drainable)
+                containers_to_stop = active_containers[len(active_containers) - to_drain:] if to_drain > 0 else []
+                if cancelled or containers_to_stop:
+                    print(f"[Orchestrator] Action: Scaling DOWN from {provisioned_instances} to {desired_instances} instance(s). "
+                          f"Cancelled {cancelled} scale-up(s) in progress"
+                          + (f", draining {', '.join(c.name for c in containers_to_stop)}." if containers_to_stop else "."))
+                    for container_to_stop in containers_to_stop:
+                        scaling_executor.scale_down(container_to_stop)
+                elif surplus:
+                    print(f"[Orchestrator] SCALE_DOWN requested, but only {len(active_containers)} running instance(s) "
+                          f"(MIN_INSTANCES={config.MIN_INSTANCES}). No action.")
                 else:
-                    print(f"[Orchestrator] Failed to stop {container_to_stop.name}. Adding back to active list (caution).")
-                    active_containers.append(container_to_stop) # Adicionar de volta se a parada falhou
-            else:
-                 print(f"[Orchestrator] SCALE_DOWN requested, but already at MIN_INSTANCES ({config.MIN_INSTANCES}). No action.")
-        
-        # Número de instâncias após scaling para esta iteração
-        num_instances_after_scaling = len(active_containers)
-        autoscaler.record_scale_action(num_instances_after_scaling) # Atualizar o autoscaler
-
-        # 4. Gerenciar o injetor de tráfego (COM LÓGICA DE REINÍCIO E LOGS)
-        target_urls_for_injector = []
-        if active_containers: # Somente tente obter URLs se houver contêineres ativos
-            for c_obj in active_containers:
-                try:
-                    c_obj.reload() # Essencial para obter os atributos mais recentes, incluindo portas
-                    port_mappings = c_obj.attrs.get('NetworkSettings', {}).get('Ports', {}).get(f'{config.APP_CONTAINER_PORT}/tcp')
-                    if port_mappings and isinstance(port_mappings, list) and len(port_mappings) > 0:
-                        host_port = port_mappings[0].get('HostPort')
-                        if host_port:
-                            target_urls_for_injector.append(f"http://localhost:{host_port}")
-                        else:
-                            print(f"[Orchestrator] Warning: HostPort not found for {c_obj.name} in '{config.APP_CONTAINER_PORT}/tcp' mapping: {port_mappings[0]}")
-                    else:
-                        print(f"[Orchestrator] Warning: No '{config.APP_CONTAINER_PORT}/tcp' mapping found or empty for {c_obj.name}. Ports: {c_obj.attrs.get('NetworkSettings', {}).get('Ports', {})}")
-                except Exception as e_port:
-                    print(f"[Orchestrator] Error reloading or getting port for container {c_obj.name} for traffic injection: {e_port}")
-
-        print(f"[DEBUG Orchestrator] Iteration Start. Instances Before Injector Logic: {num_instances_after_scaling}, Prev Injector Logic Instances: {previous_num_instances_for_injector_logic}, Attack Started Flag: {attack_has_started}, Normal Traffic Started Flag: {normal_traffic_has_started}")
-        print(f"[DEBUG Orchestrator] URLs derived for injector (if active): {target_urls_for_injector}")
-
-        if config.ATTACK_DURATION_SECONDS == 0:
-                print(f"[Orchestrator] Starting/Restarting Normal Traffic. Target URLs for this call: {target_urls_for_injector}")
-                normal_traffic.start_http_traffic(
-                        target_urls_for_injector,
-                        config.HTTP_NORMAL_RPS_PER_CLIENT,
-                        config.HTTP_NORMAL_NUM_CLIENTS
-                    )
-                normal_traffic_has_started = True
-
-        if config.ATTACK_DURATION_SECONDS > 0:
-            label = 'normal'
-            if current_num_instances_actual < config.MAX_INSTANCES:
-                is_max_instance = False
+                    print(f"[Orchestrator] SCALE_DOWN requested, but already at MIN_INSTANCES ({config.MIN_INSTANCES}). No action.")
+
+            # Instâncias que ficaram prontas em background desde o último tick
+            startups = {}  # nome -> ms até o primeiro HTTP 200, de todas as que ficaram prontas no tick
+            ready_instances, failed_starts = scaling_executor.poll()
+            for instance in ready_instances:
+                container_registry.register(instance.container)
+                scale_up_ready_ms[instance.start_path].append(instance.ready_ms)
+                if instance.startup_ms is not None:
+                    startups[instance.name] = instance.startup_ms
+                print(f"[Orchestrator] {instance.name} is ready. Scale-up decision-to-ready: {instance.ready_ms:.0f} ms "
+                      f"({instance.start_path} path)"
+                      + (f", time-to-first-200: {instance.startup_ms:.0f} ms" if instance.startup_ms is not None else ""))
+            if failed_starts:
+                print(f"[Orchestrator] {failed_starts} background scale-up(s) failed to start an instance.")
+            active_containers = scaling_executor.running()
+            stats_collector.update_containers(active_containers)
+            instance_states = scaling_executor.counts()
+            print(f"[Orchestrator] Instance states: " + ", ".join(f"{state}={n}" for state, n in instance_states.items()))
+
+            # Número de instâncias após scaling para esta iteração
+            num_instances_after_scaling = len(active_containers)
+            autoscaler.record_scale_action(num_instances_after_scaling) # Atualizar o autoscaler
+
+            # 4. Gerenciar o injetor de tráfego (COM LÓGICA DE REINÍCIO E LOGS)
+            # Endpoints vêm do cache do registro (extraídos uma vez no start; sem inspect por tick)
+            target_urls_for_injector = container_registry.urls(active_containers)
+
+            print(f"[DEBUG Orchestrator] Iteration Start. Instances Before Injector Logic: {num_instances_after_scaling}, Prev Injector Logic Instances: {previous_num_instances_for_injector_logic}, Attack Started Flag: {attack_has_started}, Normal Traffic Started Flag: {normal_traffic_has_started}")
+            print(f"[DEBUG Orchestrator] URLs derived for injector (if active): {target_urls_for_injector}")
+
+            # Troca a quente dos alvos dos geradores em execução: instâncias novas entram na
+            # rotação já neste tick e as removidas são drenadas, sem parar/reiniciar os workers
+            traffic_injector.update_flood_targets(target_urls_for_injector)
+            normal_traffic.update_traffic_targets(target_urls_for_injector)
+
+            if config.ATTACK_DURATION_SECONDS == 0:
+                    print(f"[Orchestrator] Starting/Restarting Normal Traffic. Target URLs for this call: {target_urls_for_injector}")
+                    normal_traffic.start_http_traffic(
+                            target_urls_for_injector,
+                            config.HTTP_NORMAL_RPS_PER_CLIENT,
+                            config.HTTP_NORMAL_NUM_CLIENTS
+                        )
+                    normal_traffic_has_started = True
+
+            if config.ATTACK_DURATION_SECONDS > 0:
+                label = 'normal'
+                if current_num_instances_actual < config.MAX_INSTANCES:
+                    is_max_instance = False
             
-            else:
-                is_max_instance = True
+                else:
+                    is_max_instance = True
 
 
-            should_attack_be_active_now = (attack_start_time <= elapsed_time_seconds < attack_end)
+                should_attack_be_active_now = (attack_start_time <= elapsed_time_seconds < attack_end)
 
-            if elapsed_time_seconds >= attack_end:
-                attack_start_time = attack_start_time + config.SCALE_COOLDOWN_SECONDS
-                attack_end = attack_start_time + config.PULSE_DURATION 
+                if elapsed_time_seconds >= attack_end:
+                    attack_start_time = attack_start_time + config.SCALE_COOLDOWN_SECONDS
+                    attack_end = attack_start_time + config.PULSE_DURATION 
 
-            print(f"[DEBUG Orchestrator] Should attack be active now? {should_attack_be_active_now}")
+                print(f"[DEBUG Orchestrator] Should attack be active now? {should_attack_be_active_now}")
 
-            print(f"[DEBUG Orchestrator] {attack_start_time} {attack_end}")
+                print(f"[DEBUG Orchestrator] {attack_start_time} {attack_end}")
 
-            needs_injector_start_or_restart = False
+                needs_injector_start_or_restart = False
 
-            #------------------COMEÇAR AQUI A LOGICA DE TRAFEGO NORMAL --------------------------
+                #------------------COMEÇAR AQUI A LOGICA DE TRAFEGO NORMAL --------------------------
 
-            if not should_attack_be_active_now:
-                print(f"[Orchestrator] Starting/Restarting Normal Traffic. Target URLs for this call: {target_urls_for_injector}")
-                normal_traffic.start_http_traffic(
-                        target_urls_for_injector,
-                        config.HTTP_NORMAL_RPS_PER_CLIENT,
-                        config.HTTP_NORMAL_NUM_CLIENTS
-                    )
-                normal_traffic_has_started = True
+                if not should_attack_be_active_now:
+                    print(f"[Orchestrator] Starting/Restarting Normal Traffic. Target URLs for this call: {target_urls_for_injector}")
+                    normal_traffic.start_http_traffic(
+                            target_urls_for_injector,
+                            config.HTTP_NORMAL_RPS_PER_CLIENT,
+                            config.HTTP_NORMAL_NUM_CLIENTS
+                        )
+                    normal_traffic_has_started = True
 
             
-            if should_attack_be_active_now:
-                print(f"[Orchestrator] Stopping Normal traffic...")
-                normal_traffic.stop_http_traffic()
-                normal_traffic_has_started = False
-
-
-            #Se não esta em instancias maximas
-            if should_attack_be_active_now and not is_max_instance:
-                if not attack_has_started: # Se o ataque deve começar e ainda não começou
-                    needs_injector_start_or_restart = True
-                    print("[DEBUG Orchestrator] Condition: Needs to START attack (was not started and in attack window).")
-                # Se o ataque já começou E o número de instâncias mudou E temos alvos
-                elif attack_has_started and previous_num_instances_for_injector_logic != num_instances_after_scaling and target_urls_for_injector:
-                    needs_injector_start_or_restart = True
-                    print(f"[DEBUG Orchestrator] Condition: Needs to RESTART attack (num instances changed from {previous_num_instances_for_injector_logic} to {num_instances_after_scaling} AND attack was active).")
+                if should_attack_be_active_now:
+                    print(f"[Orchestrator] Stopping Normal traffic...")
+                    normal_traffic.stop_http_traffic()
+                    normal_traffic_has_started = False
+
+
+                #Se não esta em instancias maximas
+                if should_attack_be_active_now and not is_max_instance:
+                    if not attack_has_started: # Se o ataque deve começar e ainda não começou
+                        needs_injector_start_or_restart = True
+                        print("[DEBUG Orchestrator] Condition: Needs to START attack (was not started and in attack window).")
+                    # Se o ataque já começou e o número de instâncias mudou, os alvos já foram trocados a quente acima
             
-            #Se esta em instância máxima
-            if should_attack_be_active_now and is_max_instance:
-                attack_start_time = attack_start_time + config.MONITOR_INTERVAL_SECONDS
-                attack_end = attack_end + config.MONITOR_INTERVAL_SECONDS
-
-                if not attack_has_started: # Se o ataque deve começar e ainda não começou
-                    needs_injector_start_or_restart = True
-                    print("[DEBUG Orchestrator] Condition: Needs to START attack (was not started and in attack window).")
-                # Se o ataque já começou E o número de instâncias mudou E temos alvos
-                elif attack_has_started and previous_num_instances_for_injector_logic != num_instances_after_scaling and target_urls_for_injector:
-                    needs_injector_start_or_restart = True
-                    print(f"[DEBUG Orchestrator] Condition: Needs to RESTART attack (num instances changed from {previous_num_instances_for_injector_logic} to {num_instances_after_scaling} AND attack was active).")
+                #Se esta em instância máxima
+                if should_attack_be_active_now and is_max_instance:
+                    attack_start_time = attack_start_time + config.MONITOR_INTERVAL_SECONDS
+                    attack_end = attack_end + config.MONITOR_INTERVAL_SECONDS
+
+                    if not attack_has_started: # Se o ataque deve começar e ainda não começou
+                        needs_injector_start_or_restart = True
+                        print("[DEBUG Orchestrator] Condition: Needs to START attack (was not started and in attack window).")
+                    # Se o ataque já começou e o número de instâncias mudou, os alvos já foram trocados a quente acima
             
 
 
-            if needs_injector_start_or_restart:
-                if attack_has_started: # Se já estava rodando, pare primeiro
-                    print("[Orchestrator] Attack active and restart needed. Stopping current traffic injector...")
-                    traffic_injectorV0.stop_http_flood()
-                    print("[DEBUG Orchestrator] Called stop_http_flood. Sleeping for 1s...")
-                    time.sleep(1) # Pausa para as threads do injetor pararem
-                    print("[DEBUG Orchestrator] Resuming after sleep.")
-                
-                if target_urls_for_injector: # Somente inicie/reinicie se houver alvos
-                    print(f"[Orchestrator] Starting/Restarting HTTP flood. Target URLs for this call: {target_urls_for_injector}")
-                    traffic_injectorV0.start_http_flood(
-                        target_urls_for_injector,
-                        config.HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER,
-                        config.HTTP_ATTACK_NUM_ATTACKERS
-                    )
-                    label = 'attack'
-                    attack_has_started = True # Marcar que o ataque (re)começou
-                    print(f"[DEBUG Orchestrator] attack_has_started flag set to TRUE.")
-                else:
-                    print("[Orchestrator] Attack start/restart requested, but no valid target URLs. Injector not started/restarted.")
-                    if attack_has_started: # Se estava ativo mas agora não tem alvos
-                        print("[DEBUG Orchestrator] Attack was active but now no targets. Signaling stop and setting flag to False.")
-                        traffic_injectorV0.stop_http_flood() # Parar se estava ativo e agora não tem alvos
-                        attack_has_started = False
-            elif not should_attack_be_active_now and attack_has_started: # Se o período de ataque terminou
-                print("[Orchestrator] Attack duration ended or outside schedule. Stopping HTTP flood.")
-                traffic_injectorV0.stop_http_flood()
-                attack_has_started = False
-                print("[DEBUG Orchestrator] attack_has_started flag set to FALSE (attack period ended).")
-
-
-        # Atualizar o número de instâncias para a lógica do injetor na PRÓXIMA iteração
-        previous_num_instances_for_injector_logic = num_instances_after_scaling
-        print(f"[DEBUG Orchestrator] End of Iteration. previous_num_instances_for_injector_logic updated to: {previous_num_instances_for_injector_logic}")
-
-        # 5. Registrar métricas no CSV
-        log_metrics_to_csv(elapsed_time_seconds, num_instances_after_scaling, avg_cpu, avg_mem_app_mb,avg_rtt, scaling_decision, current_active_container_names,label)
+                if needs_injector_start_or_restart:
+                    if target_urls_for_injector: # Somente inicie/reinicie se houver alvos
+                        print(f"[Orchestrator] Starting/Restarting HTTP flood. Target URLs for this call: {target_urls_for_injector}")
+                        traffic_injector.start_http_flood(
+                            target_urls_for_injector,
+                            config.HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER,
+                            config.HTTP_ATTACK_NUM_ATTACKERS
+                        )
+                        label = 'attack'
+                        attack_has_started = True # Marcar que o ataque (re)começou
+                        print(f"[DEBUG Orchestrator] attack_has_started flag set to TRUE.")
+                    else:
+                        print("[Orchestrator] Attack start/restart requested, but no valid target URLs. Injector not started/restarted.")
+                        if attack_has_started: # Se estava ativo mas agora não tem alvos
+                            print("[DEBUG Orchestrator] Attack was active but now no targets. Signaling stop and setting flag to False.")
+                            traffic_injector.stop_http_flood() # Parar se estava ativo e agora não tem alvos
+                            attack_has_started = False
+                elif not should_attack_be_active_now and attack_has_started: # Se o período de ataque terminou
+                    print("[Orchestrator] Attack duration ended or outside schedule. Stopping HTTP flood.")
+                    traffic_injector.stop_http_flood()
+                    attack_has_started = False
+                    print("[DEBUG Orchestrator] attack_has_started flag set to FALSE (attack period ended).")
+
+                if attack_has_started:
+                    label = 'attack' # O ataque segue ativo (os alvos são trocados a quente, sem reinício)
+
+            # Atualizar o número de instâncias para a lógica do injetor na PRÓXIMA iteração
+            previous_num_instances_for_injector_logic = num_instances_after_scaling
+            print(f"[DEBUG Orchestrator] End of Iteration. previous_num_instances_for_injector_logic updated to: {previous_num_instances_for_injector_logic}")
+
+            # 5. Registrar métricas no CSV
+            log_metrics(elapsed_time_seconds, num_instances_after_scaling, avg_cpu, scaling_cpu, avg_mem_app_mb, normal_latency, attack_latency, normal_lag, attack_lag, normal_distribution, attack_distribution, startups, instance_states, scaling_decision, current_active_container_names,label, forecast, pulse, warming_instances)
         
-        # 6. Acumular dados para cálculo de custo
-        instance_intervals_for_cost.append((num_instances_after_scaling, config.MONITOR_INTERVAL_SECONDS))
+            # 6. Acumular dados para cálculo de custo
+            instance_intervals_for_cost.append((num_instances_after_scaling, config.MONITOR_INTERVAL_SECONDS))
         
-        # 7. Aguardar próximo ciclo
-        # Calcular tempo real da iteração e dormir apenas o necessário
-        current_loop_duration = time.time() - current_loop_start_time
-        time_to_sleep = config.MONITOR_INTERVAL_SECONDS - current_loop_duration
-        if time_to_sleep > 0:
-            # print(f"[DEBUG Orchestrator] Sleeping for {time_to_sleep:.2f}s")
-            time.sleep(time_to_sleep)
-        else:
-            print(f"[Orchestrator] Warning: Loop iteration ({current_loop_duration:.2f}s) took longer than MONITOR_INTERVAL_SECONDS ({config.MONITOR_INTERVAL_SECONDS}s). Not sleeping.")
+            # 7. Aguardar próximo ciclo
+            # Dormir até o próximo tick agendado (start/stop de contêineres não consome este tempo)
+            current_loop_duration = time.time() - current_loop_start_time
+            next_tick_time += config.MONITOR_INTERVAL_SECONDS
+            time_to_sleep = next_tick_time - time.time()
+            if time_to_sleep > 0:
+                # print(f"[DEBUG Orchestrator] Sleeping for {time_to_sleep:.2f}s")
+                time.sleep(time_to_sleep)
+            else:
+                print(f"[Orchestrator] Warning: Loop iteration ({current_loop_duration:.2f}s) took longer than MONITOR_INTERVAL_SECONDS ({config.MONITOR_INTERVAL_SECONDS}s). Not sleeping.")
+                next_tick_time = time.time() # Reancora a cadência em vez de disparar ticks atrasados em rajada
 
-    # --- Fim do loop de simulação ---
-    print("\n[Orchestrator] Simulation duration reached.")
+        # --- Fim do loop de simulação ---
+        print("\n[Orchestrator] Simulation duration reached.")
 
-    if traffic_injectorV0.attack_active: # Verifica o estado real no módulo traffic_injector
-        print("[Orchestrator] Stopping any active traffic injection at end of simulation...")
-        traffic_injectorV0.stop_http_flood()
+        if traffic_injector.attack_active: # Verifica o estado real no módulo traffic_injector
+            print("[Orchestrator] Stopping any active traffic injection at end of simulation...")
+            traffic_injector.stop_http_flood()
 
-    print("[Orchestrator] Cleaning up all simulation instances...")
-    docker_manager.cleanup_all_simulation_instances()
+        for start_path, samples in scale_up_ready_ms.items():
+            if samples:
+                print(f"[Orchestrator] Scale-up decision-to-ready ({start_path}): n={len(samples)}, "
+                      f"mean={sum(samples) / len(samples):.0f} ms, max={max(samples):.0f} ms")
 
-    try:
-        print("[Stats_Collector] Stopping stats collector thread...")
-        stats_collector.stop()
-    except Exception:
-        pass
-
-    if hasattr(cost_calculator, 'calculate_total_cost_from_intervals'):
-        total_simulation_cost = cost_calculator.calculate_total_cost_from_intervals(instance_intervals_for_cost)
-        print(f"[Orchestrator] Simulation Complete. Total Fictional Cost: ${total_simulation_cost:.4f}")
-    else:
-        print("[Orchestrator] Simulation Complete. Cost calculation module/function not found.")
-    print(f"[Orchestrator] Metrics logged in: {config.METRICS_LOG_FILE}")
-
-# --- Bloco de Execução Principal ---
-if __name__ == "__main__":
-    stats_collector = None
-    try:
-        main()
-    except KeyboardInterrupt:
-        print("\n[Orchestrator] Simulation interrupted by user (Ctrl+C). Attempting cleanup...")
-        if hasattr(traffic_injectorV0, 'attack_active') and traffic_injectorV0.attack_active:
-            print("[Orchestrator] Stopping traffic injector due to interruption...")
-            traffic_injectorV0.stop_http_flood()
+        if hasattr(cost_calculator, 'calculate_total_cost_from_intervals'):
+            total_simulation_cost = cost_calculator.calculate_total_cost_from_intervals(instance_intervals_for_cost)
+            print(f"[Orchestrator] Simulation Complete. Total Fictional Cost: ${total_simulation_cost:.4f}")
+        else:
+            print("[Orchestrator] Simulation Complete. Cost calculation module/function not found.")
+        close_metrics_sink()
+        print(f"[Orchestrator] Metrics logged in: {config.METRICS_LOG_FILE}")
+    finally:
+        if traffic_injector.attack_active:
+            print("[Orchestrator] Stopping traffic injection...")
+            traffic_injector.stop_http_flood()
+        if normal_traffic.traffic_active or normal_traffic.shard_pool is not None:
             normal_traffic.stop_http_traffic()
 
-        # pare a thread de stats se existir
-        try:
-            if stats_collector is not None:
+        # O executor termina antes da limpeza: um start em andamento não pode criar contêiner depois dela
+        if scaling_executor is not None:
+            print("[Orchestrator] Waiting for in-progress scaling actions...")
+            scaling_executor.shutdown(wait=True)
+        docker_manager.stop_warm_pool()
+        if container_registry is not None:
+            container_registry.stop()
+        if stats_collector is not None:
+            try:
                 print("[Stats_Collector] Stopping stats collector thread...")
                 stats_collector.stop()
-        except Exception:
-            pass
+            except Exception:
+                pass
+
+        close_metrics_sink() # no-op no fim normal; em erro/Ctrl+C as linhas já coletadas não se perdem
+        print("[Orchestrator] Cleaning up all simulation instances...")
+        docker_manager.cleanup_all_simulation_instances()
 
-        if hasattr(docker_manager, 'cleanup_all_simulation_instances'):
-            print("[Orchestrator] Cleaning up Docker instances due to interruption...")
-            docker_manager.cleanup_all_simulation_instances()
 
-        print("[Orchestrator] Cleanup attempt complete due to interruption.")
+# --- Bloco de Execução Principal ---
+if __name__ == "__main__":
+    stats_collector = None
+    try:
+        main() # a limpeza (executor, registry, coleta, warm pool, contêineres) fica no finally de main()
+    except KeyboardInterrupt:
+        print("\n[Orchestrator] Simulation interrupted by user (Ctrl+C). Cleanup done.")
     except Exception as e_global:
         print(f"[Orchestrator] An UNEXPECTED GLOBAL ERROR occurred: {e_global}")
         import traceback
         traceback.print_exc()
-        print("[Orchestrator] Attempting cleanup after unexpected global error...")
-        if hasattr(traffic_injectorV0, 'attack_active') and traffic_injectorV0.attack_active:
-            print("[Orchestrator] Stopping traffic injector due to error...")
-            traffic_injectorV0.stop_http_flood()
-            normal_traffic.stop_http_traffic()
-        
-        # pare a thread de stats se existir
-        try:
-            if stats_collector is not None:
-                print("[Stats_Collector] Stopping stats collector thread...")
-                stats_collector.stop()
-        except Exception:
-            pass
-
-        if hasattr(docker_manager, 'cleanup_all_simulation_instances'):
-            print("[Orchestrator] Cleaning up Docker instances due to error...")
-            docker_manager.cleanup_all_simulation_instances()
-        print("[Orchestrator] Cleanup attempt complete after error.")
+        print("[Orchestrator] Cleanup done after unexpected global error.")
@@ -0,0 +1,95 @@
+# edos_docker_simulation/metrics_schema.py
+"""
+Esquema das métricas por tick (colunas do CSV / arquivo de run), compartilhado pelo
+orquestrador (Docker) e pelo simulador de eventos discretos (des_simulator.py).
+"""
+from load_balancer import imbalance
+
+# Percentis de latência por intervalo, para o tráfego legítimo (normal_) e para o ataque (attack_)
+LATENCY_FIELDS = ['rtt_count', 'rtt_p50_ms', 'rtt_p95_ms', 'rtt_p99_ms', 'rtt_max_ms']
+# Previsão de um passo (forecasting.LoadForecaster.report) e erro absoluto contra o valor observado
+FORECAST_FIELDS = ['cpu_forecast', 'cpu_forecast_abs_error', 'cpu_forecast_mae', 'rps_forecast', 'rps_forecast_abs_error']
+# Veredito do detector de pulsos (pulse_detector.PulseDetector.report)
+PULSE_FIELDS = ['pulse_verdict', 'pulse_confidence', 'pulse_period_s', 'pulse_duty_cycle']
+METRICS_CSV_FIELDNAMES = (['elapsed_time_s', 'num_instances', 'average_cpu_percent', 'scaling_cpu_percent', 'mem_usage']
+                          + ['normal_' + f for f in LATENCY_FIELDS]
+                          + ['attack_' + f for f in LATENCY_FIELDS]
+                          + ['normal_schedule_lag_p99_ms', 'normal_schedule_lag_max_ms',
+                             'attack_schedule_lag_p99_ms', 'attack_schedule_lag_max_ms']
+                          + ['normal_lb_imbalance', 'attack_lb_imbalance']
+                          + ['instance_startup_ms', 'instances_ready', 'instance_startups',
+                             'instances_pending', 'instances_starting', 'instances_draining']
+                          + ['instances_excluded', 'excluded_instance_names']
+                          + FORECAST_FIELDS
+                          + PULSE_FIELDS
+                          + ['decision', 'active_containers_names', 'label'])
+# Tipo de cada coluna no arquivo de run binário ("d" float64, "q" int64, "s" texto)
+_INT_FIELDS = {'num_instances', 'normal_rtt_count', 'attack_rtt_count', 'instances_ready',
+               'instances_pending', 'instances_starting', 'instances_draining', 'instances_excluded'}
+_TEXT_FIELDS = {'decision', 'active_containers_names', 'label', 'pulse_verdict', 'excluded_instance_names',
+                'instance_startups'}
+METRICS_COLUMNS = [(name, 'q' if name in _INT_FIELDS else 's' if name in _TEXT_FIELDS else 'd')
+                   for name in METRICS_CSV_FIELDNAMES]
+
+
+def _latency_columns(prefix, latency):
+    return {
+        f'{prefix}rtt_count': latency['count'],
+        f'{prefix}rtt_p50_ms': round(latency['p50_ms'], 2),
+        f'{prefix}rtt_p95_ms': round(latency['p95_ms'], 2),
+        f'{prefix}rtt_p99_ms': round(latency['p99_ms'], 2),
+        f'{prefix}rtt_max_ms': round(latency['max_ms'], 2),
+    }
+
+def _schedule_lag_columns(prefix, lag):
+    return {
+        f'{prefix}schedule_lag_p99_ms': round(lag['p99_ms'], 2),
+        f'{prefix}schedule_lag_max_ms': round(lag['max_ms'], 2),
+    }
+
+
+def build_metrics_row(elapsed_time, num_instances, avg_cpu, scaling_cpu, mem_usage, normal_latency, attack_latency,
+                      normal_lag, attack_lag, normal_distribution, attack_distribution, startups, instance_states,
+                      decision, active_names, label, forecast=None, pulse=None, excluded=None):
+    """
+    Monta a linha de um tick com as colunas de METRICS_CSV_FIELDNAMES.
+    """
+    row = {
+        'elapsed_time_s': round(elapsed_time, 2),
+        'num_instances': num_instances,
+        'average_cpu_percent': round(avg_cpu, 2),
+        'scaling_cpu_percent': round(scaling_cpu, 2),
+        'mem_usage': round(mem_usage,2),
+        'decision': decision,
+        'active_containers_names': ','.join(active_names) if active_names else '',
+        'label': label,
+    }
+    row.update(_latency_columns('normal_', normal_latency))
+    row.update(_latency_columns('attack_', attack_latency))
+    row.update(_schedule_lag_columns('normal_', normal_lag))
+    row.update(_schedule_lag_columns('attack_', attack_lag))
+    row['normal_lb_imbalance'] = round(imbalance(normal_distribution), 3)
+    row['attack_lb_imbalance'] = round(imbalance(attack_distribution), 3)
+    # Tempo até o primeiro HTTP 200 de cada instância que ficou pronta neste tick (startups:
+    # nome -> ms); com scale-up paralelo várias ficam prontas juntas. instance_startup_ms é a
+    # mais lenta (vazio se nenhuma) e instance_startups lista todas como "nome=ms"
+    startups = startups or {}
+    row['instance_startup_ms'] = round(max(startups.values()), 1) if startups else ''
+    row['instances_ready'] = len(startups)
+    row['instance_startups'] = ','.join(f'{name}={ms:.1f}' for name, ms in startups.items())
+    for state in ('pending', 'starting', 'draining'):
+        row[f'instances_{state}'] = instance_states.get(state, 0)
+    # Instâncias fora (ou com peso reduzido) da métrica do autoscaler neste tick: warm-up / sem amostras
+    row['instances_excluded'] = len(excluded or ())
+    row['excluded_instance_names'] = ','.join(excluded) if excluded else ''
+    # Gravada com as duas políticas: com "threshold" a previsão roda em paralelo, só para comparação
+    forecast = forecast or {}
+    for field in FORECAST_FIELDS:
+        value = forecast.get(field)
+        row[field] = round(value, 3) if value is not None else ''
+    pulse = pulse or {}
+    row['pulse_verdict'] = pulse.get('pulse_verdict', '')
+    for field in PULSE_FIELDS[1:]:
+        value = pulse.get(field)
+        row[field] = round(value, 3) if value is not None else ''
+    return row
@@ -0,0 +1,310 @@
+# edos_docker_simulation/metrics_sink.py
+"""
+Gravação das métricas da simulação em background, num arquivo binário colunar.
+
+`log_metrics_to_csv` reabria o CSV e criava um DictWriter a cada linha; com métricas por
+segundo, por contêiner e por percentil isso vira gargalo. O `MetricsSink` recebe as
+linhas (dicts) sem bloquear, acumula em memória e uma thread grava em lotes.
+
+Formato do arquivo (little-endian):
+
+    "EDOSRUN1" | uint32 tamanho do header | header JSON (colunas, snapshot do config, início)
+    bloco*:   "BLK1" | uint32 nº de linhas | uint32 tamanho do dicionário | dicionário JSON
+              | coluna 1 (nº de linhas * tamanho do item) | coluna 2 | ...
+
+Tipos de coluna: "d" float64, "q" int64, "s" texto (códigos uint32 num dicionário por
+coluna; cada bloco traz apenas as strings novas). Valores ausentes viram NaN ("d") ou
+INT_MISSING ("q"). O carregamento é um `array.frombytes` por coluna por bloco, então
+uma hora de amostras por segundo com 50 contêineres (180 mil linhas) carrega em milissegundos.
+
+Uso:
+    python metrics_sink.py <arquivo_run> [saida.csv]   -> exporta para CSV
+    python metrics_sink.py                             -> self-test
+"""
+import csv
+import json
+import math
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"EDOSRUN1"
+BLOCK_MAGIC = b"BLK1"
+FORMAT_VERSION = 1
+INT_MISSING = -(2 ** 63)
+
+_TYPECODES = {"d": "d", "q": "q", "s": "I"}  # tipo da coluna -> typecode do array
+_U32 = struct.Struct("<I")
+_BLOCK_HEADER = struct.Struct("<4sII")
+
+
+def config_snapshot(module) -> dict:
+    """
+    Constantes (nomes em maiúsculas) de um módulo de configuração, serializáveis em JSON.
+    """
+    snapshot = {}
+    for key in dir(module):
+        if not key.isupper():
+            continue
+        value = getattr(module, key)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            value = repr(value)
+        snapshot[key] = value
+    return snapshot
+
+
+def _float(value) -> float:
+    if value is None or value == "":
+        return math.nan
+    return float(value)
+
+
+def _int(value) -> int:
+    if value is None or value == "":
+        return INT_MISSING
+    return int(value)
+
+
+class MetricsSink:
+    """
+    Escritor em lote do arquivo de run. `write(row)` só enfileira (thread-safe); a thread
+    de gravação descarrega quando junta `flush_rows` linhas ou a cada `flush_interval` s.
+
+    `columns`: sequência de (nome, tipo) com tipo em "d", "q", "s".
+    """
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]], config: Optional[dict] = None,
+                 flush_rows: int = 512, flush_interval: float = 1.0):
+        for name, kind in columns:
+            if kind not in _TYPECODES:
+                raise ValueError(f"Unknown column type '{kind}' for '{name}'. Options: d, q, s")
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()        # protege _pending (write() não espera o disco)
+        self._write_lock = threading.Lock()  # um bloco por vez, na ordem das linhas: códigos e arquivo
+        self._wake = threading.Event()
+        self._stop_evt = threading.Event()
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name, kind in self.columns if kind == "s"}
+
+        header = json.dumps({
+            "version": FORMAT_VERSION,
+            "columns": [[name, kind] for name, kind in self.columns],
+            "config": config or {},
+            "created": time.time(),
+        }).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + _U32.pack(len(header)) + header)
+        self._file.flush()
+        self._t = threading.Thread(target=self._run, name="MetricsSink", daemon=True)
+        self._t.start()
+
+    def write(self, row: dict):
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows:
+                self._wake.set()
+
+    def flush(self):
+        """
+        Grava imediatamente as linhas pendentes (na thread de quem chamou).
+        """
+        # Pega as linhas e grava sob o mesmo lock: um bloco não pode usar códigos de texto
+        # que só um bloco gravado depois dele define
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if rows and not self._file.closed:
+                self._write_block(rows)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        self._stop_evt.set()
+        self._wake.set()
+        self._t.join(timeout=timeout)
+        # Se a thread ainda estiver gravando (timeout), espera o bloco dela terminar
+        self.flush()
+        with self._write_lock:
+            self._file.close()
+
+    def _run(self):
+        while not self._stop_evt.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[MetricsSink] Error writing metrics block: {e}")
+
+    def _write_block(self, rows: List[dict]):
+        # Chamado só por flush(), com _write_lock
+        new_strings: Dict[str, List[str]] = {}
+        payload = []
+        for name, kind in self.columns:
+            if kind == "d":
+                data = array("d", [_float(row.get(name)) for row in rows])
+            elif kind == "q":
+                data = array("q", [_int(row.get(name)) for row in rows])
+            else:
+                codes = self._codes[name]
+                data = array("I")
+                for row in rows:
+                    value = row.get(name)
+                    value = "" if value is None else str(value)
+                    code = codes.get(value)
+                    if code is None:
+                        code = codes[value] = len(codes)
+                        new_strings.setdefault(name, []).append(value)
+                    data.append(code)
+            if sys.byteorder != "little":
+                data.byteswap()
+            payload.append(data.tobytes())
+        dictionary = json.dumps(new_strings).encode("utf-8") if new_strings else b""
+        self._file.write(_BLOCK_HEADER.pack(BLOCK_MAGIC, len(rows), len(dictionary)))
+        self._file.write(dictionary)
+        for chunk in payload:
+            self._file.write(chunk)
+        self._file.flush()
+        self.rows_written += len(rows)
+
+
+class RunData:
+    """
+    Conteúdo de um arquivo de run: `columns[nome]` é um array (float64/int64, ou os
+    códigos uint32 das colunas de texto, decodificados por `column(nome)`).
+    """
+    def __init__(self, header: dict, columns: Dict[str, array], strings: Dict[str, List[str]]):
+        self.header = header
+        self.config = header.get("config", {})
+        self.kinds = dict((name, kind) for name, kind in header["columns"])
+        self.names = [name for name, _ in header["columns"]]
+        self.columns = columns
+        self.strings = strings
+
+    def __len__(self) -> int:
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def column(self, name: str):
+        """
+        Valores da coluna; colunas de texto são decodificadas para uma lista de str.
+        """
+        if self.kinds[name] == "s":
+            table = self.strings[name]
+            return [table[code] for code in self.columns[name]]
+        return self.columns[name]
+
+    def rows(self) -> Iterable[dict]:
+        decoded = [(name, self.kinds[name], self.column(name)) for name in self.names]
+        for i in range(len(self)):
+            row = {}
+            for name, kind, values in decoded:
+                value = values[i]
+                if kind == "d" and math.isnan(value):
+                    value = ""
+                elif kind == "q" and value == INT_MISSING:
+                    value = ""
+                row[name] = value
+            yield row
+
+
+def load_run(path: str) -> RunData:
+    with open(path, "rb") as f:
+        raw = f.read()
+    view = memoryview(raw)
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a metrics run file")
+    offset = len(MAGIC)
+    (header_len,) = _U32.unpack_from(raw, offset)
+    offset += _U32.size
+    header = json.loads(bytes(view[offset:offset + header_len]))
+    offset += header_len
+
+    specs = [(name, _TYPECODES[kind]) for name, kind in header["columns"]]
+    columns = {name: array(typecode) for name, typecode in specs}
+    strings = {name: [] for name, kind in header["columns"] if kind == "s"}
+    while offset + _BLOCK_HEADER.size <= len(raw):
+        magic, nrows, dict_len = _BLOCK_HEADER.unpack_from(raw, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Corrupted block at byte {offset} in {path}")
+        block_start = offset
+        offset += _BLOCK_HEADER.size
+        if dict_len:
+            for name, values in json.loads(bytes(view[offset:offset + dict_len])).items():
+                strings[name].extend(values)
+            offset += dict_len
+        block_size = sum(nrows * array(typecode).itemsize for _, typecode in specs)
+        if offset + block_size > len(raw):
+            offset = block_start
+            break # bloco truncado (run interrompido durante a gravação): descarta
+        for name, typecode in specs:
+            size = nrows * columns[name].itemsize
+            columns[name].frombytes(view[offset:offset + size])
+            offset += size
+    if sys.byteorder != "little":
+        for data in columns.values():
+            data.byteswap()
+    return RunData(header, columns, strings)
+
+
+def export_csv(run_path: str, csv_path: str) -> int:
+    """
+    Converte um arquivo de run para CSV (mesmas colunas, mesma ordem). Retorna o nº de linhas.
+    """
+    run = load_run(run_path)
+    with open(csv_path, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=run.names)
+        writer.writeheader()
+        for row in run.rows():
+            for name, kind in run.kinds.items():
+                if kind == "d" and row[name] != "":
+                    row[name] = round(row[name], 6)
+            writer.writerow(row)
+    return len(run)
+
+
+# --- Self-test / exportação ---
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_path = sys.argv[1]
+        csv_path = sys.argv[2] if len(sys.argv) > 2 else run_path.rsplit(".", 1)[0] + ".csv"
+        n = export_csv(run_path, csv_path)
+        print(f"[MetricsSink] Exported {n} rows from {run_path} to {csv_path}")
+        sys.exit(0)
+
+    import os
+    import tempfile
+
+    print("--- Running metrics_sink.py self-test ---")
+    columns = [("t", "d"), ("container", "s"), ("cpu", "d"), ("requests", "q"), ("label", "s")]
+    path = os.path.join(tempfile.mkdtemp(), "selftest.edosrun")
+    sink = MetricsSink(path, columns, config={"MONITOR_INTERVAL_SECONDS": 1}, flush_rows=10000)
+    n_seconds, n_containers = 3600, 50
+    t0 = time.perf_counter()
+    for second in range(n_seconds):
+        for c in range(n_containers):
+            sink.write({"t": second, "container": f"sim_{c}", "cpu": (second * c) % 100 / 1.0,
+                        "requests": second + c if c else "", "label": "attack" if second % 60 < 10 else "normal"})
+    sink.close()
+    print(f"Wrote {sink.rows_written} rows in {time.perf_counter() - t0:.2f}s ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    t0 = time.perf_counter()
+    run = load_run(path)
+    print(f"Loaded {len(run)} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    assert len(run) == n_seconds * n_containers
+    assert run.config["MONITOR_INTERVAL_SECONDS"] == 1
+    assert run.column("container")[51] == "sim_1"
+    assert run.columns["requests"][0] == INT_MISSING and run.columns["requests"][51] == 2
+    assert run.column("label")[0] == "attack" and run.column("label")[50 * 30] == "normal"
+
+    csv_path = path.replace(".edosrun", ".csv")
+    assert export_csv(path, csv_path) == len(run)
+    with open(csv_path) as f:
+        first = next(csv.DictReader(f))
+    assert first["container"] == "sim_0" and first["requests"] == ""
+    print("--- metrics_sink.py self-test complete ---")
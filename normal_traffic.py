@@ -3,54 +3,105 @@ import requests
 import time
 import threading
 import config # Para obter HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER, HTTP_ATTACK_NUM_ATTACKERS
-import statistics
+from latency_histogram import HistogramRecorder
+from load_balancer import DistributionTracker, LoadBalancer
+from target_set import TargetSet, close_session_pools
+from traffic_shards import ShardedTraffic
 
 # Variável global para controlar a execução dos threads de ataque
 traffic_active = False
 threads = []
-rtt_measurements = []
-rtt_lock = threading.Lock()
+# Latências (ms) em histogramas de memória constante: um writer por cliente/shard
+rtt_recorder = HistogramRecorder()
+# Atraso de cada envio em relação ao cronograma de RPS (ms) e o atraso mais recente por cliente
+lag_recorder = HistogramRecorder()
+worker_schedule_lag_ms = {}
+# Alvos atuais do tráfego normal; trocados a quente pelo orquestrador (update_traffic_targets)
+normal_targets = TargetSet()
 
 
-def normal_http_request_worker(target_url, rps_per_worker):
+def normal_http_request_worker(worker_index, query, rps_per_worker, balancer):
     """
-    Worker thread function. Sends requests to target_url at a specified RPS.
+    Worker thread function. Sends requests to the current normal-traffic targets at a specified RPS.
+    O alvo de cada envio é escolhido por 'balancer' entre os alvos atuais (trocados a quente pelo orquestrador).
     """
     global traffic_active
     session = requests.Session() # Use session for potential connection pooling
+    rtt_histogram = rtt_recorder.writer() # Histograma exclusivo deste worker (gravação sem lock)
+    lag_histogram = lag_recorder.writer()
+    worker_name = threading.current_thread().name
+    # No modo "intended" a latência é medida a partir do instante previsto pelo cronograma
+    # de RPS (não do envio real), para não esconder o tempo de fila quando o cliente atrasa.
+    intended_mode = getattr(config, "LATENCY_MEASUREMENT_MODE", "service") == "intended"
     sleep_interval = 1.0 / rps_per_worker if rps_per_worker > 0 else 1.0
 
-    print(f"  [Normal_Injector Worker {threading.get_ident()}] Started. Target: {target_url}, RPS: {rps_per_worker:.2f}, Interval: {sleep_interval:.4f}s")
+    print(f"  [Normal_Injector Worker {threading.get_ident()}] Started. Worker index: {worker_index}, RPS: {rps_per_worker:.2f}, Interval: {sleep_interval:.4f}s")
     
     request_count = 0
     error_count = 0
 
+    next_intended_send = time.monotonic() # Cronograma fixo: t0, t0 + intervalo, t0 + 2*intervalo...
+    seen_version, seen_urls = normal_targets.snapshot()
+
     while traffic_active:
-        start_time = time.monotonic()
+        # Alvos trocados pelo orquestrador: fecha as conexões com as instâncias removidas
+        version, urls = normal_targets.snapshot()
+        if version != seen_version:
+            close_session_pools(session, set(seen_urls) - set(urls))
+            seen_version, seen_urls = version, urls
+        if not urls:
+            time.sleep(0.1) # Sem alvos no momento: espera o orquestrador publicar novos
+            next_intended_send = time.monotonic()
+            continue
+
+        if intended_mode:
+            # Segue o cronograma: se estiver atrasado, envia imediatamente para recuperar
+            wait_time = next_intended_send - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+        send_time = time.monotonic()
+        start_time = next_intended_send if intended_mode else send_time
+        schedule_lag_ms = max(0.0, (send_time - next_intended_send) * 1000)
+        lag_histogram.record(schedule_lag_ms)
+        worker_schedule_lag_ms[worker_name] = schedule_lag_ms
+        next_intended_send += sleep_interval
+
+        # Escolhe o alvo no momento do envio (round-robin, menos requisições em voo, p2c...)
+        target = balancer.pick(worker_index)
+        if target is None:
+            continue
+        target_url = target.url + "?" + query
         try:
-            response = session.get(target_url, timeout=2) # Timeout de 2 segundos
+            response = session.get(target_url, timeout=NORMAL_REQUEST_TIMEOUT_SECONDS) # Timeout de 2 segundos
             # Você pode verificar response.status_code se precisar
             # if response.status_code == 200:
             #     pass
 
             end_time = time.monotonic()
             rtt = (end_time - start_time) * 1000  # em milissegundos
-            with rtt_lock:
-                rtt_measurements.append(rtt)
+            rtt_histogram.record(rtt)
 
             request_count +=1
         except requests.exceptions.RequestException as e:
             # print(f"  [Injector Worker {threading.get_ident()}] Request error: {e}")
             error_count += 1
+        balancer.release(target, (time.monotonic() - send_time) * 1000)
         
+        if intended_mode:
+            continue # O sono até o próximo envio previsto acontece no início do loop
+
         # Calcular o tempo gasto e ajustar o sono para manter o RPS
-        time_taken = time.monotonic() - start_time
+        time_taken = time.monotonic() - send_time
         sleep_duration = sleep_interval - time_taken
         if sleep_duration > 0:
             time.sleep(sleep_duration)
         # Se time_taken > sleep_interval, o worker está atrasado (não consegue manter o RPS)
         # Não há muito o que fazer aqui além de registrar ou ajustar o RPS se for um problema.
 
+    rtt_recorder.retire(rtt_histogram)
+    lag_recorder.retire(lag_histogram)
+    worker_schedule_lag_ms.pop(worker_name, None)
     print(f"  [Normal_Injector Worker {threading.get_ident()}] Stopped. Total requests: {request_count}, Errors: {error_count}")
 
 
@@ -63,13 +114,122 @@ traffic_active = False
 # renomeando para 'attacker_threads' para clareza e consistência
 # Comente ou remova a linha 'threads = []' se ela existir e você não a estiver usando
 client_threads = [] 
+shard_pool = None # ShardedTraffic ativo quando config.HTTP_NORMAL_PROCESS_SHARDS > 0
+thread_balancer = None # LoadBalancer compartilhado pelos clientes em thread
+distribution_tracker = DistributionTracker() # Requisições por alvo no intervalo
+
+# Timeout das requisições de tráfego legítimo (o mesmo usado pelos workers em thread)
+NORMAL_REQUEST_TIMEOUT_SECONDS = 2
 
 
 def get_average_rtt_ms():
-    with rtt_lock:
-        if not rtt_measurements:
-            return 0.0
-        return statistics.mean(rtt_measurements)
+    """
+    Cumulative mean RTT of the running clients (kept for compatibility; prefer get_interval_latency()).
+    """
+    return rtt_recorder.cumulative_mean_ms()
+
+
+def get_interval_latency():
+    """
+    Legitimate-traffic RTT distribution since the previous call: {count, p50_ms, p95_ms, p99_ms, max_ms}.
+    """
+    return rtt_recorder.interval_summary()
+
+
+def get_interval_schedule_lag():
+    """
+    Distribution of how late sends were vs. the RPS schedule since the previous call.
+    """
+    return lag_recorder.interval_summary()
+
+
+def get_worker_schedule_lag_ms():
+    """
+    Most recent schedule lag (ms) per client (per shard in multi-process mode).
+    """
+    if shard_pool is not None:
+        return shard_pool.worker_schedule_lag_ms()
+    return dict(worker_schedule_lag_ms)
+
+
+def get_rate_report():
+    """
+    Achieved vs. intended RPS since the previous call, or None when the
+    threaded clients are in use (they do not track it).
+    """
+    if shard_pool is None:
+        return None
+    return shard_pool.get_rate_report()
+
+
+def _forward_targets(added, removed, urls):
+    """
+    Repasse das trocas de alvos para os shards em execução
+    (os workers em thread leem 'normal_targets' diretamente).
+    """
+    if shard_pool is not None:
+        shard_pool.update_targets(list(urls))
+    if thread_balancer is not None:
+        thread_balancer.set_targets(urls)
+
+
+normal_targets.subscribe(_forward_targets)
+
+
+def update_traffic_targets(target_urls):
+    """
+    Hot-swaps the normal-traffic targets without stopping the clients. Cheap no-op if nothing changed.
+    """
+    added, removed = normal_targets.update(target_urls)
+    if added or removed:
+        print(f"[Normal_Injector] Targets updated (+{len(added)} / -{len(removed)}): {', '.join(target_urls)}")
+
+
+def get_target_distribution():
+    """
+    Requests routed to each target since the previous call ({url: count}).
+    """
+    if shard_pool is not None:
+        cumulative = shard_pool.target_distribution()
+    elif thread_balancer is not None:
+        cumulative = thread_balancer.distribution()
+    else:
+        return {}
+    return distribution_tracker.interval(cumulative)
+
+
+def _normal_query():
+    # work = ms de CPU calibrados no servidor; kernel escolhe o tipo de carga (cpu/memory/alloc/io)
+    query = (f"work={config.NORMAL_WORK_UNITS}&sleep={config.NORMAL_SLEEP}"
+             f"&kernel={getattr(config, 'NORMAL_KERNEL', 'cpu')}")
+    size_kb = getattr(config, "NORMAL_SIZE_KB", 0)
+    return query + f"&size_kb={size_kb}" if size_kb else query
+
+
+def _start_sharded_traffic(target_urls, rps_per_worker, num_clients):
+    """
+    Multi-process variant of start_http_traffic: clients are split across
+    HTTP_NORMAL_PROCESS_SHARDS processes so they do not share the orchestrator's GIL.
+    """
+    global traffic_active, shard_pool
+    traffic_active = True
+    shard_pool = ShardedTraffic(
+        name="Normal_Injector",
+        target_urls=target_urls,
+        rps_per_worker=rps_per_worker,
+        num_workers=num_clients,
+        num_shards=config.HTTP_NORMAL_PROCESS_SHARDS,
+        query=_normal_query(),
+        timeout=NORMAL_REQUEST_TIMEOUT_SECONDS,
+        max_in_flight=getattr(config, "HTTP_ASYNC_MAX_IN_FLIGHT", 10000),
+        cpu_cores=getattr(config, "HTTP_NORMAL_SHARD_CPU_CORES", []),
+        recorder=rtt_recorder,
+        lag_recorder=lag_recorder,
+        latency_mode=getattr(config, "LATENCY_MEASUREMENT_MODE", "service"),
+        lb_strategy=getattr(config, "HTTP_LB_STRATEGY", "static"),
+        lb_weights=getattr(config, "HTTP_LB_WEIGHTS", {}),
+    )
+    shard_pool.start()
 
 
 
@@ -84,13 +244,19 @@ def start_http_traffic(target_urls, rps_per_worker_override, num_clients_overrid
         rps_per_worker_override (float): The Requests Per Second (RPS) each worker thread should aim for.
         num_attackers_override (int): The total number of attacker threads to launch.
     """
-    global traffic_active, client_threads
+    global traffic_active, client_threads, thread_balancer
     
     if not target_urls:
         print("[Normal_Injector] No target URLs provided. Attack not started.")
         return
     if traffic_active:
-        print("[Normal_Injector] Normal traffic already in progress. Call stop_http_traffic() first.")
+        # Já rodando: apenas acompanha o conjunto de instâncias atual
+        update_traffic_targets(target_urls)
+        return
+
+    normal_targets.update(target_urls)
+    if getattr(config, "HTTP_NORMAL_PROCESS_SHARDS", 0) > 0:
+        _start_sharded_traffic(target_urls, rps_per_worker_override, num_clients_override)
         return
 
     traffic_active = True
@@ -99,20 +265,18 @@ def start_http_traffic(target_urls, rps_per_worker_override, num_clients_overrid
         print(f"[Normal_Injector] Clearing {len(client_threads)} existing attacker threads before starting new ones.")
     client_threads.clear()
 
+    thread_balancer = LoadBalancer(getattr(config, "HTTP_LB_STRATEGY", "static"), target_urls,
+                                   weights=getattr(config, "HTTP_LB_WEIGHTS", {}))
+
     num_targets = len(target_urls)
     
     print(f"[Normal_Injector] Starting HTTP flood with {num_clients_override} attackers, ~{rps_per_worker_override * num_clients_override} RPS total, across {num_targets} targets: {', '.join(target_urls)}")
 
     for i in range(num_clients_override):
-        # Distribuição Round Robin dos workers pelas URLs de destino
-        if num_targets == 0:
-            print("[Normal_Injector] No targets available for worker assignment. Breaking loop.")
-            break
-        target_url_for_this_worker = target_urls[i % num_targets] + f"?work={config.NORMAL_WORK_UNITS}&sleep={config.NORMAL_SLEEP}"
-        
+        # O alvo de cada requisição é escolhido pelo balanceador compartilhado (config.HTTP_LB_STRATEGY)
         thread = threading.Thread(
             target=normal_http_request_worker,
-            args=(target_url_for_this_worker, rps_per_worker_override), # Cada thread pode ter uma URL diferente
+            args=(i, _normal_query(), rps_per_worker_override, thread_balancer),
             daemon=True,
             name=f"InjectorWorker-{i+1}"
         )
@@ -127,7 +291,14 @@ def stop_http_traffic():
     Stops all active HTTP flood worker threads.
     Signals workers to stop and waits for them to terminate.
     """
-    global traffic_active, client_threads 
+    global traffic_active, client_threads, shard_pool
+
+    if shard_pool is not None:
+        print("[Normal_Injector] Stopping sharded normal traffic processes...")
+        traffic_active = False
+        pool, shard_pool = shard_pool, None
+        pool.stop()
+        return
 
     if not traffic_active and not client_threads:
         print("[Normal_Injector] HTTP normal traffic already stopped or not started.")
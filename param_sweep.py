@@ -0,0 +1,276 @@
+# edos_docker_simulation/param_sweep.py
+"""
+Varredura de parâmetros do autoscaler e do ataque.
+
+Em vez de editar o config.py e rodar um cenário por vez, a varredura gera pontos
+(grade completa, amostras aleatórias ou hipercubo latino) e roda cada um com seu
+próprio config:
+
+    backend "sim"    -> des_simulator em um pool de processos (cada processo aplica os
+                        overrides no seu próprio módulo config)
+    backend "docker" -> main_orchestrator.main() em sequência, um processo filho por ponto
+                        (o Docker é um recurso único: não dá para paralelizar)
+
+Os resultados (custo total, p99 de latência, nº de eventos de escala, ...) vão para uma
+tabela sqlite3 indexada, de onde `pareto_front` tira a fronteira custo x latência.
+
+Uso:
+    python param_sweep.py --mode grid --space '{"CPU_THRESHOLD_SCALE_UP": [50, 60, 70]}'
+    python param_sweep.py --mode lhs --samples 2000 --space '{"SCALE_COOLDOWN_SECONDS": [5, 60]}'
+    python param_sweep.py --pareto   (fronteira da última varredura gravada)
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import config
+
+# Espaço padrão (sobrescrito por config.SWEEP_SPACE ou --space). Em "grid" cada valor é uma
+# lista de opções; em "random"/"lhs" listas de 2 números são intervalos [mín, máx]
+# (inteiros se os dois limites forem inteiros) e listas maiores são escolhas discretas.
+DEFAULT_SPACE = {
+    "CPU_THRESHOLD_SCALE_UP": [50.0, 60.0, 70.0, 80.0],
+    "CPU_THRESHOLD_SCALE_DOWN": [15.0, 25.0, 35.0],
+    "SCALE_COOLDOWN_SECONDS": [10, 20, 40],
+    "PULSE_DURATION": [5, 10],
+    "HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER": [2, 4, 8],
+}
+
+METRIC_COLUMNS = ("total_cost", "normal_p99_ms", "attack_p99_ms", "scale_events", "scale_ups",
+                  "scale_downs", "timeouts", "max_instances_reached")
+
+
+# --------- Geração de pontos ---------
+def grid(space: Dict[str, Sequence]) -> List[dict]:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def _is_range(values: Sequence) -> bool:
+    return len(values) == 2 and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+
+def _from_unit(values: Sequence, u: float):
+    """
+    Mapeia u em [0, 1) para o domínio do parâmetro (intervalo contínuo/inteiro ou escolhas).
+    """
+    if _is_range(values):
+        lo, hi = values
+        if isinstance(lo, int) and isinstance(hi, int):
+            return lo + min(int(u * (hi - lo + 1)), hi - lo)
+        return lo + u * (hi - lo)
+    return values[min(int(u * len(values)), len(values) - 1)]
+
+
+def random_samples(space: Dict[str, Sequence], n: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    return [{name: _from_unit(values, rng.random()) for name, values in space.items()} for _ in range(n)]
+
+
+def latin_hypercube(space: Dict[str, Sequence], n: int, seed: int = 0) -> List[dict]:
+    """
+    n pontos com exatamente uma amostra em cada um dos n estratos de cada dimensão.
+    """
+    rng = random.Random(seed)
+    columns = {}
+    for name, values in space.items():
+        strata = [(i + rng.random()) / n for i in range(n)]
+        rng.shuffle(strata)
+        columns[name] = [_from_unit(values, u) for u in strata]
+    return [{name: columns[name][i] for name in space} for i in range(n)]
+
+
+# --------- Execução de um ponto ---------
+def _run_sim_point(task):
+    """
+    Roda um ponto no simulador (no processo do pool). Retorna (ponto, seed, resumo, ms).
+    """
+    import des_simulator
+    params, seed = task
+    t0 = time.perf_counter()
+    _, summary = des_simulator.run_simulation(params, seed=seed)
+    return params, seed, summary, (time.perf_counter() - t0) * 1000
+
+
+def summarize_metrics_csv(csv_path: str, interval: float) -> dict:
+    """
+    Resumo de um CSV do orquestrador. Sem os histogramas completos, o p99 do run é o maior
+    p99 de tick (estimativa conservadora).
+    """
+    import cost_calculator
+    intervals, summary = [], dict.fromkeys(METRIC_COLUMNS, 0)
+    summary["normal_p99_ms"] = summary["attack_p99_ms"] = 0.0
+    with open(csv_path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            n = int(float(row['num_instances']))
+            intervals.append((n, interval))
+            summary["max_instances_reached"] = max(summary["max_instances_reached"], n)
+            for prefix in ("normal", "attack"):
+                summary[f"{prefix}_p99_ms"] = max(summary[f"{prefix}_p99_ms"], float(row[f'{prefix}_rtt_p99_ms'] or 0))
+            summary["scale_ups"] += row['decision'] == "SCALE_UP"
+            summary["scale_downs"] += row['decision'] == "SCALE_DOWN"
+    summary["scale_events"] = summary["scale_ups"] + summary["scale_downs"]
+    summary["total_cost"] = cost_calculator.calculate_total_cost_from_intervals(intervals)
+    return summary
+
+
+def _docker_point_main(params: dict, csv_path: str):
+    # Processo filho: config próprio, CSV próprio
+    for key, value in params.items():
+        setattr(config, key, value)
+    config.METRICS_LOG_FILE = csv_path
+    config.METRICS_RUN_FILE = csv_path.rsplit(".", 1)[0] + ".edosrun"
+    import main_orchestrator
+    main_orchestrator.main()
+
+
+def _run_docker_point(params: dict, out_dir: str, index: int):
+    csv_path = os.path.join(out_dir, f"sweep_point_{index}.csv")
+    t0 = time.perf_counter()
+    process = multiprocessing.get_context("spawn").Process(target=_docker_point_main, args=(params, csv_path))
+    process.start()
+    process.join()
+    wall_ms = (time.perf_counter() - t0) * 1000
+    if process.exitcode != 0 or not os.path.exists(csv_path):
+        raise RuntimeError(f"docker run for point {index} failed (exit code {process.exitcode})")
+    interval = params.get("MONITOR_INTERVAL_SECONDS", config.MONITOR_INTERVAL_SECONDS)
+    return params, 0, summarize_metrics_csv(csv_path, interval), wall_ms
+
+
+# --------- Tabela de resultados ---------
+def open_results_db(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            sweep_id TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            params TEXT NOT NULL,
+            total_cost REAL, normal_p99_ms REAL, attack_p99_ms REAL,
+            scale_events INTEGER, scale_ups INTEGER, scale_downs INTEGER,
+            timeouts INTEGER, max_instances_reached INTEGER,
+            wall_ms REAL, created REAL
+        )""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_results_sweep ON results (sweep_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_results_cost_p99 ON results (sweep_id, total_cost, normal_p99_ms)")
+    return db
+
+
+def _insert(db: sqlite3.Connection, sweep_id: str, backend: str, results: Iterable):
+    now = time.time()
+    db.executemany(
+        f"INSERT INTO results (sweep_id, backend, seed, params, {', '.join(METRIC_COLUMNS)}, wall_ms, created) "
+        f"VALUES (?, ?, ?, ?, {', '.join('?' * len(METRIC_COLUMNS))}, ?, ?)",
+        [(sweep_id, backend, seed, json.dumps(params, sort_keys=True),
+          *(summary.get(c) for c in METRIC_COLUMNS), wall_ms, now)
+         for params, seed, summary, wall_ms in results])
+    db.commit()
+
+
+def run_sweep(points: List[dict], backend: str = "sim", db_path: str = "sweep_results.sqlite",
+              workers: int = 0, seeds: Sequence[int] = (0,), sweep_id: Optional[str] = None,
+              out_dir: str = ".") -> str:
+    """
+    Roda todos os pontos (x seeds) e grava os resultados. Retorna o sweep_id.
+    """
+    if backend not in ("sim", "docker"):
+        raise ValueError(f"Unknown sweep backend '{backend}'. Options: sim, docker")
+    sweep_id = sweep_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    db = open_results_db(db_path)
+    t0 = time.perf_counter()
+    done = 0
+    try:
+        if backend == "sim":
+            tasks = [(params, seed) for params in points for seed in seeds]
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(tasks) // (workers * 8))
+            batch = []
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(_run_sim_point, tasks, chunksize=chunksize):
+                    batch.append(result)
+                    if len(batch) >= 256:
+                        _insert(db, sweep_id, backend, batch)
+                        done += len(batch)
+                        batch = []
+                        print(f"[Sweep] {done}/{len(tasks)} points done ({time.perf_counter() - t0:.1f}s)")
+            _insert(db, sweep_id, backend, batch)
+            done += len(batch)
+        else:
+            for index, params in enumerate(points):
+                print(f"[Sweep] Docker point {index + 1}/{len(points)}: {params}")
+                try:
+                    _insert(db, sweep_id, backend, [_run_docker_point(params, out_dir, index)])
+                    done += 1
+                except RuntimeError as e:
+                    print(f"[Sweep] Warning: {e}. Skipping.")
+    finally:
+        db.close()
+    print(f"[Sweep] {sweep_id}: {done} result(s) in {time.perf_counter() - t0:.1f}s -> {db_path}")
+    return sweep_id
+
+
+def pareto_front(db_path: str, sweep_id: Optional[str] = None, x: str = "total_cost",
+                 y: str = "normal_p99_ms") -> List[dict]:
+    """
+    Pontos não dominados (menor x e menor y) de uma varredura, ordenados por x.
+    Uma passada sobre os resultados ordenados por (x, y): O(n log n).
+    """
+    if x not in METRIC_COLUMNS or y not in METRIC_COLUMNS:
+        raise ValueError(f"Pareto axes must be result columns: {', '.join(METRIC_COLUMNS)}")
+    db = open_results_db(db_path)
+    try:
+        if sweep_id is None:
+            row = db.execute("SELECT sweep_id FROM results ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None:
+                return []
+            sweep_id = row[0]
+        cursor = db.execute(f"SELECT id, params, {x}, {y} FROM results WHERE sweep_id = ? "
+                            f"AND {x} IS NOT NULL AND {y} IS NOT NULL ORDER BY {x}, {y}", (sweep_id,))
+        front, best_y = [], float("inf")
+        for result_id, params, x_value, y_value in cursor:
+            if y_value < best_y:
+                front.append({"id": result_id, "params": json.loads(params), x: x_value, y: y_value})
+                best_y = y_value
+        return front
+    finally:
+        db.close()
+
+
+# --- Execução direta ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweep over autoscaler and attack settings.")
+    parser.add_argument("--mode", choices=("grid", "random", "lhs"), default="grid")
+    parser.add_argument("--space", help="JSON {CONFIG_NAME: [values] or [min, max]} (default: config.SWEEP_SPACE)")
+    parser.add_argument("--samples", type=int, default=1000, help="points for random/lhs")
+    parser.add_argument("--seeds", type=int, default=1, help="simulation seeds per point")
+    parser.add_argument("--backend", choices=("sim", "docker"), default="sim")
+    parser.add_argument("--workers", type=int, default=getattr(config, "SWEEP_WORKERS", 0))
+    parser.add_argument("--db", default=getattr(config, "SWEEP_DB_FILE", "sweep_results.sqlite"))
+    parser.add_argument("--pareto", action="store_true", help="only print the Pareto front of the last sweep")
+    args = parser.parse_args()
+
+    if not args.pareto:
+        space = json.loads(args.space) if args.space else getattr(config, "SWEEP_SPACE", DEFAULT_SPACE)
+        if args.mode == "grid":
+            points = grid(space)
+        elif args.mode == "random":
+            points = random_samples(space, args.samples)
+        else:
+            points = latin_hypercube(space, args.samples)
+        print(f"[Sweep] {len(points)} point(s) x {args.seeds} seed(s), mode={args.mode}, backend={args.backend}")
+        run_sweep(points, backend=args.backend, db_path=args.db, workers=args.workers, seeds=range(args.seeds))
+
+    front = pareto_front(args.db)
+    print(f"[Sweep] Pareto front (total_cost vs normal_p99_ms): {len(front)} point(s)")
+    for point in front:
+        print(f"  cost=${point['total_cost']:.4f}  normal_p99={point['normal_p99_ms']:.1f} ms  {point['params']}")
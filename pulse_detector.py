@@ -0,0 +1,239 @@
+# edos_docker_simulation/pulse_detector.py
+"""
+Detecção de ataques EDoS pulsados por periodicidade da carga.
+
+O ataque pulsado (PULSE_DURATION a cada SCALE_COOLDOWN_SECONDS) é desenhado para
+disparar um scale-up por pulso e deixar a instância nova ociosa até o próximo. O
+`PulseDetector` recebe uma amostra por tick (carga de CPU do cluster e RPS) e mantém,
+sobre as últimas `history` amostras, a autocorrelação de todos os lags de forma
+incremental: para cada lag k, a soma de x[t] * x[t-k] ganha o produto da amostra nova e
+perde o da amostra que sai da janela (O(max_lag) por tick, sem FFT sobre a janela toda).
+
+Veredito (por tick):
+    "warming_up" -> histórico curto demais para estimar um período (menos de 3 x 2 ticks)
+    "aperiodic"  -> sem pico de autocorrelação forte, ou rajadas longas (duty cycle alto)
+    "pulsed"     -> carga periódica com rajadas curtas acima do limiar de scale-up
+
+Com "pulsed", o autoscaler só aceita um scale-up se a rajada atual já durou mais do que
+as rajadas aprendidas (`should_damp_scale_up`): um pulso não compra instância, uma
+sobrecarga que persiste ainda compra.
+"""
+from array import array
+from collections import deque
+from typing import Dict, Optional
+
+import config
+
+
+class _SlidingAutocorrelation:
+    """
+    Soma, soma dos quadrados e somas de produtos defasados de uma janela deslizante.
+    """
+    def __init__(self, capacity: int, max_lag: int):
+        self.capacity = capacity
+        self.max_lag = max_lag
+        self.values = array("d", bytes(capacity * 8))
+        self.head = 0  # nº de sequência da próxima amostra
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.lagged = array("d", bytes((max_lag + 1) * 8))  # lagged[k] = soma de x[t] * x[t-k]
+
+    def __len__(self) -> int:
+        return min(self.head, self.capacity)
+
+    def _at(self, seq: int) -> float:
+        return self.values[seq % self.capacity]
+
+    def push(self, value: float):
+        seq = self.head
+        oldest = seq - self.capacity
+        if oldest >= 0:
+            # A amostra mais antiga sai: perde seus pares com as amostras mais novas
+            old = self._at(oldest)
+            self.total -= old
+            self.total_sq -= old * old
+            for k in range(1, self.max_lag + 1):
+                if oldest + k < seq:
+                    self.lagged[k] -= old * self._at(oldest + k)
+        self.values[seq % self.capacity] = value
+        self.head = seq + 1
+        self.total += value
+        self.total_sq += value * value
+        start = max(0, seq - self.capacity + 1)
+        for k in range(1, self.max_lag + 1):
+            if seq - k >= start:
+                self.lagged[k] += value * self._at(seq - k)
+        if self.head % self.capacity == 0:
+            self._resync()
+
+    def _resync(self):
+        # Recalcula as somas do zero uma vez por volta do buffer (evita deriva de ponto flutuante)
+        n = len(self)
+        window = [self._at(self.head - n + i) for i in range(n)]
+        self.total = sum(window)
+        self.total_sq = sum(v * v for v in window)
+        for k in range(1, self.max_lag + 1):
+            self.lagged[k] = sum(window[i] * window[i - k] for i in range(k, n))
+
+    def acf(self, max_lag: int):
+        """
+        Autocorrelação (estimador enviesado, divide por n) dos lags 0..max_lag, em O(max_lag):
+        as somas das pontas da janela que ficam fora de cada par são acumuladas lag a lag.
+        """
+        n = len(self)
+        values = [1.0] + [0.0] * max_lag
+        if n < 2:
+            return values
+        mean = self.total / n
+        variance = self.total_sq / n - mean * mean
+        if variance <= 1e-9:
+            return values
+        first = self.head - n
+        head_sum = tail_sum = 0.0  # soma das k primeiras / k últimas amostras da janela
+        for k in range(1, min(max_lag, n - 1) + 1):
+            head_sum += self._at(first + k - 1)
+            tail_sum += self._at(self.head - k)
+            # soma de (x[t] - m)(x[t-k] - m) sobre os n - k pares
+            centered = self.lagged[k] - mean * ((self.total - head_sum) + (self.total - tail_sum)) + (n - k) * mean * mean
+            values[k] = centered / (n * variance)
+        return values
+
+
+class PulseDetector:
+    """
+    Veredito de periodicidade da carga e amortecimento de scale-up durante ataques pulsados.
+    """
+    def __init__(self, interval: Optional[float] = None, history: Optional[int] = None):
+        self.interval = float(interval if interval is not None else config.MONITOR_INTERVAL_SECONDS)
+        history = int(history if history is not None else getattr(config, "PULSE_DETECTOR_HISTORY_TICKS", 48))
+        self.max_lag = max(2, history // 2)
+        self.min_confidence = getattr(config, "PULSE_DETECTOR_MIN_CONFIDENCE", 0.5)
+        self.max_duty_cycle = getattr(config, "PULSE_DETECTOR_MAX_DUTY_CYCLE", 0.5)
+        self.cpu = _SlidingAutocorrelation(history, self.max_lag)
+        self.rps = _SlidingAutocorrelation(history, self.max_lag)
+        self.bursting = deque(maxlen=history)  # 1 se a CPU média do tick passou o limiar de scale-up
+        self.burst_ticks = 0                   # nº de bursting na janela (duty cycle = burst_ticks / len)
+        self.burst_lengths = deque(maxlen=8)   # duração (ticks) das últimas rajadas já encerradas
+        self.current_burst = 0                 # ticks consecutivos acima do limiar até agora
+        self.verdict = "warming_up"
+        self.confidence = 0.0
+        self.period_ticks = 0
+        self.duty_cycle = 0.0
+
+    def observe(self, average_cpu_percent: float, num_instances: int, request_rate: Optional[float] = None):
+        """
+        Registra o tick atual e recalcula o veredito.
+        """
+        # Carga do cluster (como em forecasting): não muda só porque o nº de instâncias mudou
+        self.cpu.push(average_cpu_percent * max(1, num_instances))
+        self.rps.push(request_rate or 0.0)
+
+        burst = 1 if average_cpu_percent > config.CPU_THRESHOLD_SCALE_UP else 0
+        if len(self.bursting) == self.bursting.maxlen:
+            self.burst_ticks -= self.bursting[0]
+        self.bursting.append(burst)
+        self.burst_ticks += burst
+        if burst:
+            self.current_burst += 1
+        elif self.current_burst:
+            self.burst_lengths.append(self.current_burst)
+            self.current_burst = 0
+        self._update_verdict()
+
+    def _strongest_period(self, series: _SlidingAutocorrelation):
+        """
+        (lag, autocorrelação) do período fundamental: o menor lag >= 2 cujo pico chega
+        perto do maior (múltiplos do período também correlacionam).
+        """
+        limit = min(self.max_lag, len(series) // 3)  # ao menos 3 períodos na janela
+        if limit < 2:
+            return 0, 0.0
+        values = series.acf(limit)
+        peaks = [k for k in range(2, limit + 1)
+                 if values[k] > 0 and values[k] >= values[k - 1] and (k == limit or values[k] >= values[k + 1])]
+        if not peaks:
+            return 0, 0.0
+        best = max(values[k] for k in peaks)
+        lag = next(k for k in peaks if values[k] >= 0.9 * best)
+        return lag, values[lag]
+
+    def _update_verdict(self):
+        cpu_lag, cpu_acf = self._strongest_period(self.cpu)
+        rps_lag, rps_acf = self._strongest_period(self.rps)
+        lag, acf = (cpu_lag, cpu_acf) if cpu_acf >= rps_acf else (rps_lag, rps_acf)
+        self.period_ticks = lag
+        self.confidence = max(0.0, min(1.0, acf))
+        self.duty_cycle = self.burst_ticks / len(self.bursting) if self.bursting else 0.0
+        if len(self.cpu) < 6:
+            self.verdict = "warming_up"
+        elif self.confidence >= self.min_confidence and self.burst_lengths and 0 < self.duty_cycle <= self.max_duty_cycle:
+            self.verdict = "pulsed"
+        else:
+            self.verdict = "aperiodic"
+
+    def learned_burst_ticks(self) -> float:
+        return sum(self.burst_lengths) / len(self.burst_lengths) if self.burst_lengths else 0.0
+
+    def should_damp_scale_up(self) -> bool:
+        """
+        True se a carga é pulsada e a rajada atual ainda não passou da duração aprendida.
+        """
+        return self.verdict == "pulsed" and self.current_burst <= self.learned_burst_ticks()
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "pulse_verdict": self.verdict,
+            "pulse_confidence": self.confidence,
+            "pulse_period_s": self.period_ticks * self.interval if self.period_ticks else None,
+            "pulse_duty_cycle": self.duty_cycle,
+        }
+
+
+# --- Self-test section ---
+if __name__ == "__main__":
+    import random
+
+    random.seed(7) # ruído reprodutível: os vereditos verificados abaixo não dependem da execução
+    print("--- Running pulse_detector.py self-test ---")
+    # Autocorrelação incremental == cálculo direto sobre a janela
+    sliding = _SlidingAutocorrelation(capacity=20, max_lag=10)
+    history = []
+    for i in range(137):
+        v = random.uniform(0, 100)
+        sliding.push(v)
+        history.append(v)
+        window = history[-20:]
+        n = len(window)
+        for k in range(1, 11):
+            direct = sum(window[j] * window[j - k] for j in range(k, n))
+            assert abs(sliding.lagged[k] - direct) < 1e-6 * max(1.0, abs(direct)), (i, k)
+        if n > 10:
+            m = sum(window) / n
+            var = sum((v - m) ** 2 for v in window)
+            for k, r in enumerate(sliding.acf(10)):
+                direct = sum((window[j] - m) * (window[j - k] - m) for j in range(k, n)) / var
+                assert abs(r - direct) < 1e-6, (i, k, r, direct)
+
+    config.CPU_THRESHOLD_SCALE_UP = 60.0
+    # Pulso de 1 tick a cada 4 (ataque de 5s a cada 20s com ticks de 5s)
+    detector = PulseDetector(interval=5.0, history=48)
+    damped = allowed = 0
+    for t in range(60):
+        cpu = 90.0 if t % 4 == 0 else 15.0
+        detector.observe(cpu + random.uniform(-3, 3), 1, 100.0 if t % 4 == 0 else 10.0)
+        if cpu > 60.0:
+            damped += detector.should_damp_scale_up()
+            allowed += not detector.should_damp_scale_up()
+    print(f"pulsed: {detector.report()}, damped {damped} / allowed {allowed} pulse ticks")
+    assert detector.verdict == "pulsed" and detector.period_ticks == 4
+    # Sobrecarga que persiste além da rajada aprendida não é amortecida
+    for _ in range(2):
+        detector.observe(90.0, 1, 100.0)
+    assert not detector.should_damp_scale_up()
+
+    steady = PulseDetector(interval=5.0, history=48)
+    for t in range(60):
+        steady.observe(random.uniform(30, 80), 1, random.uniform(20, 60))
+    print(f"noise: {steady.report()}")
+    assert steady.verdict != "pulsed"
+    print("--- pulse_detector.py self-test complete ---")
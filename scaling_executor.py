@@ -0,0 +1,207 @@
+# edos_docker_simulation/scaling_executor.py
+"""
+Execução das ações de escalonamento em background.
+
+`docker_manager.start_instance` bloqueia em `containers.run` + sonda de readiness e
+`stop_instance` pode levar até 5s (`container.stop(timeout=5)`). Executadas dentro do
+loop do orquestrador, cada ação atrasava o tick seguinte e deixava buracos na amostragem.
+Aqui cada ação vira um Future num ThreadPoolExecutor e o loop só consulta o estado:
+
+    "pending"   -> scale-up submetido, aguardando uma thread livre
+    "starting"  -> criando/ativando o contêiner e esperando o primeiro HTTP 200
+    "running"   -> pronto; entra nos alvos do tráfego e na coleta de métricas
+    "draining"  -> saiu dos alvos; parando/removendo o contêiner em background
+
+Um scale-up ainda não pronto pode ser cancelado (`cancel_scale_up`): em "pending" ele
+nem chega a rodar; em "starting" passa a "draining" e o contêiner é parado assim que
+o start termina, sem nunca entrar em "running".
+
+Instâncias que terminam de parar (ou cujo start falhou) deixam o registro.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import docker_manager
+
+STATES = ("pending", "starting", "running", "draining")
+
+
+class ManagedInstance:
+    """
+    Uma instância acompanhada pelo executor. `container` só existe a partir de "running"
+    (ou desde a adoção, para as instâncias iniciais).
+    """
+    __slots__ = ("key", "state", "container", "start_path", "submitted_at",
+                 "ready_ms", "startup_ms", "future")
+
+    def __init__(self, key: str, state: str, container=None):
+        self.key = key
+        self.state = state
+        self.container = container
+        self.start_path: Optional[str] = None  # "warm" | "cold"
+        self.submitted_at = time.monotonic()
+        self.ready_ms: Optional[float] = None   # decisão -> pronto
+        self.startup_ms: Optional[float] = None # tempo até o primeiro HTTP 200
+        self.future = None
+
+    @property
+    def name(self) -> str:
+        return self.container.name if self.container is not None else self.key
+
+
+class ScalingExecutor:
+    """
+    Submete scale-ups/scale-downs a threads de background e mantém o estado de cada
+    instância. Os métodos retornam imediatamente; `poll()` devolve as instâncias que
+    ficaram prontas desde a última chamada.
+    """
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Scaling")
+        self._lock = threading.Lock()
+        self._instances: Dict[str, ManagedInstance] = {}
+        self._ready: List[ManagedInstance] = []   # ficaram "running" desde o último poll()
+        self._failed = 0                          # scale-ups que falharam desde o último poll()
+        self._seq = itertools.count(1)
+
+    # --------- Registro ---------
+    def adopt(self, container):
+        """
+        Registra como "running" um contêiner iniciado fora do executor (instâncias iniciais).
+        """
+        with self._lock:
+            self._instances[container.name] = ManagedInstance(container.name, "running", container)
+
+    def running(self) -> list:
+        """
+        Contêineres prontos, na ordem em que ficaram prontos.
+        """
+        with self._lock:
+            return [i.container for i in self._instances.values() if i.state == "running"]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys(STATES, 0)
+            for instance in self._instances.values():
+                counts[instance.state] += 1
+            return counts
+
+    def provisioned_count(self) -> int:
+        """
+        Instâncias que existirão quando as ações em andamento terminarem (pending +
+        starting + running). É o número que o autoscaler deve considerar para não
+        pedir de novo uma instância que já está subindo.
+        """
+        with self._lock:
+            return sum(1 for i in self._instances.values() if i.state != "draining")
+
+    def discard(self, name: str) -> bool:
+        """
+        Remove uma instância "running" que saiu de serviço por conta própria (crash, OOM,
+        parada externa). Retorna True se ela estava em "running"; instâncias em "draining"
+        ficam com a thread de parada.
+        """
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None or instance.state != "running":
+                return False
+            del self._instances[name]
+            return True
+
+    def poll(self):
+        """
+        Retorna (instâncias que ficaram prontas, nº de scale-ups que falharam) desde a última chamada.
+        """
+        with self._lock:
+            ready, self._ready = self._ready, []
+            failed, self._failed = self._failed, 0
+        return ready, failed
+
+    # --------- Ações ---------
+    def scale_up(self):
+        """
+        Submete a criação de uma instância (warm pool ou cold start). Retorna o Future.
+        """
+        instance = ManagedInstance(f"pending-{next(self._seq)}", "pending")
+        with self._lock:
+            self._instances[instance.key] = instance
+            instance.future = self._pool.submit(self._start, instance)
+        return instance.future
+
+    def scale_down(self, container):
+        """
+        Tira o contêiner de "running" imediatamente (o chamador já pode removê-lo dos alvos)
+        e submete a parada. Retorna o Future, ou None se o contêiner não está em "running".
+        """
+        with self._lock:
+            instance = self._instances.get(container.name)
+            if instance is None or instance.state != "running":
+                return None
+            instance.state = "draining"
+            instance.future = self._pool.submit(self._stop, instance)
+        return instance.future
+
+    def cancel_scale_up(self) -> bool:
+        """
+        Cancela o scale-up mais recente ainda não pronto ("pending" antes de "starting").
+        Retorna False se não há nenhum.
+        """
+        with self._lock:
+            candidates = [i for i in self._instances.values() if i.state in ("pending", "starting")]
+            if not candidates:
+                return False
+            candidates.sort(key=lambda i: (i.state != "pending", -i.submitted_at))
+            instance = candidates[0]
+            if instance.state == "pending" and instance.future.cancel():
+                del self._instances[instance.key]
+            else:
+                # Já está subindo: _start para o contêiner quando acquire_instance retornar
+                instance.state = "draining"
+        return True
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    # --------- Threads de background ---------
+    def _start(self, instance: ManagedInstance):
+        with self._lock:
+            if instance.state == "draining":  # cancelado antes de começar
+                self._instances.pop(instance.key, None)
+                return None
+            instance.state = "starting"
+        try:
+            container, start_path = docker_manager.acquire_instance()
+        except Exception as e:
+            print(f"[ScalingExecutor] Unexpected error while starting an instance: {e}")
+            container, start_path = None, None
+        with self._lock:
+            self._instances.pop(instance.key, None)
+            if container is None:
+                self._failed += 1
+                return None
+            instance.container = container
+            instance.key = container.name
+            instance.start_path = start_path
+            instance.ready_ms = (time.monotonic() - instance.submitted_at) * 1000
+            instance.startup_ms = docker_manager.instance_startup_ms.get(container.name)
+            self._instances[instance.key] = instance
+            if instance.state == "draining":
+                # Cancelado enquanto subia: para o contêiner em vez de colocá-lo em serviço
+                instance.future = self._pool.submit(self._stop, instance)
+                return None
+            instance.state = "running"
+            self._ready.append(instance)
+        return container
+
+    def _stop(self, instance: ManagedInstance):
+        stopped = docker_manager.stop_instance(instance.name)
+        with self._lock:
+            if stopped:
+                self._instances.pop(instance.key, None)
+            else:
+                # Mesmo critério do loop síncrono: a instância volta para a rotação
+                print(f"[ScalingExecutor] Failed to stop {instance.name}. Returning it to running (caution).")
+                instance.state = "running"
+        return stopped
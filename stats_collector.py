@@ -1,25 +1,88 @@
+import math
+import os
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 import docker
 
+from cgroup_stats import CgroupStatsReader, CgroupUnavailable, cgroup_v2_available
+from cluster_metrics import InstanceSample, aggregate
+from timeseries import RingSeries, window_stat
+
 try:
     import config  # usa o mesmo config do projeto, se existir
     POLL_INTERVAL = getattr(config, "DOCKER_STATS_POLL_INTERVAL_SECONDS", 1.0)
+    STATS_MODE = getattr(config, "DOCKER_STATS_MODE", "poll")
+    STREAM_WORKERS = getattr(config, "DOCKER_STATS_STREAM_WORKERS", getattr(config, "MAX_INSTANCES", 8) + 2)
+    CGROUP_INTERVAL = getattr(config, "CGROUP_SAMPLE_INTERVAL_SECONDS", 0.05)
+    CGROUP_CPU_WINDOW = getattr(config, "CGROUP_CPU_WINDOW_SECONDS", 1.0)
+    WINDOWS = tuple(getattr(config, "STATS_WINDOWS_SECONDS", (10, 60)))
+    CPU_HIST_MAX = getattr(config, "STATS_CPU_HIST_MAX_PERCENT", None)
+    MEM_HIST_MAX = getattr(config, "STATS_MEM_HIST_MAX_MB", 2048.0)
 except Exception:
     POLL_INTERVAL = 1.0  # fallback
+    STATS_MODE = "poll"
+    STREAM_WORKERS = 8
+    CGROUP_INTERVAL = 0.05
+    CGROUP_CPU_WINDOW = 1.0
+    WINDOWS = (10, 60)
+    CPU_HIST_MAX = None
+    MEM_HIST_MAX = 2048.0
+
+# Campos guardados nas séries temporais por contêiner
+SERIES_FIELDS = ("cpu_percent", "mem_app_mb")
+# Topo do histograma de percentis de cada campo: CPU% do docker stats vai até 100 x CPUs do host
+# (prefork com vários workers passa de 400%); memória em MB
+SERIES_HIST_MAX = {
+    "cpu_percent": CPU_HIST_MAX or 100.0 * (os.cpu_count() or 4),
+    "mem_app_mb": MEM_HIST_MAX,
+}
+
+# Frequência com que o modo "stream" reconcilia as assinaturas com a lista de contêineres
+STREAM_RECONCILE_INTERVAL = 0.2
 
 class StatsCollector:
     """
     Thread que coleta docker stats periodicamente e guarda num cache thread-safe.
     O loop principal lê somente desse cache (sem fazer chamadas ao Docker).
+
+    Modos de coleta:
+      "poll"   -> varre os contêineres em sequência com stats(stream=False); cada chamada
+                  bloqueia ~1-2s, então a varredura cresce linearmente com o nº de instâncias.
+      "stream" -> uma assinatura persistente stats(stream=True, decode=True) por contêiner
+                  num pool de threads; o Docker empurra uma amostra por segundo para cada
+                  um, então o cache é renovado a cada ~1s independente do nº de instâncias.
+      "cgroup" -> lê cpu.stat/memory.*/io.stat direto de /sys/fs/cgroup a cada ~50ms
+                  (ver cgroup_stats.py); recorre à API do Docker se o cgroupfs não for legível.
+
+    Além da última amostra, cada contêiner tem uma RingSeries (timeseries.py) com as
+    amostras recentes e agregados incrementais (média/máximo/percentil) para as janelas
+    em `windows` (segundos), consultados por `get_window_stat`.
     """
-    def __init__(self, client: Optional[docker.DockerClient] = None, poll_interval: float = POLL_INTERVAL):
+    def __init__(self, client: Optional[docker.DockerClient] = None, poll_interval: float = POLL_INTERVAL,
+                 mode: str = STATS_MODE, stream_workers: int = STREAM_WORKERS,
+                 cgroup_interval: float = CGROUP_INTERVAL, cgroup_cpu_window: float = CGROUP_CPU_WINDOW,
+                 windows=WINDOWS):
+        if mode not in ("poll", "stream", "cgroup"):
+            raise ValueError(f"Unknown stats collector mode '{mode}'. Options: poll, stream, cgroup")
         self.client = client or docker.from_env()
         self.poll_interval = poll_interval
+        self.mode = mode
+        self.stream_workers = max(1, int(stream_workers))
+        self.cgroup_interval = cgroup_interval
+        self.cgroup_cpu_window = cgroup_cpu_window
+        self._capacity_warned = False
 
         self._container_ids: List[str] = []  # lista de IDs (ou names) a monitorar
+        self._names: Dict[str, str] = {}     # id -> nome (quando update_containers recebe objetos)
         self._cache: Dict[str, dict] = {}    # id -> métricas calculadas
+        self._series: Dict[str, RingSeries] = {}  # id -> amostras recentes (buffer circular)
+        self._ready_since: Dict[str, float] = {}  # id -> quando entrou no conjunto monitorado (já pronto)
+        self.windows = tuple(float(w) for w in windows)
+        # Capacidade para a maior janela no ritmo de amostragem do modo escolhido
+        sample_interval = cgroup_interval if mode == "cgroup" else (1.0 if mode == "stream" else poll_interval)
+        self.series_capacity = int(math.ceil(max(self.windows, default=1.0) / max(sample_interval, 1e-3))) + 16
         self._lock = threading.Lock()
         self._stop_evt = threading.Event()
 
@@ -39,12 +102,21 @@ class StatsCollector:
         Guarda apenas os IDs para consulta interna.
         """
         ids = []
+        names = {}
         for c in containers:
             ids.append(c.id if hasattr(c, "id") else str(c))
+            if hasattr(c, "name"):
+                names[ids[-1]] = c.name
+        now = time.monotonic()
         with self._lock:
             self._container_ids = ids
+            self._names = names
             # remove do cache quem saiu
             self._cache = {cid: v for cid, v in self._cache.items() if cid in ids}
+            self._series = {cid: v for cid, v in self._series.items() if cid in ids}
+            # O orquestrador só passa instâncias que já responderam à sonda de readiness:
+            # o warm-up conta a partir da primeira vez que cada uma aparece aqui
+            self._ready_since = {cid: self._ready_since.get(cid, now) for cid in ids}
 
     def get_snapshot(self) -> Dict[str, dict]:
         """
@@ -55,18 +127,82 @@ class StatsCollector:
 
     def get_averages(self) -> Tuple[float, float, List[str]]:
         """
-        Retorna (avg_cpu_percent, avg_mem_app_mb, container_names)
+        Retorna (avg_cpu_percent, avg_mem_app_mb, container_names) da última amostra de cada contêiner.
+        """
+        with self._lock:
+            if not self._cache:
+                return 0.0, 0.0, []
+            cpu = mem = 0.0
+            names = []
+            for v in self._cache.values():
+                cpu += v.get("cpu_percent", 0.0)
+                mem += v.get("mem_app_mb", 0.0)
+                names.append(v.get("name", ""))
+            n = len(self._cache)
+        return (cpu / n, mem / n, names)
+
+    def get_window_stat(self, seconds: float, stat: str = "mean", field: str = "cpu_percent") -> float:
+        """
+        Média entre os contêineres de uma estatística da janela de `seconds` de cada um.
+        `stat`: "mean", "max" ou "pNN" (ex.: "p95"). `seconds` precisa estar em `windows`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            values = [window_stat(series.window(seconds, field, now), stat)
+                      for series in self._series.values()]
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else 0.0
+
+    def get_container_window_stats(self, seconds: float, field: str = "cpu_percent",
+                                   q: float = 95.0) -> Dict[str, Tuple[float, float, float]]:
+        """
+        {nome: (média, máximo, percentil q)} da janela de cada contêiner.
+        """
+        now = time.monotonic()
+        out = {}
+        with self._lock:
+            for cid, series in self._series.items():
+                agg = series.window(seconds, field, now)
+                if agg.count:
+                    out[self._names.get(cid, cid[:12])] = (agg.mean(), agg.max(), agg.percentile(q))
+        return out
+
+    def get_cluster_metric(self, field: str = "cpu_percent", window_seconds: float = 0.0, stat: str = "mean",
+                           aggregation: Optional[str] = None,
+                           requests_by_name: Optional[Dict[str, float]] = None) -> Tuple[float, List[str]]:
+        """
+        Métrica do cluster para o autoscaler, ciente do warm-up (ver cluster_metrics.py).
+        Valor por contêiner: última amostra (window_seconds = 0) ou `stat` da janela.
+        Retorna (valor, nomes excluídos/com peso reduzido, incluindo os que ainda não têm amostras).
         """
-        snap = self.get_snapshot()
-        if not snap:
-            return 0.0, 0.0, []
-        cpu = [v.get("cpu_percent", 0.0) for v in snap.values()]
-        mem = [v.get("mem_app_mb", 0.0) for v in snap.values()]
-        names = [v.get("name", "") for v in snap.values()]
-        return (sum(cpu) / len(cpu), sum(mem) / len(mem), names)
+        now = time.monotonic()
+        samples, missing = [], []
+        with self._lock:
+            for cid in self._container_ids:
+                name = self._names.get(cid, cid[:12])
+                if window_seconds > 0:
+                    series = self._series.get(cid)
+                    value = window_stat(series.window(window_seconds, field, now), stat) if series else None
+                else:
+                    value = self._cache[cid].get(field, 0.0) if cid in self._cache else None
+                if value is None:
+                    missing.append(name)
+                    continue
+                requests = requests_by_name.get(name) if requests_by_name is not None else None
+                samples.append(InstanceSample(name, value, now - self._ready_since.get(cid, now), requests))
+        value, warming = aggregate(samples, aggregation)
+        return value, missing + warming
 
     # --------- Loop interno ---------
     def _run(self):
+        if self.mode == "cgroup":
+            self._run_cgroup()
+        elif self.mode == "stream":
+            self._run_streams()
+        else:
+            self._run_poll()
+
+    def _run_poll(self):
         while not self._stop_evt.is_set():
             ids = self._copy_ids()
             for cid in ids:
@@ -75,8 +211,7 @@ class StatsCollector:
                     stats = c.stats(stream=False)
                     metrics = self._compute_metrics(c, stats)
                     if metrics:
-                        with self._lock:
-                            self._cache[cid] = metrics
+                        self._store(cid, metrics)
                 except docker.errors.NotFound:
                     with self._lock:
                         self._cache.pop(cid, None)
@@ -86,6 +221,147 @@ class StatsCollector:
             # pequeno sleep entre varreduras
             self._stop_evt.wait(self.poll_interval)
 
+    def _run_streams(self):
+        """
+        Mantém uma assinatura de stats por contêiner monitorado (modo "stream").
+        """
+        pool = ThreadPoolExecutor(max_workers=self.stream_workers, thread_name_prefix="DockerStatsStream")
+        subscriptions: Dict[str, Tuple[threading.Event, object]] = {}  # id -> (evento de parada, future)
+        try:
+            while not self._stop_evt.is_set():
+                self._reconcile_streams(set(self._copy_ids()), subscriptions, pool)
+                self._stop_evt.wait(STREAM_RECONCILE_INTERVAL)
+        finally:
+            self._close_streams(subscriptions, pool)
+
+    def _reconcile_streams(self, ids: set, subscriptions: Dict[str, Tuple[threading.Event, object]],
+                           pool: ThreadPoolExecutor):
+        """
+        Cria assinaturas para os contêineres novos, encerra as dos removidos e reabre
+        as que terminaram sozinhas (ex.: contêiner reiniciado).
+        """
+        for cid in list(subscriptions):
+            sub_stop, future = subscriptions[cid]
+            if cid not in ids:
+                sub_stop.set()
+                del subscriptions[cid]
+            elif future.done():
+                del subscriptions[cid]  # terminou sozinha: reabre abaixo
+        for cid in ids:
+            if cid not in subscriptions:
+                if len(subscriptions) >= self.stream_workers:
+                    if not self._capacity_warned:
+                        print(f"[StatsCollector] Warning: {len(ids)} containers but only "
+                              f"{self.stream_workers} stream workers; extra containers wait for a free slot.")
+                        self._capacity_warned = True
+                    break
+                sub_stop = threading.Event()
+                subscriptions[cid] = (sub_stop, pool.submit(self._stream_container, cid, sub_stop))
+
+    @staticmethod
+    def _close_streams(subscriptions: Dict[str, Tuple[threading.Event, object]], pool: Optional[ThreadPoolExecutor]):
+        for sub_stop, _ in subscriptions.values():
+            sub_stop.set()
+        subscriptions.clear()
+        if pool is not None:
+            # As threads saem na próxima amostra (<= ~1s); não bloqueia o stop() do coletor
+            pool.shutdown(wait=False)
+
+    def _run_cgroup(self):
+        """
+        Modo "cgroup": lê /sys/fs/cgroup diretamente a cada `cgroup_interval` (sub-100ms).
+        Contêineres cujo cgroup não é legível são coletados pela API do Docker (assinaturas
+        de stats, como no modo "stream"); sem cgroup v2 o coletor inteiro passa a "stream".
+        """
+        if not cgroup_v2_available():
+            print("[StatsCollector] cgroup v2 not readable at /sys/fs/cgroup. Falling back to Docker stats streams.")
+            self.mode = "stream"
+            self._run_streams()
+            return
+        reader = CgroupStatsReader(cpu_window_seconds=self.cgroup_cpu_window)
+        failed: set = set()  # contêineres sem cgroup legível: coletados pela API do Docker
+        subscriptions: Dict[str, Tuple[threading.Event, object]] = {}
+        pool: Optional[ThreadPoolExecutor] = None
+        try:
+            while not self._stop_evt.is_set():
+                with self._lock:
+                    ids = list(self._container_ids)
+                    names = dict(self._names)
+                for cid in ids:
+                    if cid in failed:
+                        continue
+                    try:
+                        if not reader.is_resolved(cid):
+                            reader.resolve(cid, self._container_pid(cid))
+                        metrics = reader.sample(cid, names.get(cid, cid[:12]))
+                    except CgroupUnavailable:
+                        failed.add(cid)
+                        print(f"[StatsCollector] cgroup for {names.get(cid, cid[:12])} not readable. Using Docker API for it.")
+                        continue
+                    if metrics:
+                        self._store(cid, metrics)
+                reader.forget(ids)
+                failed &= set(ids)
+                if failed or subscriptions:
+                    if pool is None:
+                        pool = ThreadPoolExecutor(max_workers=self.stream_workers, thread_name_prefix="DockerStatsStream")
+                    self._reconcile_streams(set(failed), subscriptions, pool)
+                self._stop_evt.wait(self.cgroup_interval)
+        finally:
+            self._close_streams(subscriptions, pool)
+
+    def _container_pid(self, cid: str) -> Optional[int]:
+        try:
+            return self.client.containers.get(cid).attrs.get("State", {}).get("Pid") or None
+        except Exception:
+            return None
+
+    def _stream_container(self, cid: str, sub_stop: threading.Event):
+        stream = None
+        try:
+            c = self.client.containers.get(cid)
+            stream = c.stats(stream=True, decode=True)
+            for stats in stream:
+                if sub_stop.is_set() or self._stop_evt.is_set():
+                    break
+                # A primeira amostra não tem precpu_stats (sem delta para calcular CPU%)
+                if not stats.get("precpu_stats", {}).get("system_cpu_usage"):
+                    continue
+                metrics = self._compute_metrics(c, stats)
+                if metrics:
+                    self._store(cid, metrics)
+        except docker.errors.NotFound:
+            with self._lock:
+                self._cache.pop(cid, None)
+        except Exception:
+            # Evita derrubar o coletor por erro pontual de um contêiner
+            pass
+        finally:
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+        # Espera antes de a assinatura ser reaberta (evita laço apertado se o contêiner sumiu)
+        if not sub_stop.is_set():
+            sub_stop.wait(self.poll_interval)
+
+    def _store(self, cid: str, metrics: dict):
+        """
+        Atualiza a última amostra e a série temporal do contêiner.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if cid not in self._container_ids:  # pode ter sido removido durante a leitura
+                return
+            self._cache[cid] = metrics
+            series = self._series.get(cid)
+            if series is None:
+                series = self._series[cid] = RingSeries(SERIES_FIELDS, self.series_capacity, self.windows,
+                                                        hist_max=SERIES_HIST_MAX)
+            series.append(now, cpu_percent=metrics.get("cpu_percent", 0.0),
+                          mem_app_mb=metrics.get("mem_app_mb", 0.0))
+
     def _copy_ids(self) -> List[str]:
         with self._lock:
             return list(self._container_ids)
@@ -0,0 +1,90 @@
+# edos_docker_simulation/target_set.py
+"""
+Conjunto de alvos (URLs das instâncias) compartilhado pelos geradores de tráfego.
+
+O orquestrador publica a lista de instâncias ativas a cada tick com `update()`;
+os workers leem `urls` a cada envio. A troca é atômica (uma única atribuição de
+tupla imutável), então os workers nunca precisam parar: instâncias novas entram
+na rotação no envio seguinte e instâncias removidas simplesmente deixam de ser
+escolhidas. Quem mantém conexões (motor asyncio, sessões `requests`) acompanha as
+mudanças para pré-aquecer conexões com os novos alvos e drenar os removidos.
+"""
+import threading
+from typing import Callable, Iterable, List, Tuple
+from urllib.parse import urlsplit
+
+TargetListener = Callable[[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]], None]
+
+
+class TargetSet:
+    """
+    Lista de URLs versionada, trocada atomicamente.
+    """
+    def __init__(self, urls: Iterable[str] = ()):
+        self._lock = threading.Lock()  # serializa apenas escritores (update/subscribe)
+        self._listeners: List[TargetListener] = []
+        # (versão, urls) numa única tupla: leitores obtêm um par consistente sem lock
+        self._state: Tuple[int, Tuple[str, ...]] = (0, tuple(dict.fromkeys(urls)))
+
+    @property
+    def urls(self) -> Tuple[str, ...]:
+        return self._state[1]
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def snapshot(self) -> Tuple[int, Tuple[str, ...]]:
+        return self._state
+
+    def subscribe(self, listener: TargetListener):
+        """
+        `listener(added, removed, urls)` é chamado (na thread de quem chamou `update`)
+        a cada mudança do conjunto.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: TargetListener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def update(self, urls: Iterable[str]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """
+        Publica a nova lista de alvos. Retorna (adicionados, removidos); ambos vazios
+        se nada mudou (chamar a cada tick é barato).
+        """
+        new_urls = tuple(dict.fromkeys(urls))
+        with self._lock:
+            version, old_urls = self._state
+            if new_urls == old_urls:
+                return (), ()
+            old_set, new_set = set(old_urls), set(new_urls)
+            added = tuple(u for u in new_urls if u not in old_set)
+            removed = tuple(u for u in old_urls if u not in new_set)
+            self._state = (version + 1, new_urls)
+            listeners = list(self._listeners)
+            for listener in listeners:
+                try:
+                    listener(added, removed, new_urls)
+                except Exception as e:
+                    print(f"[TargetSet] Listener error: {e}")
+        return added, removed
+
+
+def close_session_pools(session, urls: Iterable[str]):
+    """
+    Fecha os pools de conexão de uma `requests.Session` com os alvos em `urls`
+    (drena alvos removidos sem descartar as conexões com os demais).
+    """
+    hosts = {(parts.hostname, parts.port or 80) for parts in map(urlsplit, urls)}
+    if not hosts:
+        return
+    for adapter in session.adapters.values():
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            if (key.key_host, key.key_port or 80) in hosts:
+                del pools[key]  # o container do urllib3 fecha o pool ao removê-lo
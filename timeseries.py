@@ -0,0 +1,230 @@
+# edos_docker_simulation/timeseries.py
+"""
+Séries temporais por contêiner em buffers circulares pré-alocados (struct-of-arrays).
+
+Cada `RingSeries` guarda as últimas `capacity` amostras de alguns campos (ex.:
+cpu_percent, mem_app_mb) em um `array('d')` por campo, mais o timestamp monotônico.
+Para cada janela configurada (ex.: últimos 10s e 60s) e cada campo, um `WindowAggregate`
+é atualizado incrementalmente a cada amostra:
+
+    média       -> soma corrente (entra a amostra nova, saem as que ficaram fora da janela)
+    máximo      -> deque monotônico de índices (O(1) amortizado)
+    percentil   -> histograma de contagens com bins fixos guardado numa árvore de Fenwick:
+                   inserção/remoção e consulta do rank em O(log bins), independente do nº de
+                   amostras; resolução = largura do bin. A faixa do histograma é por campo
+                   (`hist_max`): CPU% e MB de memória têm escalas diferentes.
+
+Nenhuma consulta copia dicts nem percorre as amostras da janela.
+"""
+import math
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+
+class WindowAggregate:
+    """
+    Média/máximo/percentil de um campo sobre os últimos `seconds` segundos de uma RingSeries.
+    """
+    __slots__ = ("seconds", "values", "times", "capacity", "tail", "count", "total",
+                 "_max_idx", "_tree", "_bin_width", "_bins", "_top_step")
+
+    def __init__(self, seconds: float, values: array, times: array, capacity: int,
+                 hist_max: float = 400.0, hist_bins: int = 800):
+        self.seconds = seconds
+        self.values = values
+        self.times = times
+        self.capacity = capacity
+        self.tail = 0          # nº de sequência da amostra mais antiga dentro da janela
+        self.count = 0
+        self.total = 0.0
+        self._max_idx = deque()  # nºs de sequência com valores decrescentes
+        self._bins = hist_bins
+        self._bin_width = hist_max / hist_bins
+        # Árvore de Fenwick (1-indexada) das contagens por bin
+        self._tree = array("l", bytes((hist_bins + 1) * array("l").itemsize))
+        self._top_step = 1 << (hist_bins.bit_length() - 1)
+
+    def _bin(self, value: float) -> int:
+        b = int(value / self._bin_width)
+        return 0 if b < 0 else (self._bins - 1 if b >= self._bins else b)
+
+    def _add(self, b: int, delta: int):
+        tree, i, n = self._tree, b + 1, self._bins
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def push(self, seq: int, value: float, now: float):
+        # Amostra que o buffer vai sobrescrever sai da janela mesmo que ainda esteja no prazo
+        self._evict_until(seq - self.capacity + 1)
+        self.total += value
+        self.count += 1
+        self._add(self._bin(value), 1)
+        max_idx = self._max_idx
+        while max_idx and self.values[max_idx[-1] % self.capacity] <= value:
+            max_idx.pop()
+        max_idx.append(seq)
+        self.expire(now, seq + 1)
+
+    def expire(self, now: float, head: int):
+        """
+        Remove as amostras mais velhas que `seconds` (head = próximo nº de sequência).
+        """
+        cutoff = now - self.seconds
+        seq = self.tail
+        while seq < head and self.times[seq % self.capacity] < cutoff:
+            seq += 1
+        self._evict_until(seq)
+
+    def _evict_until(self, seq: int):
+        while self.tail < seq and self.count:
+            value = self.values[self.tail % self.capacity]
+            self.total -= value
+            self.count -= 1
+            self._add(self._bin(value), -1)
+            if self._max_idx and self._max_idx[0] == self.tail:
+                self._max_idx.popleft()
+            self.tail += 1
+        if self.tail < seq:
+            self.tail = seq
+        if not self.count:
+            self.total = 0.0  # evita acúmulo de erro de ponto flutuante
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def max(self) -> float:
+        return self.values[self._max_idx[0] % self.capacity] if self._max_idx else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Percentil `q` (0-100) pelo histograma: limite superior do bin que contém o rank.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        # Descida na árvore: maior prefixo de bins com contagem < rank (O(log bins))
+        tree, pos, step = self._tree, 0, self._top_step
+        while step:
+            nxt = pos + step
+            if nxt <= self._bins and tree[nxt] < rank:
+                pos = nxt
+                rank -= tree[nxt]
+            step >>= 1
+        # `pos` bins ficam abaixo do rank: ele está no bin de índice `pos`
+        return min((pos + 1) * self._bin_width, self.max())
+
+
+def window_stat(agg: WindowAggregate, stat: str) -> Optional[float]:
+    """
+    Estatística `stat` ("mean", "max" ou "pNN") de um agregado; None se a janela está vazia.
+    """
+    if not agg.count:
+        return None  # série sem amostras na janela (recém-criada ou parou de reportar)
+    if stat == "mean":
+        return agg.mean()
+    if stat == "max":
+        return agg.max()
+    if stat.startswith("p"):
+        return agg.percentile(float(stat[1:]))
+    raise ValueError(f"Unknown window statistic '{stat}'. Options: mean, max, pNN")
+
+
+class RingSeries:
+    """
+    Últimas `capacity` amostras de `fields`, com agregados incrementais para cada janela.
+    `hist_max` é o topo do histograma de percentis: um valor para todos os campos ou um
+    dict por campo (campos ausentes usam 400).
+    """
+    def __init__(self, fields: Sequence[str], capacity: int, windows: Iterable[float],
+                 hist_max: Union[float, Dict[str, float]] = 400.0, hist_bins: int = 800):
+        self.fields = tuple(fields)
+        self.capacity = max(2, int(capacity))
+        self.head = 0  # nº de sequência da próxima amostra
+        self.times = array("d", bytes(self.capacity * 8))
+        self.values: Dict[str, array] = {f: array("d", bytes(self.capacity * 8)) for f in self.fields}
+        ranges = hist_max if isinstance(hist_max, dict) else dict.fromkeys(self.fields, hist_max)
+        self.windows: Dict[float, Dict[str, WindowAggregate]] = {
+            float(seconds): {f: WindowAggregate(float(seconds), self.values[f], self.times, self.capacity,
+                                                ranges.get(f, 400.0), hist_bins)
+                             for f in self.fields}
+            for seconds in windows
+        }
+
+    def __len__(self) -> int:
+        return min(self.head, self.capacity)
+
+    def append(self, ts: float, **values: float):
+        seq = self.head
+        i = seq % self.capacity
+        # Antes de sobrescrever, as janelas descartam a amostra antiga desta posição
+        for per_field in self.windows.values():
+            for f in self.fields:
+                per_field[f]._evict_until(seq - self.capacity + 1)
+        self.times[i] = ts
+        for f in self.fields:
+            self.values[f][i] = float(values.get(f, 0.0) or 0.0)
+        self.head = seq + 1
+        for per_field in self.windows.values():
+            for f in self.fields:
+                per_field[f].push(seq, self.values[f][i], ts)
+
+    def window(self, seconds: float, field: str, now: Optional[float] = None) -> WindowAggregate:
+        """
+        Agregado da janela (que precisa estar entre as configuradas). Com `now`, descarta
+        antes as amostras vencidas (contêiner que parou de reportar não fica com valor velho).
+        """
+        aggregate = self.windows[float(seconds)][field]
+        if now is not None:
+            aggregate.expire(now, self.head)
+        return aggregate
+
+    def last(self, field: str) -> float:
+        return self.values[field][(self.head - 1) % self.capacity] if self.head else 0.0
+
+
+# --- Self-test section ---
+if __name__ == "__main__":
+    import random
+    import statistics
+    import time
+
+    print("--- Running timeseries.py self-test ---")
+    series = RingSeries(("cpu_percent",), capacity=64, windows=(1.0, 5.0))
+    samples = []
+    for i in range(200):
+        t = i * 0.1
+        v = random.uniform(0, 100)
+        series.append(t, cpu_percent=v)
+        samples.append((t, v))
+        for seconds in (1.0, 5.0):
+            expected = [x for ts, x in samples[-64:] if ts >= t - seconds]
+            agg = series.window(seconds, "cpu_percent")
+            assert agg.count == len(expected), (i, seconds, agg.count, len(expected))
+            assert abs(agg.mean() - statistics.fmean(expected)) < 1e-6
+            assert agg.max() == max(expected)
+            p95 = sorted(expected)[max(0, math.ceil(0.95 * len(expected)) - 1)]
+            assert abs(agg.percentile(95) - p95) <= 0.5 + 1e-9
+    # Sem amostras novas, a janela esvazia com o tempo
+    assert series.window(1.0, "cpu_percent", now=100.0).count == 0
+
+    # Faixa por campo: memória acima de 400 MB não satura no topo do histograma
+    mem = RingSeries(("cpu_percent", "mem_app_mb"), capacity=64, windows=(10.0,),
+                     hist_max={"cpu_percent": 800.0, "mem_app_mb": 4096.0})
+    for i in range(20):
+        mem.append(i * 0.5, cpu_percent=450.0 + i, mem_app_mb=1000.0 + 10 * i)
+    assert abs(mem.window(10.0, "mem_app_mb").percentile(50) - 1090.0) <= 4096.0 / 800 + 1e-9
+    assert abs(mem.window(10.0, "cpu_percent").percentile(95) - 469.0) <= 1.0 + 1e-9
+
+    big = RingSeries(("cpu_percent", "mem_app_mb"), capacity=1500, windows=(10.0, 60.0))
+    t0 = time.perf_counter()
+    for i in range(100_000):
+        big.append(i * 0.05, cpu_percent=i % 100, mem_app_mb=50.0)
+    per_append_us = (time.perf_counter() - t0) / 100_000 * 1e6
+    t0 = time.perf_counter()
+    for _ in range(10_000):
+        big.window(60.0, "cpu_percent").percentile(95)
+    per_query_us = (time.perf_counter() - t0) / 10_000 * 1e6
+    print(f"append: {per_append_us:.1f} us, p95 query over 1200 samples: {per_query_us:.1f} us")
+    print("--- timeseries.py self-test complete ---")
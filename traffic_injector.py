@@ -4,19 +4,34 @@ import time
 import threading
 import config # Para obter HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER, HTTP_ATTACK_NUM_ATTACKERS
 import random # Para uma alternativa de balanceamento
-import statistics
+from latency_histogram import HistogramRecorder
+from load_engine import OpenLoopEngine
+from load_balancer import DistributionTracker, LoadBalancer
+from target_set import TargetSet, close_session_pools
+from traffic_shards import ShardedTraffic
 
 # Variável global para controlar a execução dos threads de ataque
 attack_active = False
 attacker_threads = []
 threads = []
-rtt_measurements = []
-rtt_lock = threading.Lock()
-
-def http_request_worker(target_url, rps_per_this_worker):
+# Latências (ms) em histogramas de memória constante: um writer por worker/motor/shard
+rtt_recorder = HistogramRecorder()
+# Atraso de cada envio em relação ao cronograma de RPS (ms) e o atraso mais recente por worker
+lag_recorder = HistogramRecorder()
+worker_schedule_lag_ms = {}
+async_engine = None # OpenLoopEngine ativo quando config.HTTP_ATTACK_ENGINE == "asyncio"
+async_rtt_histogram = None # Histograma do motor asyncio (o event loop é o único writer)
+async_lag_histogram = None
+shard_pool = None # ShardedTraffic ativo quando config.HTTP_ATTACK_PROCESS_SHARDS > 0
+thread_balancer = None # LoadBalancer compartilhado pelos workers em thread
+distribution_tracker = DistributionTracker() # Requisições por alvo no intervalo
+# Alvos atuais do ataque; trocados a quente pelo orquestrador (update_flood_targets)
+attack_targets = TargetSet()
+
+def http_request_worker(worker_index, query, rps_per_this_worker, balancer):
     """
-    Worker thread function. Sends requests to target_url at a specified RPS.
-    Controlado pela flag global 'attack_active'.
+    Worker thread function. Sends requests to the current attack targets at a specified RPS.
+    Controlado pela flag global 'attack_active'; o alvo de cada envio é escolhido por 'balancer'.
     """
     # Contadores locais para este worker específico
     worker_request_count = 0
@@ -25,6 +40,12 @@ def http_request_worker(target_url, rps_per_this_worker):
     # Usar uma sessão pode ser benéfico para keep-alive se o servidor suportar
     # e para reutilizar conexões TCP, reduzindo a sobrecarga.
     session = requests.Session() 
+    rtt_histogram = rtt_recorder.writer() # Histograma exclusivo deste worker (gravação sem lock)
+    lag_histogram = lag_recorder.writer()
+    worker_name = threading.current_thread().name
+    # No modo "intended" a latência é medida a partir do instante previsto pelo cronograma
+    # de RPS (não do envio real), para não esconder o tempo de fila quando o worker atrasa.
+    intended_mode = getattr(config, "LATENCY_MEASUREMENT_MODE", "service") == "intended"
     
     # Calcular o intervalo de sono necessário para atingir o RPS alvo.
     # Se rps_per_this_worker for 0 ou negativo, o worker não enviará requisições ativamente,
@@ -37,15 +58,44 @@ def http_request_worker(target_url, rps_per_this_worker):
 
     # print(f"  [Injector Worker {threading.get_ident()}] Started. Target: {target_url}, Configured RPS: {rps_per_this_worker:.2f}, Target Interval: {sleep_interval_seconds:.4f}s")
 
+    next_intended_send = time.monotonic() # Cronograma fixo: t0, t0 + intervalo, t0 + 2*intervalo...
+    seen_version, seen_urls = attack_targets.snapshot()
+
     while attack_active: # Loop é controlado pela flag global 'attack_active'
-        start_time = time.monotonic()
         # Se RPS for 0, apenas dorme e continua checando 'attack_active'
         if rps_per_this_worker <= 0:
             time.sleep(0.1) # Dorme um pouco para não consumir CPU em idle e checa 'attack_active'
             continue
 
+        # Alvos trocados pelo orquestrador: fecha as conexões com as instâncias removidas
+        version, urls = attack_targets.snapshot()
+        if version != seen_version:
+            close_session_pools(session, set(seen_urls) - set(urls))
+            seen_version, seen_urls = version, urls
+        if not urls:
+            time.sleep(0.1) # Sem alvos no momento: espera o orquestrador publicar novos
+            next_intended_send = time.monotonic()
+            continue
+
+        if intended_mode:
+            # Segue o cronograma: se estiver atrasado, envia imediatamente para recuperar
+            wait_time = next_intended_send - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
         # Registra o tempo de início desta iteração para calcular o tempo de sono necessário
         iteration_start_time = time.monotonic()
+        start_time = next_intended_send if intended_mode else iteration_start_time
+        schedule_lag_ms = max(0.0, (iteration_start_time - next_intended_send) * 1000)
+        lag_histogram.record(schedule_lag_ms)
+        worker_schedule_lag_ms[worker_name] = schedule_lag_ms
+        next_intended_send += sleep_interval_seconds
+
+        # Escolhe o alvo no momento do envio (round-robin, menos requisições em voo, p2c...)
+        target = balancer.pick(worker_index)
+        if target is None:
+            continue
+        target_url = target.url + "?" + query
         
         try:
             # Faz a requisição HTTP GET com o timeout configurado
@@ -54,8 +104,7 @@ def http_request_worker(target_url, rps_per_this_worker):
             if response.status_code == 200:
                 end_time = time.monotonic()
                 rtt = (end_time - start_time) * 1000  # em milissegundos
-                with rtt_lock:
-                    rtt_measurements.append(rtt)
+                rtt_histogram.record(rtt)
 
                 worker_request_count += 1
             else:
@@ -69,7 +118,11 @@ def http_request_worker(target_url, rps_per_this_worker):
             # Lidar com outras exceções de requisição (ex: ConnectionError)
             # print(f"  [Injector Worker {threading.get_ident()}] Target: {target_url}, Request error: {e}")
             worker_error_count += 1
+        balancer.release(target, (time.monotonic() - iteration_start_time) * 1000)
         
+        if intended_mode:
+            continue # O sono até o próximo envio previsto acontece no início do loop
+
         # Calcular o tempo gasto na iteração (requisição + processamento)
         iteration_time_taken = time.monotonic() - iteration_start_time
         
@@ -88,6 +141,9 @@ def http_request_worker(target_url, rps_per_this_worker):
         # para a próxima iteração imediatamente para tentar recuperar o atraso.
 
     # Loop terminou porque 'attack_active' tornou-se False
+    rtt_recorder.retire(rtt_histogram)
+    lag_recorder.retire(lag_histogram)
+    worker_schedule_lag_ms.pop(worker_name, None)
     print(f"  [Injector Worker {threading.get_ident()}] Stopped. Requests by this worker: {worker_request_count}, Errors: {worker_error_count}")
 
     # Opcional: Atualizar contadores globais de resumo (requereria um lock)
@@ -96,21 +152,174 @@ def http_request_worker(target_url, rps_per_this_worker):
     #     global_total_errors_summary += worker_error_count
 
 def get_average_rtt_attack_ms():
-    with rtt_lock:
-        if not rtt_measurements:
-            return 0.0
-        return statistics.mean(rtt_measurements)
+    """
+    Cumulative mean RTT of the running workers (kept for compatibility; prefer get_interval_latency()).
+    """
+    return rtt_recorder.cumulative_mean_ms()
+
+
+def get_interval_latency():
+    """
+    Attack RTT distribution since the previous call: {count, p50_ms, p95_ms, p99_ms, max_ms}.
+    """
+    return rtt_recorder.interval_summary()
+
+
+def get_interval_schedule_lag():
+    """
+    Distribution of how late sends were vs. the RPS schedule since the previous call.
+    """
+    return lag_recorder.interval_summary()
+
+
+def get_worker_schedule_lag_ms():
+    """
+    Most recent schedule lag (ms) per worker (per shard in multi-process mode).
+    """
+    if shard_pool is not None:
+        return shard_pool.worker_schedule_lag_ms()
+    if async_engine is not None:
+        return {f"{async_engine.name}-{i}": lag for i, lag in enumerate(async_engine.worker_lag_ms)}
+    return dict(worker_schedule_lag_ms)
+
+
+def _forward_targets(added, removed, urls):
+    """
+    Repasse das trocas de alvos para o motor asyncio ou para os shards em execução
+    (os workers em thread leem 'attack_targets' diretamente).
+    """
+    if shard_pool is not None:
+        shard_pool.update_targets(list(urls))
+    if async_engine is not None:
+        async_engine.update_targets(list(urls))
+    if thread_balancer is not None:
+        thread_balancer.set_targets(urls)
+
+
+attack_targets.subscribe(_forward_targets)
+
+
+def update_flood_targets(target_urls):
+    """
+    Hot-swaps the attack targets without stopping the workers: new instances join the
+    rotation immediately, removed ones are drained. Cheap no-op if nothing changed.
+    """
+    added, removed = attack_targets.update(target_urls)
+    if added or removed:
+        print(f"[Injector] Targets updated (+{len(added)} / -{len(removed)}): {', '.join(target_urls)}")
+
+
+def get_target_distribution():
+    """
+    Requests routed to each target since the previous call ({url: count}).
+    """
+    if shard_pool is not None:
+        cumulative = shard_pool.target_distribution()
+    elif async_engine is not None:
+        cumulative = async_engine.balancer.distribution()
+    elif thread_balancer is not None:
+        cumulative = thread_balancer.distribution()
+    else:
+        return {}
+    return distribution_tracker.interval(cumulative)
+
+
+def _lb_options():
+    return {
+        "lb_strategy": getattr(config, "HTTP_LB_STRATEGY", "static"),
+        "lb_weights": getattr(config, "HTTP_LB_WEIGHTS", {}),
+    }
+
+
+def _attack_query():
+    # work = ms de CPU calibrados no servidor; kernel escolhe o tipo de carga (cpu/memory/alloc/io)
+    query = (f"work={config.ATTACK_WORK_UNITS}&sleep={config.ATTACK_SLEEP}"
+             f"&kernel={getattr(config, 'ATTACK_KERNEL', 'cpu')}")
+    size_kb = getattr(config, "ATTACK_SIZE_KB", 0)
+    return query + f"&size_kb={size_kb}" if size_kb else query
+
+
+def get_rate_report():
+    """
+    Returns achieved vs. intended RPS since the previous call, or None if neither
+    the asyncio engine nor the shard pool is running (the threaded workers do not track it).
+    """
+    if shard_pool is not None:
+        return shard_pool.get_rate_report()
+    if async_engine is None:
+        return None
+    return async_engine.get_rate_report()
+
+
+def _start_async_flood(target_urls, rps_per_worker, num_attackers):
+    """
+    Open-loop variant of start_http_flood: a single event loop fires requests on a
+    fixed arrival schedule, so slow responses do not reduce the offered rate.
+    """
+    global attack_active, async_engine, async_rtt_histogram, async_lag_histogram
+    attack_active = True
+    async_rtt_histogram = rtt_recorder.writer()
+    async_lag_histogram = lag_recorder.writer()
+    async_engine = OpenLoopEngine(
+        name="Injector-Async",
+        target_urls=target_urls,
+        rps_per_worker=rps_per_worker,
+        num_workers=num_attackers,
+        query=_attack_query(),
+        timeout=config.HTTP_REQUEST_TIMEOUT_SECONDS,
+        max_in_flight=getattr(config, "HTTP_ASYNC_MAX_IN_FLIGHT", 10000),
+        on_latency=async_rtt_histogram.record,
+        latency_mode=getattr(config, "LATENCY_MEASUREMENT_MODE", "service"),
+        on_schedule_lag=lambda worker_index, lag_ms: async_lag_histogram.record(lag_ms),
+        **_lb_options(),
+    )
+    async_engine.start()
+    print(f"[Injector] Async open-loop flood started: {num_attackers} workers, ~{async_engine.intended_rps:.2f} RPS intended, across {len(target_urls)} targets: {', '.join(target_urls)}")
+
+
+def _start_sharded_flood(target_urls, rps_per_worker, num_attackers):
+    """
+    Multi-process variant of start_http_flood: attackers are split across
+    HTTP_ATTACK_PROCESS_SHARDS processes so they do not share the orchestrator's GIL.
+    """
+    global attack_active, shard_pool
+    attack_active = True
+    shard_pool = ShardedTraffic(
+        name="Injector",
+        target_urls=target_urls,
+        rps_per_worker=rps_per_worker,
+        num_workers=num_attackers,
+        num_shards=config.HTTP_ATTACK_PROCESS_SHARDS,
+        query=_attack_query(),
+        timeout=config.HTTP_REQUEST_TIMEOUT_SECONDS,
+        max_in_flight=getattr(config, "HTTP_ASYNC_MAX_IN_FLIGHT", 10000),
+        cpu_cores=getattr(config, "HTTP_ATTACK_SHARD_CPU_CORES", []),
+        recorder=rtt_recorder,
+        lag_recorder=lag_recorder,
+        latency_mode=getattr(config, "LATENCY_MEASUREMENT_MODE", "service"),
+        **_lb_options(),
+    )
+    shard_pool.start()
 
 
 def start_http_flood(target_urls, rps_per_worker, num_attackers):
-    global attack_active, attacker_threads
+    global attack_active, attacker_threads, thread_balancer
     print(f"[DEBUG Injector start_http_flood] Received target_urls: {target_urls}") # LOG
     print(f"[DEBUG Injector start_http_flood] Received rps_per_worker: {rps_per_worker}, num_attackers: {num_attackers}") # LOG
     if not target_urls:
         print("[Injector] No target URLs provided. Attack not started.")
         return
     if attack_active:
-        print("[Injector] Attack already in progress.")
+        print("[Injector] Attack already in progress. Updating targets only.")
+        update_flood_targets(target_urls)
+        return
+
+    attack_targets.update(target_urls)
+    if getattr(config, "HTTP_ATTACK_PROCESS_SHARDS", 0) > 0:
+        _start_sharded_flood(target_urls, rps_per_worker, num_attackers)
+        return
+    if getattr(config, "HTTP_ATTACK_ENGINE", "threads") == "asyncio":
+        _start_async_flood(target_urls, rps_per_worker, num_attackers)
         return
 
     attack_active = True
@@ -124,29 +333,24 @@ def start_http_flood(target_urls, rps_per_worker, num_attackers):
         # A lógica de stop/start no orchestrator deveria cuidar disso.
     attacker_threads.clear()
 
+    lb_options = _lb_options()
+    thread_balancer = LoadBalancer(lb_options["lb_strategy"], target_urls, weights=lb_options["lb_weights"])
+
     num_targets = len(target_urls)
     print(f"[Injector] Starting HTTP flood with {num_attackers} attackers, ~{rps_per_worker * num_attackers} RPS total, across {num_targets} targets: {', '.join(target_urls)}")
     print(f"[DEBUG Injector start_http_flood] num_targets calculated as: {num_targets}") # LOG
 
     for i in range(num_attackers):
-        # Distribuição Round Robin dos workers pelas URLs de destino
-        if num_targets == 0: # Segurança caso target_urls se torne vazia inesperadamente
-            print("[DEBUG Injector start_http_flood] No targets available for worker assignment. Breaking loop.")
-            break
-        target_url_for_this_worker = target_urls[i % num_targets] # <--- ALTERAÇÃO CHAVE
-        
-        print(f"[DEBUG Injector start_http_flood] Worker {i+1}: Assigning to target_url: {target_url_for_this_worker} (index {i % num_targets} from {num_targets} targets)") # LOG
-
+        # O alvo de cada requisição é escolhido pelo balanceador compartilhado (config.HTTP_LB_STRATEGY)
         thread = threading.Thread(
             target=http_request_worker,
-            args=(target_url_for_this_worker, rps_per_worker), # Cada thread pode ter uma URL diferente
+            args=(i, _attack_query(), rps_per_worker, thread_balancer),
             daemon=True,
             name=f"InjectorWorker-{i+1}"
         )
         attacker_threads.append(thread)
         thread.start()
-        print(f"[DEBUG Injector start_http_flood] {len(attacker_threads)} attacker threads started.")
-        print(f"[Injector] Worker {i+1} assigned to target: {target_url_for_this_worker}")
+    print(f"[DEBUG Injector start_http_flood] {len(attacker_threads)} attacker threads started.")
 
 
 def start_http_flood_old(target_urls, duration_seconds=0, rps_per_worker=config.HTTP_ATTACK_REQUESTS_PER_SECOND_PER_ATTACKER, num_attackers=config.HTTP_ATTACK_NUM_ATTACKERS):
@@ -283,8 +487,26 @@ def http_request_worker_OLD(target_url, rps_per_worker):
 def stop_http_flood():
     global attack_active, attacker_threads # Garante que estamos modificando as globais
 
+    global async_engine, shard_pool
+
     print(f"[DEBUG Injector stop_http_flood] Called. Current attack_active: {attack_active}. Number of threads in global list: {len(attacker_threads)}")
 
+    if shard_pool is not None:
+        print("[Injector] Stopping sharded flood processes...")
+        attack_active = False
+        pool, shard_pool = shard_pool, None
+        pool.stop()
+        return
+
+    if async_engine is not None:
+        print("[Injector] Stopping async open-loop flood...")
+        attack_active = False
+        engine, async_engine = async_engine, None
+        engine.stop()
+        rtt_recorder.retire(async_rtt_histogram)
+        lag_recorder.retire(async_lag_histogram)
+        return
+
     if not attack_active and not attacker_threads:
         print("[DEBUG Injector stop_http_flood] Attack already signaled as inactive AND no threads in list. Assuming already stopped.")
         # Mesmo se attack_active for False, ainda pode haver threads para join se stop_http_flood falhou antes
@@ -395,10 +617,10 @@ def start_http_flood_OLD(target_host_port_pairs, duration_seconds):
     if duration_seconds > 0:
         time.sleep(duration_seconds)
         print(f"[Injector] Flood duration ({duration_seconds}s) elapsed.")
-        stop_http_flood()
+        stop_http_flood_OLD()
     # Se duration_seconds <= 0, o flood continuará até stop_http_flood() ser chamado externamente.
 
-def stop_http_flood():
+def stop_http_flood_OLD():
     """
     Stops all active HTTP flood worker threads.
     """
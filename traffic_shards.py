@@ -0,0 +1,427 @@
+# edos_docker_simulation/traffic_shards.py
+"""
+Geração de tráfego distribuída em vários processos (shards).
+
+Cada shard é um processo separado (com seu próprio GIL) rodando um
+`load_engine.OpenLoopEngine` para uma fatia contígua dos workers, opcionalmente
+fixado (CPU affinity) em núcleos configuráveis. Os shards publicam seus
+contadores em um bloco de `multiprocessing.shared_memory`: cada shard escreve
+somente na sua própria linha, e o orquestrador lê todas as linhas a cada tick
+sem nenhuma troca de mensagens (sem pipes/filas/locks).
+
+Layout do bloco (int64):
+    [CONTROL_SLOTS de controle]
+    + num_shards * ([SHARD_SLOTS contadores] + [TARGET_COUNT_SLOTS contagens por alvo]
+                    + [histograma de latência] + [histograma de atraso do cronograma])
+    + [tabela de alvos: TARGET_TABLE_BYTES bytes com as URLs separadas por '\n']
+
+A tabela de alvos é escrita só pelo orquestrador (`update_targets`) e protegida
+por um seqlock em CTRL_TARGETS_VERSION (ímpar = escrita em andamento): os shards
+a consultam no mesmo loop do heartbeat e repassam a nova lista ao seu motor, sem
+reiniciar os processos.
+"""
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+from latency_histogram import BUFFER_LEN as HIST_LEN, HistogramRecorder, LatencyHistogram
+from load_engine import OpenLoopEngine
+
+try:
+    import config
+    _MAX_TARGETS = getattr(config, "MAX_INSTANCES", 64)
+except Exception:
+    _MAX_TARGETS = 64
+
+# --- Slots de controle (escritos pelo orquestrador) ---
+CTRL_STOP = 0
+CTRL_TARGETS_VERSION = 1  # seqlock da tabela de alvos
+CTRL_TARGETS_LEN = 2      # tamanho (bytes) da lista de alvos codificada
+CONTROL_SLOTS = 8
+TARGET_TABLE_BYTES = 16384
+
+# --- Slots por shard (escritos somente pelo próprio shard) ---
+SLOT_SENT = 0
+SLOT_COMPLETED = 1
+SLOT_ERRORS = 2
+SLOT_DROPPED = 3
+SLOT_IN_FLIGHT = 4
+SLOT_HEARTBEAT = 5   # time.monotonic_ns() da última publicação (0 = ainda subindo)
+SLOT_SCHEDULE_LAG_US = 6  # atraso mais recente de um worker do shard em relação ao cronograma
+SLOT_TARGETS_VERSION = 7  # versão da tabela de alvos a que as contagens por alvo se referem
+SHARD_SLOTS = 16     # folga para novos contadores sem mudar o layout
+# Requisições roteadas por alvo, na ordem da tabela de alvos: um slot por instância possível
+# (os shards usam "spawn" e reimportam o config, então o layout é o mesmo nos dois lados)
+TARGET_COUNT_SLOTS = max(int(_MAX_TARGETS), 1)
+
+HIST_LATENCY = 0
+HIST_SCHEDULE_LAG = 1
+SHARD_STRIDE = SHARD_SLOTS + TARGET_COUNT_SLOTS + 2 * HIST_LEN  # contadores, contagens por alvo e histogramas
+
+_INT64 = 8
+
+
+def _counter_property(slot: int):
+    def getter(self):
+        return self._mv[self._base + slot]
+
+    def setter(self, value):
+        self._mv[self._base + slot] = value
+
+    return property(getter, setter)
+
+
+class SharedCounters:
+    """
+    Mesma interface de `load_engine.EngineCounters`, mas gravando direto na linha
+    deste shard no bloco de memória compartilhada.
+    """
+    sent = _counter_property(SLOT_SENT)
+    completed = _counter_property(SLOT_COMPLETED)
+    errors = _counter_property(SLOT_ERRORS)
+    dropped = _counter_property(SLOT_DROPPED)
+    in_flight = _counter_property(SLOT_IN_FLIGHT)
+
+    def __init__(self, mv: memoryview, shard_index: int):
+        self._mv = mv
+        self._base = CONTROL_SLOTS + shard_index * SHARD_STRIDE
+        self.latency = shard_histogram(mv, shard_index, HIST_LATENCY)
+        self.schedule_lag = shard_histogram(mv, shard_index, HIST_SCHEDULE_LAG)
+
+    def record_schedule_lag(self, worker_index: int, lag_ms: float):
+        self.schedule_lag.record(lag_ms)
+        self._mv[self._base + SLOT_SCHEDULE_LAG_US] = int(lag_ms * 1000.0)
+
+    def heartbeat(self):
+        self._mv[self._base + SLOT_HEARTBEAT] = time.monotonic_ns()
+
+    def publish_distribution(self, urls: List[str], counts: Dict[str, int], targets_version: int):
+        """
+        Publica as requisições roteadas por alvo (cumulativas), na ordem da tabela de alvos.
+        """
+        row = self._base + SHARD_SLOTS
+        for i, url in enumerate(urls):
+            self._mv[row + i] = counts.get(url, 0)
+        self._mv[self._base + SLOT_TARGETS_VERSION] = targets_version
+
+
+def shard_histogram(mv: memoryview, shard_index: int, which: int) -> LatencyHistogram:
+    """
+    Histograma (HIST_LATENCY ou HIST_SCHEDULE_LAG) do shard, gravado direto na memória compartilhada.
+    """
+    start = CONTROL_SLOTS + shard_index * SHARD_STRIDE + SHARD_SLOTS + TARGET_COUNT_SLOTS + which * HIST_LEN
+    return LatencyHistogram(mv[start:start + HIST_LEN])
+
+
+def _table_offset(num_shards: int) -> int:
+    """
+    Offset (em bytes) da tabela de alvos dentro do bloco compartilhado.
+    """
+    return (CONTROL_SLOTS + max(num_shards, 1) * SHARD_STRIDE) * _INT64
+
+
+def _read_target_table(mv: memoryview, raw: memoryview, table_offset: int):
+    """
+    Lê (versão, urls) da tabela de alvos, ou None se uma escrita estiver em andamento.
+    """
+    version = mv[CTRL_TARGETS_VERSION]
+    if version & 1:
+        return None
+    length = mv[CTRL_TARGETS_LEN]
+    data = bytes(raw[table_offset:table_offset + length])
+    if mv[CTRL_TARGETS_VERSION] != version:
+        return None
+    urls = [u for u in data.decode().split("\n") if u]
+    return version, urls
+
+
+def split_workers(num_workers: int, num_shards: int) -> List[range]:
+    """
+    Divide [0, num_workers) em até num_shards faixas contíguas de tamanho ~igual.
+    """
+    num_shards = max(1, min(num_shards, num_workers))
+    base, extra = divmod(num_workers, num_shards)
+    ranges, start = [], 0
+    for i in range(num_shards):
+        size = base + (1 if i < extra else 0)
+        ranges.append(range(start, start + size))
+        start += size
+    return ranges
+
+
+def _shard_main(shm_name: str, shard_index: int, name: str, target_urls: List[str],
+                rps_per_worker: float, worker_range: range, query: str, timeout: float,
+                max_in_flight: int, cpu_cores: Sequence[int], latency_mode: str, table_offset: int,
+                lb_strategy: str, lb_weights: Dict[str, float]):
+    """
+    Ponto de entrada de cada processo shard.
+    """
+    if cpu_cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, set(cpu_cores))
+        except OSError as e:
+            print(f"[{name}] Warning: could not pin to cores {list(cpu_cores)}: {e}")
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    mv = shm.buf.cast("q")
+    counters = SharedCounters(mv, shard_index)
+    engine = OpenLoopEngine(
+        name=name,
+        target_urls=target_urls,
+        rps_per_worker=rps_per_worker,
+        num_workers=len(worker_range),
+        query=query,
+        timeout=timeout,
+        max_in_flight=max_in_flight,
+        on_latency=counters.latency.record,
+        counters=counters,
+        worker_offset=worker_range.start,
+        latency_mode=latency_mode,
+        on_schedule_lag=counters.record_schedule_lag,
+        lb_strategy=lb_strategy,
+        lb_weights=lb_weights,
+    )
+    try:
+        engine.start()
+        counters.heartbeat()
+        targets_version, table_urls = mv[CTRL_TARGETS_VERSION], list(target_urls)
+        while not mv[CTRL_STOP]:
+            time.sleep(0.05)
+            counters.heartbeat()
+            if mv[CTRL_TARGETS_VERSION] != targets_version:
+                table = _read_target_table(mv, shm.buf, table_offset)
+                if table is not None:
+                    targets_version, table_urls = table
+                    engine.update_targets(table_urls)
+            # Só publica depois que o event loop aplicou a troca (mesma ordem da tabela)
+            if engine.target_urls == table_urls:
+                counters.publish_distribution(table_urls, engine.balancer.distribution(), targets_version)
+    finally:
+        engine.stop()
+        if engine.is_running():
+            # O event loop ainda grava nos contadores: fechar o mapeamento agora o faria escrever
+            # em memória liberada. O SO desfaz o mapeamento quando o processo terminar
+            print(f"[{name}] Warning: leaving shared memory mapped, event loop still running.")
+        else:
+            # Libera todas as views antes de fechar o mapeamento compartilhado
+            counters.latency.buf.release()
+            counters.schedule_lag.buf.release()
+            del engine, counters
+            mv.release()
+            shm.close()
+
+
+class ShardedTraffic:
+    """
+    Conjunto de processos shard para um gerador (ataque ou tráfego normal).
+
+    A leitura dos contadores (`read_totals`, `get_rate_report`) só toca a memória
+    compartilhada, então pode ser chamada em todo tick do orquestrador sem custo de IPC.
+    """
+    def __init__(self,
+                 name: str,
+                 target_urls: List[str],
+                 rps_per_worker: float,
+                 num_workers: int,
+                 num_shards: int,
+                 query: str = "",
+                 timeout: float = 10.0,
+                 max_in_flight: int = 10000,
+                 cpu_cores: Optional[Sequence[int]] = None,
+                 recorder: Optional[HistogramRecorder] = None,
+                 lag_recorder: Optional[HistogramRecorder] = None,
+                 latency_mode: str = "service",
+                 lb_strategy: str = "static",
+                 lb_weights: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.target_urls = list(target_urls)
+        self.rps_per_worker = float(rps_per_worker)
+        self.num_workers = int(num_workers)
+        self.query = query
+        self.timeout = timeout
+        self.cpu_cores = list(cpu_cores or [])
+        self.recorder = recorder
+        self.lag_recorder = lag_recorder
+        self.latency_mode = latency_mode
+        self.lb_strategy = lb_strategy
+        self.lb_weights = dict(lb_weights or {})
+        self._target_counts: Dict[tuple, int] = {}  # (shard, url) -> última contagem publicada
+        self.worker_ranges = split_workers(self.num_workers, num_shards) if self.num_workers > 0 else []
+        self.num_shards = len(self.worker_ranges)
+        # O limite de requisições em voo é global; cada shard recebe uma fração
+        self.max_in_flight_per_shard = max(1, int(max_in_flight) // max(self.num_shards, 1))
+
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._mv: Optional[memoryview] = None
+        # update_targets roda na thread de eventos do Docker; serializa a escrita da tabela com
+        # a liberação do bloco em stop()
+        self._shm_lock = threading.Lock()
+        self._procs: List[mp.Process] = []
+        self._histograms: List[tuple] = []  # (histograma de latência, histograma de atraso) por shard
+        self._last_report = (time.monotonic(), 0, 0)
+
+    @property
+    def intended_rps(self) -> float:
+        if self.rps_per_worker <= 0 or not self.target_urls:
+            return 0.0
+        return self.rps_per_worker * self.num_workers
+
+    def start(self):
+        table_offset = _table_offset(self.num_shards)
+        self._shm = shared_memory.SharedMemory(create=True, size=table_offset + TARGET_TABLE_BYTES)
+        self._mv = self._shm.buf.cast("q")
+        for i in range(len(self._mv)):
+            self._mv[i] = 0
+        self._write_target_table(self.target_urls)
+        self._histograms = [(shard_histogram(self._mv, i, HIST_LATENCY), shard_histogram(self._mv, i, HIST_SCHEDULE_LAG))
+                            for i in range(self.num_shards)]
+        for latency, lag in self._histograms:
+            if self.recorder is not None:
+                self.recorder.add_writer(latency)
+            if self.lag_recorder is not None:
+                self.lag_recorder.add_writer(lag)
+
+        # "spawn" evita herdar as threads do orquestrador (stats collector, etc.) via fork
+        ctx = mp.get_context("spawn")
+        for i, worker_range in enumerate(self.worker_ranges):
+            cores = [self.cpu_cores[i % len(self.cpu_cores)]] if self.cpu_cores else []
+            proc = ctx.Process(
+                target=_shard_main,
+                args=(self._shm.name, i, f"{self.name}-Shard{i}", self.target_urls,
+                      self.rps_per_worker, worker_range, self.query, self.timeout,
+                      self.max_in_flight_per_shard, cores, self.latency_mode, table_offset,
+                      self.lb_strategy, self.lb_weights),
+                name=f"{self.name}-Shard{i}",
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+        print(f"[{self.name}] Started {self.num_shards} shard process(es) for {self.num_workers} workers"
+              + (f", pinned to cores {self.cpu_cores}" if self.cpu_cores else ""))
+
+    def stop(self, timeout: Optional[float] = None):
+        if self._mv is None:
+            return
+        if timeout is None:
+            timeout = self.timeout + 3.0
+        self._mv[CTRL_STOP] = 1
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            proc.join(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                print(f"[{self.name}] Warning: {proc.name} did not stop within {timeout}s. Terminating.")
+                proc.terminate()
+                proc.join(timeout=1.0)
+        totals = self.read_totals()
+        print(f"[{self.name}] All shards stopped. Sent: {totals['sent']}, OK: {totals['completed']}, "
+              f"Errors: {totals['errors']}, Dropped: {totals['dropped']}")
+        self._procs.clear()
+        for latency, lag in self._histograms:
+            if self.recorder is not None:
+                self.recorder.retire(latency)
+            if self.lag_recorder is not None:
+                self.lag_recorder.retire(lag)
+            latency.buf.release()
+            lag.buf.release()
+        self._histograms = []
+        with self._shm_lock:
+            self._mv.release()
+            self._mv = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def is_running(self) -> bool:
+        return any(p.is_alive() for p in self._procs)
+
+    def update_targets(self, target_urls: List[str]):
+        """
+        Publica um novo conjunto de alvos para todos os shards sem reiniciá-los.
+        """
+        urls = list(dict.fromkeys(target_urls))
+        with self._shm_lock:
+            if self._mv is not None:
+                self._write_target_table(urls)
+            self.target_urls = urls
+
+    def _write_target_table(self, urls: List[str]):
+        if len(urls) > TARGET_COUNT_SLOTS:
+            raise ValueError(f"Too many targets for per-target counts ({len(urls)} > {TARGET_COUNT_SLOTS}); raise MAX_INSTANCES")
+        data = "\n".join(urls).encode()
+        if len(data) > TARGET_TABLE_BYTES:
+            raise ValueError(f"Target list too large for shared table ({len(data)} > {TARGET_TABLE_BYTES} bytes)")
+        mv, offset = self._mv, _table_offset(self.num_shards)
+        version = mv[CTRL_TARGETS_VERSION]
+        mv[CTRL_TARGETS_VERSION] = version + 1  # ímpar: escrita em andamento
+        self._shm.buf[offset:offset + len(data)] = data
+        mv[CTRL_TARGETS_LEN] = len(data)
+        mv[CTRL_TARGETS_VERSION] = version + 2
+
+    def read_totals(self) -> Dict[str, int]:
+        """
+        Soma os contadores cumulativos de todos os shards (leitura direta da memória compartilhada).
+        """
+        totals = {"sent": 0, "completed": 0, "errors": 0, "dropped": 0, "in_flight": 0}
+        mv = self._mv
+        if mv is None:
+            return totals
+        for i in range(self.num_shards):
+            base = CONTROL_SLOTS + i * SHARD_STRIDE
+            totals["sent"] += mv[base + SLOT_SENT]
+            totals["completed"] += mv[base + SLOT_COMPLETED]
+            totals["errors"] += mv[base + SLOT_ERRORS]
+            totals["dropped"] += mv[base + SLOT_DROPPED]
+            totals["in_flight"] += mv[base + SLOT_IN_FLIGHT]
+        return totals
+
+    def target_distribution(self) -> Dict[str, int]:
+        """
+        Requisições roteadas por alvo desde o início, somadas sobre os shards (alvos
+        removidos mantêm a última contagem publicada).
+        """
+        mv = self._mv
+        if mv is not None:
+            version = mv[CTRL_TARGETS_VERSION]
+            for i in range(self.num_shards):
+                base = CONTROL_SLOTS + i * SHARD_STRIDE
+                if mv[base + SLOT_TARGETS_VERSION] != version:
+                    continue  # shard ainda aplicando a troca de alvos; lê no próximo tick
+                for j, url in enumerate(self.target_urls):
+                    self._target_counts[(i, url)] = mv[base + SHARD_SLOTS + j]
+        totals: Dict[str, int] = {}
+        for (_, url), count in self._target_counts.items():
+            totals[url] = totals.get(url, 0) + count
+        return totals
+
+    def worker_schedule_lag_ms(self) -> Dict[str, float]:
+        """
+        Atraso mais recente em relação ao cronograma, por shard (um shard agrega vários workers).
+        """
+        mv = self._mv
+        if mv is None:
+            return {}
+        return {f"{self.name}-Shard{i}": mv[CONTROL_SLOTS + i * SHARD_STRIDE + SLOT_SCHEDULE_LAG_US] / 1000.0
+                for i in range(self.num_shards)}
+
+    def get_rate_report(self) -> Dict[str, float]:
+        """
+        Mesmo formato de `OpenLoopEngine.get_rate_report`, agregado sobre os shards.
+        """
+        totals = self.read_totals()
+        now = time.monotonic()
+        last_ts, last_sent, last_completed = self._last_report
+        self._last_report = (now, totals["sent"], totals["completed"])
+        window = max(now - last_ts, 1e-6)
+        return {
+            "intended_rps": self.intended_rps,
+            "sent_rps": (totals["sent"] - last_sent) / window,
+            "achieved_rps": (totals["completed"] - last_completed) / window,
+            "in_flight": totals["in_flight"],
+            "sent": totals["sent"],
+            "completed": totals["completed"],
+            "errors": totals["errors"],
+            "dropped": totals["dropped"],
+        }